@@ -0,0 +1,310 @@
+"""
+ANALYTICS: Vectorized Market Aggregates (optional, needs pandas)
+- Loads keyword results once into a typed frame: one row per (country, keyword, product)
+- Duplicate records get their static fields (title, price, rating, reviews) joined from the first keyword
+- Per-keyword and per-country aggregates in vectorized passes: price quantiles,
+  rating/review stats, best BSR per category, badge prevalence, top products by BSR
+- Builds the data summary used in the AI analysis prompt (whole, or split per keyword for chunking)
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Product fields carried over from the first keyword for duplicate records
+STATIC_FIELDS = ('title', 'price', 'currency', 'rating', 'review_count')
+
+TOP_PRODUCTS = 3  # Products listed per keyword in the summary
+TOP_CATEGORIES = 10  # Categories listed in the market overview
+
+
+def load_frame(json_data: List[Dict], country: Optional[str] = None):
+    """
+    Flatten keyword results into a typed DataFrame
+
+    Args:
+        json_data: List of keyword results (all_keywords_*.json)
+        country: Optional country code stored in a 'country' column
+
+    Returns:
+        DataFrame with one row per listed product. Keywords without products keep
+        one row with a null asin, so failed keywords still show up in the aggregates.
+
+    Raises:
+        ImportError: If pandas is not installed
+    """
+    import pandas as pd
+
+    columns = {name: [] for name in (
+        'keyword', 'status', 'asin', 'search_position', 'is_duplicate', 'bsr_rank', 'bsr_category', 'badges',
+        *STATIC_FIELDS
+    )}
+    per_keyword = ('keyword', 'status')
+    per_product = tuple(name for name in columns if name not in per_keyword)
+
+    for keyword_result in json_data:
+        keyword = keyword_result.get('keyword', 'Unknown')
+        status = keyword_result.get('status', 'unknown')
+        products = keyword_result.get('products') or []
+        if status != 'success' or not products:
+            columns['keyword'].append(keyword)
+            columns['status'].append(status)
+            for name in per_product:
+                columns[name].append(None)
+            continue
+
+        columns['keyword'].extend([keyword] * len(products))
+        columns['status'].extend([status] * len(products))
+        for product in products:
+            bsr = product.get('bsr_subcategories') or []
+            main = bsr[0] if bsr and isinstance(bsr[0], dict) else {}
+            columns['asin'].append(product.get('asin'))
+            columns['search_position'].append(product.get('search_position'))
+            columns['is_duplicate'].append(bool(product.get('is_duplicate')))
+            columns['bsr_rank'].append(main.get('rank'))
+            columns['bsr_category'].append(main.get('category'))
+            columns['badges'].append(product.get('badges') or [])
+            for field in STATIC_FIELDS:
+                columns[field].append(product.get(field))
+
+    frame = pd.DataFrame({
+        'keyword': pd.array(columns['keyword'], dtype='string'),
+        'status': pd.array(columns['status'], dtype='string'),
+        'asin': pd.array(columns['asin'], dtype='string'),
+        'search_position': pd.to_numeric(pd.Series(columns['search_position'], dtype=object), errors='coerce').astype('Int32'),
+        'is_duplicate': pd.array(columns['is_duplicate'], dtype='boolean'),
+        'bsr_rank': pd.to_numeric(pd.Series(columns['bsr_rank'], dtype=object), errors='coerce').astype('Int64'),
+        'bsr_category': pd.array(columns['bsr_category'], dtype='string'),
+        'badges': pd.Series(columns['badges'], dtype=object),
+        'title': pd.array(columns['title'], dtype='string'),
+        'price': pd.to_numeric(pd.Series(columns['price'], dtype=object), errors='coerce').astype('float64'),
+        'currency': pd.array(columns['currency'], dtype='string'),
+        'rating': pd.to_numeric(pd.Series(columns['rating'], dtype=object), errors='coerce').astype('float64'),
+        'review_count': pd.to_numeric(pd.Series(columns['review_count'], dtype=object), errors='coerce').astype('Int64')
+    })
+
+    # Duplicates only carry per-keyword fields: join the static ones from the first appearance
+    duplicates = frame['is_duplicate'].fillna(False).to_numpy(dtype=bool)
+    if duplicates.any():
+        originals = frame.loc[~duplicates & frame['asin'].notna().to_numpy()]
+        static = originals.drop_duplicates('asin').set_index('asin')
+        for field in STATIC_FIELDS:
+            frame.loc[duplicates, field] = frame.loc[duplicates, 'asin'].map(static[field])
+
+    if country is not None:
+        frame['country'] = pd.Series(country, index=frame.index, dtype='string')
+    return frame
+
+
+def load_frames(results: Iterable[tuple]):
+    """
+    Load several countries (or runs) into one frame
+
+    Args:
+        results: Iterable of (country, json_data)
+
+    Returns:
+        Concatenated DataFrame with a 'country' column
+    """
+    import pandas as pd
+
+    frames = [load_frame(json_data, country=country) for country, json_data in results]
+    return pd.concat(frames, ignore_index=True) if frames else load_frame([], country='')
+
+
+def keyword_stats(frame):
+    """
+    Per-keyword aggregates
+
+    Args:
+        frame: DataFrame from load_frame
+
+    Returns:
+        DataFrame indexed by keyword (first-seen order): products, price quantiles,
+        avg rating, avg reviews, best BSR
+    """
+    products = frame.loc[frame['asin'].notna()]
+    grouped = products.groupby('keyword', sort=False)
+
+    stats = grouped.agg(
+        products=('asin', 'size'),
+        price_min=('price', 'min'),
+        price_max=('price', 'max'),
+        avg_rating=('rating', 'mean'),
+        avg_reviews=('review_count', 'mean'),
+        best_bsr=('bsr_rank', 'min')
+    )
+    quantiles = grouped['price'].quantile([0.25, 0.5, 0.75]).unstack()
+    stats['price_p25'] = quantiles.get(0.25)
+    stats['price_median'] = quantiles.get(0.5)
+    stats['price_p75'] = quantiles.get(0.75)
+
+    # Keep every keyword (failed ones have no products) in input order
+    keywords = frame['keyword'].drop_duplicates()
+    return stats.reindex(keywords)
+
+
+def top_products(frame, n: int = TOP_PRODUCTS):
+    """Best-ranked products per keyword (one sort for all keywords)"""
+    ranked = frame.loc[frame['bsr_rank'].notna()].sort_values(['keyword', 'bsr_rank'], kind='stable')
+    return ranked.groupby('keyword', sort=False).head(n)
+
+
+def category_best_bsr(frame, n: int = TOP_CATEGORIES):
+    """
+    Best main BSR per category, for the categories with the most products
+
+    Returns:
+        DataFrame indexed by category: products, best_bsr, best_asin
+    """
+    ranked = frame.loc[frame['bsr_category'].notna() & frame['bsr_rank'].notna()]
+    if ranked.empty:
+        return ranked.iloc[0:0]
+
+    best = ranked.loc[ranked.groupby('bsr_category')['bsr_rank'].idxmin(), ['bsr_category', 'bsr_rank', 'asin']]
+    best = best.set_index('bsr_category').rename(columns={'bsr_rank': 'best_bsr', 'asin': 'best_asin'})
+    best['products'] = ranked.groupby('bsr_category')['asin'].nunique()
+    return best.sort_values(['products', 'best_bsr'], ascending=[False, True]).head(n)
+
+
+def badge_prevalence(frame):
+    """
+    Share of unique ASINs carrying each badge
+
+    Returns:
+        Series indexed by badge, sorted by share (descending)
+    """
+    listed = frame.loc[frame['asin'].notna(), ['asin', 'badges']]
+    if listed.empty:
+        return listed['asin'].iloc[0:0]
+
+    exploded = listed.explode('badges').dropna(subset=['badges']).drop_duplicates()
+    unique_asins = listed['asin'].nunique()
+    return (exploded.groupby('badges')['asin'].nunique() / unique_asins).sort_values(ascending=False)
+
+
+def country_stats(frame) -> Dict:
+    """
+    Market-level aggregates over unique ASINs
+
+    Returns:
+        Dictionary with keyword/ASIN counts, price quantiles, rating and review stats
+    """
+    products = frame.loc[frame['asin'].notna()].drop_duplicates('asin')
+    prices = products['price'].dropna()
+    return {
+        'keywords': int(frame['keyword'].nunique()),
+        'failed_keywords': int(frame.loc[frame['asin'].isna(), 'keyword'].nunique()),
+        'unique_asins': int(len(products)),
+        'price_quantiles': prices.quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict() if len(prices) else {},
+        'avg_rating': _scalar(products['rating'].mean()),
+        'median_reviews': _scalar(products['review_count'].median())
+    }
+
+
+def _scalar(value) -> Optional[float]:
+    """Aggregate result as a float (None for NaN / pd.NA)"""
+    import pandas as pd
+
+    return None if pd.isna(value) else float(value)
+
+
+def _records(frame) -> List[Dict]:
+    """Rows as plain dicts, with every missing value (NaN, pd.NA) as None"""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def _fmt(value, pattern: str = '{}', missing: str = 'N/A') -> str:
+    """Format a possibly-missing value (None from _records)"""
+    return missing if value is None else pattern.format(value)
+
+
+def build_summary(json_data: List[Dict]) -> str:
+    """
+    Data summary for the AI analysis prompt, computed from vectorized aggregates
+
+    Args:
+        json_data: List of keyword results
+
+    Returns:
+        Formatted string summary
+
+    Raises:
+        ImportError: If pandas is not installed
+    """
+    overview, keyword_sections = build_summary_sections(json_data)
+    return '\n'.join([overview, *keyword_sections])
+
+
+def build_summary_sections(json_data: List[Dict]) -> Tuple[str, List[str]]:
+    """
+    build_summary split into the market overview and one section per keyword
+    (lets the analyzer pack keywords into token-budgeted prompts)
+
+    Returns:
+        Tuple of (overview, keyword_sections)
+    """
+    frame = load_frame(json_data)
+    market = country_stats(frame)
+    per_keyword = keyword_stats(frame)
+    top = top_products(frame)
+    categories = category_best_bsr(frame)
+    badges = badge_prevalence(frame)
+
+    summary_lines = ["**Market Overview**"]
+    summary_lines.append(f"- Keywords: {market['keywords']} ({market['failed_keywords']} failed or empty)")
+    summary_lines.append(f"- Unique ASINs: {market['unique_asins']}")
+    if market['price_quantiles']:
+        q = market['price_quantiles']
+        summary_lines.append(
+            f"- Price P10/P25/Median/P75/P90: {q[0.1]:.2f} / {q[0.25]:.2f} / {q[0.5]:.2f} / {q[0.75]:.2f} / {q[0.9]:.2f}"
+        )
+    summary_lines.append(f"- Avg Rating: {_fmt(market['avg_rating'], '{:.2f}/5')}")
+    summary_lines.append(f"- Median Reviews: {_fmt(market['median_reviews'], '{:,.0f}')}")
+    if not categories.empty:
+        summary_lines.append("- Best BSR by Category:")
+        for category, row in categories.iterrows():
+            summary_lines.append(f"  - {category}: #{row['best_bsr']:,} ({row['best_asin']}, {row['products']} products)")
+    if not badges.empty:
+        summary_lines.append("- Badge Prevalence: " + ', '.join(f"{badge} {share:.0%}" for badge, share in badges.items()))
+
+    # Aggregates are converted to plain records once; formatting per row in pandas is the slow part
+    top_by_keyword = {}
+    for p in _records(top[['keyword', 'asin', 'bsr_rank', 'price', 'rating', 'review_count', 'title']]):
+        top_by_keyword.setdefault(p['keyword'], []).append(p)
+
+    overview = '\n'.join(summary_lines)
+    keyword_sections = []
+    for row in _records(per_keyword.reset_index()):
+        keyword = row['keyword']
+        summary_lines = [f"\n**Keyword: {keyword}**"]
+        keyword_sections.append(summary_lines)
+        if row['products'] is None:
+            summary_lines.append(f"- Status: FAILED or NO PRODUCTS")
+            continue
+
+        summary_lines.append(f"- Total Products: {int(row['products'])}")
+        summary_lines.append(f"- Avg Rating: {_fmt(row['avg_rating'], '{:.2f}/5')}")
+        summary_lines.append(f"- Avg Reviews: {_fmt(row['avg_reviews'], '{:,.0f}')}")
+        summary_lines.append(f"- Best BSR: {_fmt(row['best_bsr'], '#{:,}')}")
+        if row['price_min'] is not None:
+            summary_lines.append(
+                f"- Price Range: {row['price_min']:.2f} - {row['price_max']:.2f} "
+                f"(P25 {row['price_p25']:.2f}, median {row['price_median']:.2f}, P75 {row['price_p75']:.2f})"
+            )
+
+        group = top_by_keyword.get(keyword)
+        if group:
+            summary_lines.append(f"- Top {len(group)} Products:")
+            for i, p in enumerate(group, 1):
+                title = _fmt(p['title'])
+                title_short = title[:50] + '...' if len(title) > 50 else title
+                summary_lines.append(
+                    f"  {i}. {p['asin']} | BSR: {p['bsr_rank']:,} | {_fmt(p['price'])} | "
+                    f"★{_fmt(p['rating'])} ({_fmt(p['review_count'], '{:,}', '0')} reviews)"
+                )
+                summary_lines.append(f"     Title: {title_short}")
+
+    return overview, ['\n'.join(lines) for lines in keyword_sections]
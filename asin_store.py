@@ -0,0 +1,141 @@
+"""
+ASIN STORE: Persistent Cross-Run Product Cache
+- Stores ASIN fields in a local SQLite database (survives between runs)
+- Tracks a timestamp per field so each field has its own freshness window
+- Lets the orchestrator skip product-page fetches when cached data is still fresh
+"""
+
+import json
+import sqlite3
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ASINStore:
+    """SQLite-backed ASIN field store with per-field time-to-live"""
+
+    # Default freshness windows (hours)
+    # Static fields rarely change, volatile fields move daily
+    DEFAULT_TTL_HOURS = {
+        'title': 24 * 30,
+        'images': 24 * 30,
+        'price': 24,
+        'rating': 24,
+        'review_count': 24,
+        'bsr_subcategories': 24
+    }
+
+    # Fields whose TTL may be extended for ASINs known to be stable (volatile fields keep their own)
+    STATIC_FIELDS = ('title', 'images')
+
+    def __init__(self, db_path: str, ttl_hours: Optional[Dict[str, float]] = None):
+        """
+        Open (or create) the store
+
+        Args:
+            db_path: Path to SQLite database file
+            ttl_hours: Optional per-field TTL overrides in hours
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.ttl_hours = dict(self.DEFAULT_TTL_HOURS)
+        if ttl_hours:
+            self.ttl_hours.update(ttl_hours)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS asin_fields (
+                country TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (country, asin, field)
+            )
+        """)
+        self.conn.commit()
+
+    def get_fresh(self, country: str, asin: str, fields: Iterable[str], min_ttl_hours: Optional[float] = None) -> Dict:
+        """
+        Return only the requested fields that are still within their TTL
+
+        Args:
+            country: Country code (BSR and price differ per marketplace)
+            asin: Product ASIN
+            fields: Field names to look up
+            min_ttl_hours: Optional lower bound for the STATIC_FIELDS TTLs (used for ASINs known to be stable)
+
+        Returns:
+            Dictionary of {field: value} for fresh fields (stale/missing fields are absent)
+        """
+        fields = list(fields)
+        if not fields:
+            return {}
+
+        placeholders = ','.join('?' for _ in fields)
+        rows = self.conn.execute(
+            f"SELECT field, value, updated_at FROM asin_fields "
+            f"WHERE country = ? AND asin = ? AND field IN ({placeholders})",
+            [country, asin, *fields]
+        ).fetchall()
+
+        now = time.time()
+        fresh = {}
+        for field, value, updated_at in rows:
+            ttl_hours = self.ttl_hours.get(field, 0)
+            if min_ttl_hours and field in self.STATIC_FIELDS:
+                ttl_hours = max(ttl_hours, min_ttl_hours)
+            ttl_seconds = ttl_hours * 3600
+            if now - updated_at <= ttl_seconds:
+                fresh[field] = json.loads(value)
+        return fresh
+
+    def stale_fields(self, country: str, asin: str, fields: Iterable[str]) -> List[str]:
+        """
+        Return the requested fields that are missing or expired
+
+        Args:
+            country: Country code
+            asin: Product ASIN
+            fields: Field names to check
+
+        Returns:
+            List of field names that need refetching
+        """
+        fields = list(fields)
+        fresh = self.get_fresh(country, asin, fields)
+        return [f for f in fields if f not in fresh]
+
+    def update(self, country: str, asin: str, values: Dict):
+        """
+        Upsert field values for an ASIN (each field gets a fresh timestamp)
+
+        Args:
+            country: Country code
+            asin: Product ASIN
+            values: Dictionary of {field: value}; None values are skipped
+        """
+        now = time.time()
+        rows = [
+            (country, asin, field, json.dumps(value, ensure_ascii=False), now)
+            for field, value in values.items()
+            if value is not None
+        ]
+        if not rows:
+            return
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO asin_fields (country, asin, field, value, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
@@ -0,0 +1,384 @@
+"""
+BSR TRACKER: Continuous BSR Tracking Daemon
+- Polls a per-country ASIN watchlist for Best Sellers Rank
+- Adapts each ASIN's polling interval to how fast its rank moves
+  (volatile ASINs are polled more often, stable ones less)
+- Appends every observation to a SQLite time-series store
+- Uses the normal AmazonScraper enrichment path at BSR depth (_enrich_product → parse_bsr → _extract_bsr)
+
+Usage:
+    python bsr_tracker.py run       # poll forever
+    python bsr_tracker.py once      # poll everything that is due, then exit (cron)
+    python bsr_tracker.py status    # show watchlist state
+"""
+
+import json
+import math
+import time
+import sqlite3
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from metrics import METRICS
+from run_planner import RunBudget
+
+logger = logging.getLogger(__name__)
+
+# Polling policy defaults (minutes)
+DEFAULT_INITIAL_INTERVAL = 6 * 60
+DEFAULT_MIN_INTERVAL = 60
+DEFAULT_MAX_INTERVAL = 48 * 60
+
+# Rank moves (|log(rank / previous_rank)|) that count as volatile / stable
+DEFAULT_VOLATILE_CHANGE = 0.10  # ~10% move → poll twice as often
+DEFAULT_STABLE_CHANGE = 0.02  # <2% move → poll 1.5× less often
+
+MAX_IDLE_SECONDS = 60  # Longest sleep between checks (picks up watchlist edits)
+
+TRACKING_KEYWORD = 'bsr_tracking'  # Keyword label passed to the enrichment path
+
+
+def next_interval(interval: float, previous_rank: Optional[int], rank: int, policy: Dict) -> float:
+    """
+    Adapt a polling interval to the latest rank move
+
+    Args:
+        interval: Current interval in seconds
+        previous_rank: Rank at the previous observation (None for the first one)
+        rank: Rank just observed
+        policy: Dictionary with min/max interval (seconds) and volatile/stable change thresholds
+
+    Returns:
+        New interval in seconds
+    """
+    if previous_rank:
+        change = abs(math.log(rank / previous_rank))
+        if change >= policy['volatile_change']:
+            interval /= 2
+        elif change < policy['stable_change']:
+            interval *= 1.5
+    return min(max(interval, policy['min_interval']), policy['max_interval'])
+
+
+class BSRTimeSeries:
+    """SQLite store for BSR observations and per-ASIN polling state"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the store
+
+        Args:
+            db_path: Path to SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bsr_observations (
+                country TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                observed_at REAL NOT NULL,
+                rank INTEGER NOT NULL,
+                category TEXT,
+                subcategories TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_observations_asin
+                ON bsr_observations (country, asin, observed_at);
+            CREATE TABLE IF NOT EXISTS watch_state (
+                country TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                interval_seconds REAL NOT NULL,
+                next_due REAL NOT NULL,
+                last_rank INTEGER,
+                last_observed REAL,
+                misses INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (country, asin)
+            );
+        """)
+        self.conn.commit()
+
+    def sync_watchlist(self, watchlist: Dict[str, List[str]], initial_interval: float):
+        """
+        Add new watchlist ASINs (due immediately) and drop removed ones
+
+        Args:
+            watchlist: {country: [asin, ...]}
+            initial_interval: Starting interval in seconds for new ASINs
+        """
+        wanted = {(country, asin) for country, asins in watchlist.items() for asin in asins}
+        current = set(self.conn.execute("SELECT country, asin FROM watch_state").fetchall())
+
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO watch_state (country, asin, interval_seconds, next_due) VALUES (?, ?, ?, ?)",
+            [(country, asin, initial_interval, now) for country, asin in wanted - current]
+        )
+        self.conn.executemany(
+            "DELETE FROM watch_state WHERE country = ? AND asin = ?",
+            list(current - wanted)
+        )
+        self.conn.commit()
+
+    def due(self, now: float) -> List[Dict]:
+        """Watched ASINs whose next poll is due, oldest first"""
+        rows = self.conn.execute(
+            "SELECT country, asin, interval_seconds, last_rank, misses FROM watch_state "
+            "WHERE next_due <= ? ORDER BY next_due",
+            (now,)
+        ).fetchall()
+        return [
+            {'country': c, 'asin': a, 'interval_seconds': i, 'last_rank': r, 'misses': m}
+            for c, a, i, r, m in rows
+        ]
+
+    def next_due(self) -> Optional[float]:
+        """Timestamp of the next scheduled poll (None if the watchlist is empty)"""
+        return self.conn.execute("SELECT MIN(next_due) FROM watch_state").fetchone()[0]
+
+    def record(self, country: str, asin: str, bsr_subcategories: List[Dict], interval: float):
+        """
+        Append an observation and schedule the next poll
+
+        Args:
+            country: Country code
+            asin: Product ASIN
+            bsr_subcategories: Parsed BSR list (first entry is the primary, first-subcategory rank)
+            interval: Interval in seconds until the next poll
+        """
+        now = time.time()
+        rank = bsr_subcategories[0]['rank']
+        self.conn.execute(
+            "INSERT INTO bsr_observations (country, asin, observed_at, rank, category, subcategories) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (country, asin, now, rank, bsr_subcategories[0].get('category'),
+             json.dumps(bsr_subcategories, ensure_ascii=False))
+        )
+        self.conn.execute(
+            "UPDATE watch_state SET interval_seconds = ?, next_due = ?, last_rank = ?, last_observed = ?, misses = 0 "
+            "WHERE country = ? AND asin = ?",
+            (interval, now + interval, rank, now, country, asin)
+        )
+        self.conn.commit()
+
+    def record_miss(self, country: str, asin: str, retry_in: float):
+        """Count a poll without BSR and retry after retry_in seconds (interval unchanged)"""
+        self.conn.execute(
+            "UPDATE watch_state SET next_due = ?, misses = misses + 1 WHERE country = ? AND asin = ?",
+            (time.time() + retry_in, country, asin)
+        )
+        self.conn.commit()
+
+    def history(self, country: str, asin: str, since: Optional[float] = None) -> List[Dict]:
+        """
+        Observations for one ASIN, oldest first
+
+        Args:
+            country: Country code
+            asin: Product ASIN
+            since: Optional Unix timestamp lower bound
+
+        Returns:
+            List of {'observed_at', 'rank', 'category', 'bsr_subcategories'}
+        """
+        rows = self.conn.execute(
+            "SELECT observed_at, rank, category, subcategories FROM bsr_observations "
+            "WHERE country = ? AND asin = ? AND observed_at >= ? ORDER BY observed_at",
+            (country, asin, since or 0)
+        ).fetchall()
+        return [
+            {'observed_at': t, 'rank': r, 'category': c, 'bsr_subcategories': json.loads(s)}
+            for t, r, c, s in rows
+        ]
+
+    def state(self) -> List[Dict]:
+        """Polling state for every watched ASIN"""
+        rows = self.conn.execute(
+            "SELECT s.country, s.asin, s.interval_seconds, s.next_due, s.last_rank, s.last_observed, s.misses, "
+            "(SELECT COUNT(*) FROM bsr_observations o WHERE o.country = s.country AND o.asin = s.asin) "
+            "FROM watch_state s ORDER BY s.country, s.next_due"
+        ).fetchall()
+        return [
+            {'country': c, 'asin': a, 'interval_minutes': round(i / 60, 1), 'next_due': n, 'last_rank': r,
+             'last_observed': o, 'misses': m, 'observations': count}
+            for c, a, i, n, r, o, m, count in rows
+        ]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+class BSRTracker:
+    """Long-running BSR poller over a per-country ASIN watchlist"""
+
+    def __init__(self, config_path: str = "config.json"):
+        """
+        Args:
+            config_path: Path to configuration file (uses settings.bsr_tracking)
+        """
+        with open(config_path) as f:
+            self.config = json.load(f)
+
+        self.config_path = config_path
+        self.settings = self.config['settings'].get('bsr_tracking', {})
+        self.policy = {
+            'initial_interval': self.settings.get('initial_interval_minutes', DEFAULT_INITIAL_INTERVAL) * 60,
+            'min_interval': self.settings.get('min_interval_minutes', DEFAULT_MIN_INTERVAL) * 60,
+            'max_interval': self.settings.get('max_interval_minutes', DEFAULT_MAX_INTERVAL) * 60,
+            'volatile_change': self.settings.get('volatile_change', DEFAULT_VOLATILE_CHANGE),
+            'stable_change': self.settings.get('stable_change', DEFAULT_STABLE_CHANGE)
+        }
+
+        output_dir = Path(self.config['settings']['output_dir'])
+        self.store = BSRTimeSeries(self.settings.get('db_path', str(output_dir / 'bsr_timeseries.sqlite')))
+
+        # No run limits for a daemon; the budget only counts requests
+        self.budget = RunBudget(credits_per_request=self.config['settings'].get('credits_per_request'))
+        self.scrapers = {}  # {country: AmazonScraper}
+
+    def load_watchlist(self) -> Dict[str, List[str]]:
+        """
+        Read the watchlist from settings.bsr_tracking.watchlist and/or watchlist_file
+        The file is re-read on every cycle, so ASINs can be added while the daemon runs
+
+        Returns:
+            {country: [asin, ...]}
+        """
+        watchlist = {c: list(asins) for c, asins in self.settings.get('watchlist', {}).items()}
+
+        watchlist_file = self.settings.get('watchlist_file')
+        if watchlist_file and Path(watchlist_file).exists():
+            try:
+                with open(watchlist_file) as f:
+                    for country, asins in json.load(f).items():
+                        watchlist.setdefault(country, []).extend(asins)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"⚠ Could not read watchlist file {watchlist_file}: {e}")
+
+        return {country: sorted(set(asins)) for country, asins in watchlist.items()}
+
+    def _scraper(self, country: str):
+        if country not in self.scrapers:
+            from layer3_orchestrator import AmazonScraper
+            scraper = AmazonScraper(self.config_path, budget=self.budget, country=country)
+            scraper.skip_fresh = False  # Every poll must fetch a live BSR
+            # ...of the watched ASIN itself: no sibling variant's page or BSR stands in for it
+            scraper.variant_folding = False
+            scraper.skip_variant_fetch = False
+            scraper.variant_gate = None
+            self.scrapers[country] = scraper
+        return self.scrapers[country]
+
+    async def poll(self, item: Dict) -> bool:
+        """
+        Fetch the current BSR for one watched ASIN and reschedule it
+
+        Args:
+            item: Due watch_state row ({'country', 'asin', 'interval_seconds', 'last_rank', 'misses'})
+
+        Returns:
+            True if a BSR was observed
+        """
+        country, asin = item['country'], item['asin']
+        scraper = self._scraper(country)
+        product = {'asin': asin, 'url': f"https://www.{scraper.domain}/dp/{asin}"}
+
+        with METRICS.label_context(country=country, stage='bsr_tracking'):
+            enriched = await scraper._enrich_product(product, TRACKING_KEYWORD, depth=scraper.DEPTH_BSR)
+
+        # Misses are rescheduled here instead of the batch retry queue
+        scraper.bsr_retry_queue = [e for e in scraper.bsr_retry_queue if e['product'] is not enriched]
+
+        bsr_subcategories = (enriched or {}).get('bsr_subcategories')
+        if enriched and (enriched.get('variant_of') or enriched.get('bsr_from')):
+            bsr_subcategories = None  # A sibling's rank is not this ASIN's observation
+        if not bsr_subcategories:
+            logger.warning(f"    ⚠ {country.upper()} {asin}: no BSR (miss {item['misses'] + 1}) - "
+                           f"retrying in {self.policy['min_interval'] / 60:.0f} min")
+            self.store.record_miss(country, asin, self.policy['min_interval'])
+            return False
+
+        rank = bsr_subcategories[0]['rank']
+        interval = next_interval(item['interval_seconds'], item['last_rank'], rank, self.policy)
+        self.store.record(country, asin, bsr_subcategories, interval)
+
+        move = f"{item['last_rank']} → {rank}" if item['last_rank'] else f"{rank}"
+        logger.info(f"    ✓ {country.upper()} {asin}: BSR {move} | next poll in {interval / 60:.0f} min")
+        return True
+
+    async def run_once(self) -> int:
+        """
+        Poll every ASIN that is due
+
+        Returns:
+            Number of BSR observations recorded
+        """
+        self.store.sync_watchlist(self.load_watchlist(), self.policy['initial_interval'])
+        due = self.store.due(time.time())
+        if not due:
+            return 0
+
+        logger.info(f"\n{'='*70}")
+        logger.info(f"BSR TRACKING: {len(due)} ASINs due ({datetime.now().strftime('%Y-%m-%d %H:%M')})")
+        logger.info(f"{'='*70}")
+
+        # Each country's scraper semaphore limits concurrency
+        outcomes = await asyncio.gather(*[self.poll(item) for item in due])
+        observed = sum(1 for found in outcomes if found)
+        logger.info(f"  {observed}/{len(due)} observations | {self.budget.requests} requests since start")
+        return observed
+
+    async def run(self):
+        """Poll forever, sleeping until the next ASIN is due"""
+        logger.info(f"✓ BSR tracker started ({self.store.db_path})")
+        while True:
+            await self.run_once()
+
+            next_due = self.store.next_due()
+            wait = MAX_IDLE_SECONDS if next_due is None else next_due - time.time()
+            await asyncio.sleep(min(max(wait, 1), MAX_IDLE_SECONDS))
+
+    def close(self):
+        """Close the time-series store and the scrapers' ASIN stores"""
+        for scraper in self.scrapers.values():
+            if scraper.asin_store:
+                scraper.asin_store.close()
+            if scraper.search_cache:
+                scraper.search_cache.close()
+        self.store.close()
+
+
+def main():
+    """Entry point for the BSR tracking daemon"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Continuous BSR tracking")
+    parser.add_argument('command', choices=['run', 'once', 'status'], nargs='?', default='run')
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    args = parser.parse_args()
+
+    tracker = BSRTracker(args.config)
+    try:
+        if args.command == 'run':
+            asyncio.run(tracker.run())
+        elif args.command == 'once':
+            asyncio.run(tracker.run_once())
+        else:
+            tracker.store.sync_watchlist(tracker.load_watchlist(), tracker.policy['initial_interval'])
+            print(json.dumps(tracker.store.state(), indent=2))
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    finally:
+        tracker.close()
+
+
+if __name__ == '__main__':
+    main()
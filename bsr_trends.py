@@ -0,0 +1,442 @@
+"""
+BSR TRENDS: Cross-Run Rank Movement
+- Ingests saved runs incrementally (via each country's run manifest) into a SQLite store
+  keyed by (country, ASIN, BSR category)
+- Per key: latest and previous rank, exponential moving average, best rank, number of points,
+  all updated in place as each new run is ingested
+- Movers and losers between the two latest observations, overall and per keyword
+- Feeds a trend section to the AI analysis prompt, or exports to JSON
+
+Usage:
+    python bsr_trends.py ingest                   # ingest new runs of every configured country
+    python bsr_trends.py movers --country uk      # top movers/losers of the latest run
+    python bsr_trends.py export --country uk      # write output/bsr_trends_{country}_{timestamp}.json
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from run_manifest import RunManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 5  # Moving average span in runs (EMA alpha = 2 / (window + 1))
+DEFAULT_LIMIT = 5  # Movers/losers listed per group
+
+
+def _movement(row: Dict) -> Dict:
+    """Add delta (positive = rank improved) and relative change to a stats row"""
+    row['delta'] = row['prev_rank'] - row['last_rank']
+    row['change'] = row['delta'] / row['prev_rank']
+    return row
+
+
+def _split_movers(rows: List[Dict], limit: int) -> Dict[str, List[Dict]]:
+    """Biggest relative improvements and drops"""
+    ranked = sorted(rows, key=lambda r: r['change'], reverse=True)
+    return {
+        'movers': [r for r in ranked if r['delta'] > 0][:limit],
+        'losers': [r for r in reversed(ranked) if r['delta'] < 0][:limit]
+    }
+
+
+class TrendStore:
+    """Indexed BSR history across runs with incrementally maintained statistics"""
+
+    def __init__(self, db_path: str, window: int = DEFAULT_WINDOW):
+        """
+        Open (or create) the store
+
+        Args:
+            db_path: Path to SQLite database file
+            window: Moving average span in runs
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.alpha = 2 / (window + 1)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ingested_runs (
+                country TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                ingested_at REAL NOT NULL,
+                consolidated TEXT,
+                PRIMARY KEY (country, run_id)
+            );
+            CREATE TABLE IF NOT EXISTS rank_points (
+                country TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                category TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                PRIMARY KEY (country, asin, category, run_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rank_stats (
+                country TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                category TEXT NOT NULL,
+                level INTEGER NOT NULL,
+                last_run TEXT NOT NULL,
+                last_rank INTEGER NOT NULL,
+                prev_rank INTEGER,
+                moving_avg REAL NOT NULL,
+                best_rank INTEGER NOT NULL,
+                points INTEGER NOT NULL,
+                PRIMARY KEY (country, asin, category)
+            );
+            CREATE INDEX IF NOT EXISTS idx_stats_last_run ON rank_stats (country, last_run);
+            CREATE TABLE IF NOT EXISTS keyword_asins (
+                country TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                asin TEXT NOT NULL,
+                search_position INTEGER,
+                PRIMARY KEY (country, run_id, keyword, asin)
+            ) WITHOUT ROWID;
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(ingested_runs)")}
+        if 'consolidated' not in columns:  # Stores created before re-parsed runs were tracked
+            self.conn.execute("ALTER TABLE ingested_runs ADD COLUMN consolidated TEXT")
+        self.conn.commit()
+
+    def ingested(self, country: str) -> Dict[str, Optional[str]]:
+        """Runs already ingested for a country: {run_id: consolidated file of the ingested entry}"""
+        rows = self.conn.execute("SELECT run_id, consolidated FROM ingested_runs WHERE country = ?", (country,))
+        return dict(rows)
+
+    def latest_run(self, country: str) -> Optional[str]:
+        """Most recent ingested run id (run ids are timestamps)"""
+        return self.conn.execute(
+            "SELECT MAX(run_id) FROM ingested_runs WHERE country = ?", (country,)
+        ).fetchone()[0]
+
+    def ingest_country(self, country: str, country_dir: Path) -> int:
+        """
+        Ingest the country's runs that are not in the store yet, or were re-parsed since (oldest first)
+
+        Args:
+            country: Country code
+            country_dir: Country output directory (holds manifest.jsonl)
+
+        Returns:
+            Number of runs ingested
+        """
+        manifest = RunManifest(country_dir)
+        entries = manifest.pending(self.ingested(country))
+
+        for entry in entries:
+            run = manifest.open_run(entry['run_id'])
+            points = self.ingest_run(country, run.run_id, run.iter_results(), entry['consolidated'])
+            logger.info(f"  ✓ Trends: ingested {country.upper()} run {run.run_id}"
+                        + (" (re-parsed)" if entry.get('reparsed') else "") + f" ({points} rank points)")
+        return len(entries)
+
+    def ingest_run(self, country: str, run_id: str, keyword_results, consolidated: Optional[str] = None) -> int:
+        """
+        Add one run's BSR observations and update the per-key statistics
+
+        Statistics do not depend on ingest order: a run older than a key's latest
+        point (ingested late) rebuilds that key's statistics from its points in run
+        order. A run that was already ingested (a re-parsed entry) replaces its old
+        points, and the statistics of every affected key are rebuilt the same way.
+
+        Args:
+            country: Country code
+            run_id: Run timestamp
+            keyword_results: Iterable of keyword result dicts
+            consolidated: Manifest entry's consolidated file (tells a re-parsed entry apart)
+
+        Returns:
+            Number of rank points added
+        """
+        replaced = self._forget_run(country, run_id)  # Keys of the run's earlier points (re-ingest)
+        seen = set()  # (asin, category) - duplicates carry the same BSR under later keywords
+        points = 0
+
+        for result in keyword_results:
+            if result.get('status') != 'success':
+                continue
+            keyword = result['keyword']
+            for product in result.get('products') or []:
+                asin = product.get('asin')
+                if not asin:
+                    continue
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO keyword_asins (country, run_id, keyword, asin, search_position) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (country, run_id, keyword, asin, product.get('search_position'))
+                )
+                for level, entry in enumerate(product.get('bsr_subcategories') or []):
+                    category = entry.get('category') or ''
+                    if (asin, category) in seen or not entry.get('rank'):
+                        continue
+                    seen.add((asin, category))
+                    if replaced is None:
+                        self._add_point(country, asin, category, level, run_id, entry['rank'])
+                    else:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO rank_points (country, asin, category, run_id, level, rank) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (country, asin, category, run_id, level, entry['rank'])
+                        )
+                    points += 1
+
+        if replaced is not None:
+            for asin, category in replaced | seen:
+                self._rebuild_stats(country, asin, category)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ingested_runs (country, run_id, ingested_at, consolidated) VALUES (?, ?, ?, ?)",
+            (country, run_id, time.time(), consolidated)
+        )
+        self.conn.commit()
+        return points
+
+    def _forget_run(self, country: str, run_id: str) -> Optional[set]:
+        """
+        Remove an already ingested run's points and keyword listings
+
+        Returns:
+            {(asin, category)} of the removed points, or None if the run was not ingested
+        """
+        if not self.conn.execute(
+            "SELECT 1 FROM ingested_runs WHERE country = ? AND run_id = ?", (country, run_id)
+        ).fetchone():
+            return None
+        keys = set(self.conn.execute(
+            "SELECT asin, category FROM rank_points WHERE country = ? AND run_id = ?", (country, run_id)
+        ).fetchall())
+        self.conn.execute("DELETE FROM rank_points WHERE country = ? AND run_id = ?", (country, run_id))
+        self.conn.execute("DELETE FROM keyword_asins WHERE country = ? AND run_id = ?", (country, run_id))
+        return keys
+
+    def _rebuild_stats(self, country: str, asin: str, category: str):
+        """Recompute one key's statistics from its rank points, oldest run first"""
+        rows = self.conn.execute(
+            "SELECT run_id, level, rank FROM rank_points WHERE country = ? AND asin = ? AND category = ? "
+            "ORDER BY run_id",
+            (country, asin, category)
+        ).fetchall()
+        self.conn.execute(
+            "DELETE FROM rank_stats WHERE country = ? AND asin = ? AND category = ?", (country, asin, category)
+        )
+        if not rows:
+            return
+
+        moving_avg = rows[0][2]
+        for _, _, rank in rows[1:]:
+            moving_avg = self.alpha * rank + (1 - self.alpha) * moving_avg
+        last_run, level, last_rank = rows[-1]
+        self.conn.execute(
+            "INSERT INTO rank_stats (country, asin, category, level, last_run, last_rank, prev_rank, "
+            "moving_avg, best_rank, points) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (country, asin, category, level, last_run, last_rank, rows[-2][2] if len(rows) > 1 else None,
+             moving_avg, min(rank for _, _, rank in rows), len(rows))
+        )
+
+    def _add_point(self, country: str, asin: str, category: str, level: int, run_id: str, rank: int):
+        """
+        Insert one rank point and fold it into the key's statistics (one indexed lookup)
+
+        A point older than the key's latest one (a run ingested late) lands mid-history,
+        so the key's statistics are rebuilt from its points instead.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO rank_points (country, asin, category, run_id, level, rank) VALUES (?, ?, ?, ?, ?, ?)",
+            (country, asin, category, run_id, level, rank)
+        )
+        stats = self.conn.execute(
+            "SELECT last_run, last_rank, moving_avg, best_rank, points FROM rank_stats "
+            "WHERE country = ? AND asin = ? AND category = ?",
+            (country, asin, category)
+        ).fetchone()
+
+        if stats is None:
+            self.conn.execute(
+                "INSERT INTO rank_stats (country, asin, category, level, last_run, last_rank, prev_rank, "
+                "moving_avg, best_rank, points) VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?, 1)",
+                (country, asin, category, level, run_id, rank, rank, rank)
+            )
+            return
+
+        last_run, last_rank, moving_avg, best_rank, count = stats
+        if run_id <= last_run:
+            self._rebuild_stats(country, asin, category)
+            return
+
+        self.conn.execute(
+            "UPDATE rank_stats SET level = ?, last_run = ?, last_rank = ?, prev_rank = ?, moving_avg = ?, "
+            "best_rank = ?, points = ? WHERE country = ? AND asin = ? AND category = ?",
+            (level, run_id, rank, last_rank, self.alpha * rank + (1 - self.alpha) * moving_avg,
+             min(best_rank, rank), count + 1, country, asin, category)
+        )
+
+    def movers(self, country: str, run_id: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> Dict[str, List[Dict]]:
+        """
+        Main-category rank movement of ASINs observed in a run vs their previous observation
+
+        Args:
+            country: Country code
+            run_id: Run to report on (default: latest ingested)
+            limit: Rows per list
+
+        Returns:
+            {'movers': [...], 'losers': [...]} with asin, category, prev_rank, last_rank,
+            delta (positive = improved), change (relative), moving_avg, best_rank, points
+        """
+        run_id = run_id or self.latest_run(country)
+        rows = self.conn.execute(
+            "SELECT asin, category, prev_rank, last_rank, moving_avg, best_rank, points FROM rank_stats "
+            "WHERE country = ? AND last_run = ? AND level = 0 AND prev_rank IS NOT NULL",
+            (country, run_id)
+        ).fetchall()
+        return _split_movers([_movement(self._stats_row(row)) for row in rows], limit)
+
+    def keyword_movers(self, country: str, run_id: Optional[str] = None,
+                       limit: int = DEFAULT_LIMIT) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        movers() grouped by the keywords that listed each ASIN in the run
+
+        Returns:
+            {keyword: {'movers': [...], 'losers': [...]}} (keywords without movement are omitted)
+        """
+        run_id = run_id or self.latest_run(country)
+        rows = self.conn.execute(
+            "SELECT k.keyword, s.asin, s.category, s.prev_rank, s.last_rank, s.moving_avg, s.best_rank, s.points "
+            "FROM keyword_asins k JOIN rank_stats s ON s.country = k.country AND s.asin = k.asin "
+            "WHERE k.country = ? AND k.run_id = ? AND s.last_run = ? AND s.level = 0 AND s.prev_rank IS NOT NULL",
+            (country, run_id, run_id)
+        ).fetchall()
+
+        by_keyword = {}
+        for keyword, *stats in rows:
+            by_keyword.setdefault(keyword, []).append(_movement(self._stats_row(stats)))
+        grouped = {keyword: _split_movers(items, limit) for keyword, items in by_keyword.items()}
+        return {k: v for k, v in grouped.items() if v['movers'] or v['losers']}
+
+    @staticmethod
+    def _stats_row(row) -> Dict:
+        asin, category, prev_rank, last_rank, moving_avg, best_rank, points = row
+        return {'asin': asin, 'category': category, 'prev_rank': prev_rank, 'last_rank': last_rank,
+                'moving_avg': round(moving_avg, 1), 'best_rank': best_rank, 'points': points}
+
+    def history(self, country: str, asin: str, category: Optional[str] = None) -> List[Dict]:
+        """Rank points of one ASIN (all categories unless one is given), oldest first"""
+        query = "SELECT run_id, category, level, rank FROM rank_points WHERE country = ? AND asin = ?"
+        params = [country, asin]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        rows = self.conn.execute(query + " ORDER BY run_id, level", params).fetchall()
+        return [{'run_id': r, 'category': c, 'level': l, 'rank': rank} for r, c, l, rank in rows]
+
+    def trend_summary(self, country: str, limit: int = DEFAULT_LIMIT) -> Optional[str]:
+        """
+        Markdown lines for the AI analysis prompt
+
+        Returns:
+            Trend summary of the latest run, or None if no ASIN has a previous observation yet
+        """
+        run_id = self.latest_run(country)
+        overall = self.movers(country, run_id, limit)
+        if not overall['movers'] and not overall['losers']:
+            return None
+
+        def fmt(r: Dict) -> str:
+            return (f"{r['asin']} ({r['category']}): #{r['prev_rank']:,} → #{r['last_rank']:,} "
+                    f"({r['change']:+.0%}, moving avg #{r['moving_avg']:,.0f}, best #{r['best_rank']:,})")
+
+        lines = [f"Run {run_id} vs each ASIN's previous observation (positive = rank improved)"]
+        for title, key in (('Top movers', 'movers'), ('Top losers', 'losers')):
+            if overall[key]:
+                lines.append(f"- {title}:")
+                lines.extend(f"  - {fmt(r)}" for r in overall[key])
+
+        per_keyword = self.keyword_movers(country, run_id, limit=1)
+        if per_keyword:
+            lines.append("- By keyword (best mover / worst loser):")
+            for keyword, groups in per_keyword.items():
+                best = fmt(groups['movers'][0]) if groups['movers'] else 'none'
+                worst = fmt(groups['losers'][0]) if groups['losers'] else 'none'
+                lines.append(f"  - {keyword}: ↑ {best} | ↓ {worst}")
+        return '\n'.join(lines)
+
+    def export(self, country: str, path: Path, limit: int = DEFAULT_LIMIT) -> Path:
+        """Write the latest run's movers (overall and per keyword) to a JSON file"""
+        run_id = self.latest_run(country)
+        data = {
+            'country': country,
+            'run_id': run_id,
+            'generated_at': datetime.now().isoformat(),
+            'overall': self.movers(country, run_id, limit),
+            'keywords': self.keyword_movers(country, run_id, limit)
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return Path(path)
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def open_trend_store(config: Dict) -> Optional[TrendStore]:
+    """TrendStore from settings.bsr_trends ({"db_path", "window"}), or None if not configured"""
+    settings = config['settings'].get('bsr_trends')
+    if not settings:
+        return None
+    settings = settings if isinstance(settings, dict) else {}
+    output_dir = Path(config['settings'].get('output_dir', 'output'))
+    return TrendStore(
+        settings.get('db_path', str(output_dir / 'bsr_trends.sqlite')),
+        window=settings.get('window', DEFAULT_WINDOW)
+    )
+
+
+def main():
+    """Entry point for the trend engine"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Cross-run BSR trends")
+    parser.add_argument('command', choices=['ingest', 'movers', 'export'])
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    parser.add_argument('--country', help='Country code (default: all configured countries)')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Movers/losers per list')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    config['settings'].setdefault('bsr_trends', True)
+
+    output_dir = Path(config['settings'].get('output_dir', 'output'))
+    countries = [args.country] if args.country else (
+        config['settings'].get('countries') or [config['settings'].get('country', 'uk')]
+    )
+
+    store = open_trend_store(config)
+    try:
+        for country in countries:
+            store.ingest_country(country, output_dir / country)
+            if args.command == 'movers':
+                print(json.dumps({'country': country, **store.movers(country, limit=args.limit)}, indent=2))
+            elif args.command == 'export':
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                path = store.export(country, output_dir / f"bsr_trends_{country}_{timestamp}.json", args.limit)
+                logger.info(f"✓ Exported: {path}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
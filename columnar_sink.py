@@ -0,0 +1,175 @@
+"""
+COLUMNAR SINK: Parquet Time-Series Output (optional, needs pyarrow)
+- Normalized, typed tables instead of nested JSON
+- observations: one row per (run, keyword, ASIN) with position, price, rating, reviews, main BSR
+- bsr_ranks: one row per BSR entry (the primary, first-subcategory rank and every further subcategory rank)
+- Hive-partitioned by country and date, one new file per run (append-only);
+  country and date are read back from the partition path
+"""
+
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Product fields carried over from the first keyword for duplicate records
+STATIC_FIELDS = ('price', 'currency', 'rating', 'review_count')
+
+
+def _schemas():
+    import pyarrow as pa
+
+    observations = pa.schema([
+        ('run_id', pa.string()),
+        ('scraped_at', pa.timestamp('s')),
+        ('keyword', pa.string()),
+        ('asin', pa.string()),
+        ('position', pa.int32()),
+        ('price', pa.float64()),
+        ('currency', pa.string()),
+        ('rating', pa.float32()),
+        ('review_count', pa.int32()),
+        ('bsr', pa.int32()),
+        ('category', pa.string()),
+        ('is_duplicate', pa.bool_())
+    ])
+    bsr_ranks = pa.schema([
+        ('run_id', pa.string()),
+        ('scraped_at', pa.timestamp('s')),
+        ('keyword', pa.string()),
+        ('asin', pa.string()),
+        ('level', pa.int8()),  # 0 = primary (first subcategory) rank, 1+ = further subcategories
+        ('rank', pa.int32()),
+        ('category', pa.string())
+    ])
+    return observations, bsr_ranks
+
+
+class ColumnarSink:
+    """Writes one run's keyword results as Parquet partitions"""
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: Dataset root (e.g. output/columnar)
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        import pyarrow  # noqa: F401 - fail early if the optional dependency is missing
+
+        self.root = Path(root)
+
+    def _partition_file(self, table: str, country: str, run_time: datetime, run_id: str) -> Path:
+        directory = self.root / table / f"country={country}" / f"date={run_time.strftime('%Y-%m-%d')}"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f"run_{run_id}.parquet"
+
+    def write_run(self, keyword_results: Iterable[Dict], country: str, run_id: str) -> List[Path]:
+        """
+        Write a run's results (one keyword at a time, one row group per keyword)
+
+        Args:
+            keyword_results: Keyword results with 'products' (e.g. ResultStream.iter_keyword_results())
+            country: Country code (partition key)
+            run_id: Run timestamp (YYYYMMDD_HHMMSS)
+
+        Returns:
+            Paths of the written Parquet files
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        observation_schema, bsr_schema = _schemas()
+        run_time = datetime.strptime(run_id, '%Y%m%d_%H%M%S')
+        paths = [
+            self._partition_file('observations', country, run_time, run_id),
+            self._partition_file('bsr_ranks', country, run_time, run_id)
+        ]
+
+        first_seen = {}  # {asin: static fields from the first (non-duplicate) record}
+        observation_writer = pq.ParquetWriter(str(paths[0]), observation_schema)
+        bsr_writer = pq.ParquetWriter(str(paths[1]), bsr_schema)
+        try:
+            for result in keyword_results:
+                observations, ranks = self._keyword_rows(result, run_id, run_time, first_seen)
+                if observations:
+                    observation_writer.write_table(pa.Table.from_pylist(observations, schema=observation_schema))
+                if ranks:
+                    bsr_writer.write_table(pa.Table.from_pylist(ranks, schema=bsr_schema))
+        finally:
+            observation_writer.close()
+            bsr_writer.close()
+
+        return paths
+
+    @staticmethod
+    def _keyword_rows(result: Dict, run_id: str, run_time: datetime, first_seen: Dict):
+        keyword = result.get('keyword')
+        observations = []
+        ranks = []
+
+        for product in result.get('products', []):
+            asin = product.get('asin')
+            if not product.get('is_duplicate'):
+                first_seen[asin] = {field: product.get(field) for field in STATIC_FIELDS}
+            static = first_seen.get(asin, {})
+
+            bsr_subcategories = product.get('bsr_subcategories') or []
+            main = bsr_subcategories[0] if bsr_subcategories else {}
+
+            observations.append({
+                'run_id': run_id,
+                'scraped_at': run_time,
+                'keyword': keyword,
+                'asin': asin,
+                'position': product.get('search_position'),
+                'price': static.get('price'),
+                'currency': static.get('currency'),
+                'rating': static.get('rating'),
+                'review_count': static.get('review_count'),
+                'bsr': main.get('rank'),
+                'category': main.get('category'),
+                'is_duplicate': bool(product.get('is_duplicate'))
+            })
+            ranks.extend({
+                'run_id': run_id,
+                'scraped_at': run_time,
+                'keyword': keyword,
+                'asin': asin,
+                'level': level,
+                'rank': entry.get('rank'),
+                'category': entry.get('category')
+            } for level, entry in enumerate(bsr_subcategories))
+
+        return observations, ranks
+
+
+def load_table(root: Path, table: str = 'observations', country: Optional[str] = None,
+               since: Optional[str] = None):
+    """
+    Scan a columnar table across runs (partition pruning on country and date)
+
+    Args:
+        root: Dataset root (e.g. output/columnar)
+        table: 'observations' or 'bsr_ranks'
+        country: Optional country filter
+        since: Optional first date to include ('YYYY-MM-DD')
+
+    Returns:
+        pyarrow.Table (use .to_pandas() for a DataFrame)
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([('country', pa.string()), ('date', pa.string())]), flavor='hive')
+    dataset = ds.dataset(str(Path(root) / table), format='parquet', partitioning=partitioning)
+    condition = None
+    if country:
+        condition = ds.field('country') == country
+    if since:
+        date_condition = ds.field('date') >= since
+        condition = date_condition if condition is None else condition & date_condition
+    return dataset.to_table(filter=condition)
@@ -0,0 +1,406 @@
+"""
+HTML ARCHIVE: Raw Page Archive & Offline Re-Parse
+- Every page fetched by HTTPClient is appended to a compressed segment file
+  (output/html_archive/{country}/{run_id}_{seq}.warc.gz, one gzip member per WARC record)
+- A SQLite index stores each page's URL, kind, ASIN, country, run, fetch time and byte range
+- `reparse` runs the current ProductParser over a run's archived product pages in a
+  process pool and regenerates that run's output - parser fixes reach past data without re-scraping
+
+Usage:
+    python html_archive.py reparse                     # latest run of every configured country
+    python html_archive.py reparse --country uk --run 20251014_123456 --workers 8
+    python html_archive.py stats
+"""
+
+import os
+import gzip
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from result_stream import ResultStream
+from run_manifest import RunManifest
+from bsr_trends import open_trend_store
+from marketplace_index import open_marketplace_index
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'archive_index.sqlite'
+DEFAULT_SEGMENT_MB = 256
+COMMIT_EVERY = 50  # Index rows buffered between commits (records are already on disk)
+REPARSED_SUFFIX = 'reparsed'
+
+
+def classify_url(url: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Kind of an Amazon page from its URL
+
+    Returns:
+        Tuple of (kind, asin, keyword): ('product', ASIN, None), ('search', None, keyword)
+        or ('other', None, None)
+    """
+    parsed = urlparse(url)
+    parts = [p for p in parsed.path.split('/') if p]
+    for marker in ('dp', 'product'):
+        if marker in parts:
+            position = parts.index(marker)
+            if position + 1 < len(parts):
+                return 'product', parts[position + 1][:10].upper(), None
+    if parts[:1] == ['s']:
+        keyword = parse_qs(parsed.query).get('k', [None])[0]
+        return 'search', None, keyword
+    return 'other', None, None
+
+
+class HTMLArchive:
+    """Append-only archive of one country run's fetched pages"""
+
+    def __init__(self, root: Path, country: str, run_id: str, max_segment_mb: int = DEFAULT_SEGMENT_MB,
+                 part: Optional[str] = None):
+        """
+        Open the archive for writing
+
+        Args:
+            root: Archive directory (holds the index and one folder per country)
+            country: Country code of the pages written by this instance
+            run_id: Run timestamp the pages belong to
+            max_segment_mb: Start a new segment file once the current one reaches this size
+            part: Segment name tag for one of several concurrent writers of the same run
+                  (distributed workers): segments become {run_id}_{part}_{seq}.warc.gz
+        """
+        self.root = Path(root)
+        self.country = country
+        self.run_id = run_id
+        self.part = part
+        self.max_segment_bytes = max_segment_mb * 1024 * 1024
+        self.segment_dir = self.root / country
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+        self.conn = open_index(self.root)
+        self.pending = 0
+        self.pages = 0
+        self.bytes_written = 0
+
+        # A resumed run keeps its timestamp - continue after its existing segments
+        self.seq = 0
+        self._file = None
+        self._open_segment()
+
+    def _segment_path(self, seq: int) -> Path:
+        name = f"{self.run_id}_{self.part}" if self.part else self.run_id
+        return self.segment_dir / f"{name}_{seq:04d}.warc.gz"
+
+    def _open_segment(self):
+        """Open the first segment of this run with room left (append mode)"""
+        while self._segment_path(self.seq).exists() and \
+                self._segment_path(self.seq).stat().st_size >= self.max_segment_bytes:
+            self.seq += 1
+        self._file = open(self._segment_path(self.seq), 'ab')
+
+    def record(self, url: str, html: str) -> Dict:
+        """
+        Append one fetched page and index it
+
+        Args:
+            url: Amazon URL that was fetched
+            html: Page HTML
+
+        Returns:
+            The index entry ({'segment', 'offset', 'length', 'kind', 'asin'})
+        """
+        if self._file.tell() >= self.max_segment_bytes:
+            self._file.close()
+            self.seq += 1
+            self._open_segment()
+
+        fetched_at = time.time()
+        payload = html.encode('utf-8')
+        header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: resource\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            "Content-Type: text/html; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "\r\n"
+        ).encode('utf-8')
+
+        # One gzip member per record: the segment stays a valid .warc.gz and any
+        # record can be decompressed on its own from its byte range
+        data = gzip.compress(header + payload + b"\r\n\r\n", compresslevel=6)
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+
+        kind, asin, keyword = classify_url(url)
+        segment = self._segment_path(self.seq).relative_to(self.root).as_posix()
+        self.conn.execute(
+            "INSERT INTO pages (url, kind, asin, keyword, country, run_id, fetched_at, segment, offset, length) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, kind, asin, keyword, self.country, self.run_id, fetched_at, segment, offset, len(data))
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self.pending = 0
+
+        self.pages += 1
+        self.bytes_written += len(data)
+        return {'segment': segment, 'offset': offset, 'length': len(data), 'kind': kind, 'asin': asin}
+
+    def close(self):
+        """Flush the segment and commit the index"""
+        if self._file and not self._file.closed:
+            self._file.close()
+        self.conn.commit()
+        self.conn.close()
+        if self.pages:
+            logger.info(f"  ✓ HTML archive: {self.pages} pages ({self.bytes_written / 1024 / 1024:.1f} MB compressed)")
+
+
+def open_index(root: Path) -> sqlite3.Connection:
+    """Open (or create) the archive index in root"""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(root / INDEX_FILE), timeout=30)  # Distributed workers share the index
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS pages (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            asin TEXT,
+            keyword TEXT,
+            country TEXT NOT NULL,
+            run_id TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            segment TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_pages_run ON pages (country, run_id, kind, asin);
+    """)
+    conn.commit()
+    return conn
+
+
+def read_record(root: Path, segment: str, offset: int, length: int) -> Tuple[str, str]:
+    """
+    Read one archived page
+
+    Returns:
+        Tuple of (url, html)
+    """
+    with open(Path(root) / segment, 'rb') as f:
+        f.seek(offset)
+        record = gzip.decompress(f.read(length))
+    header, _, block = record.partition(b"\r\n\r\n")
+    fields = dict(line.split(': ', 1) for line in header.decode('utf-8').split("\r\n")[1:])
+    length = int(fields['Content-Length'])
+    return fields.get('WARC-Target-URI'), block[:length].decode('utf-8')
+
+
+def open_html_archive(config: Dict, country: str, run_id: str, part: Optional[str] = None) -> Optional[HTMLArchive]:
+    """
+    HTMLArchive from settings.html_archive ({"path", "max_segment_mb"}), or None if not configured
+
+    part names the segments of one of several concurrent writers of the run (see HTMLArchive)
+    """
+    settings = config['settings'].get('html_archive')
+    if not settings:
+        return None
+    settings = settings if isinstance(settings, dict) else {}
+    return HTMLArchive(
+        archive_root(config),
+        country,
+        run_id,
+        max_segment_mb=settings.get('max_segment_mb', DEFAULT_SEGMENT_MB),
+        part=part
+    )
+
+
+def archive_root(config: Dict) -> Path:
+    """Archive directory from settings.html_archive.path (default output/html_archive)"""
+    settings = config['settings'].get('html_archive')
+    path = settings.get('path') if isinstance(settings, dict) else None
+    return Path(path or Path(config['settings'].get('output_dir', 'output')) / 'html_archive')
+
+
+# ---------------------------------------------------------------------------
+# Offline re-parse
+# ---------------------------------------------------------------------------
+
+_worker_parsers = {}  # {(domain, currency): ProductParser} - one per worker process
+
+
+def _parse_page(task: Tuple) -> Tuple[str, List[Dict], List[str]]:
+    """
+    Process-pool worker: parse one archived product page with the current parser
+
+    Args:
+        task: (root, segment, offset, length, asin, domain, currency)
+
+    Returns:
+        Tuple of (asin, bsr_subcategories, images)
+    """
+    root, segment, offset, length, asin, domain, currency = task
+    parser = _worker_parsers.get((domain, currency))
+    if parser is None:
+        from layer2_parser import ProductParser
+        parser = _worker_parsers[(domain, currency)] = ProductParser(domain=domain, currency=currency)
+
+    _, html = read_record(root, segment, offset, length)
+    _, _, bsr_subcategories, images = parser.parse_product_page(html)
+    return asin, bsr_subcategories, images
+
+
+def reparse_run(root: Path, country: str, country_dir: Path, domain: str, currency: str,
+                run_id: Optional[str] = None, workers: Optional[int] = None) -> Optional[Dict]:
+    """
+    Re-parse a run's archived product pages and write a regenerated copy of its output
+
+    Every product page of the run is parsed (in fetch order); per ASIN, the last page
+    that yields a BSR (and the last that yields images) wins. Products without an
+    archived page - or whose pages still parse to nothing - keep their recorded values.
+
+    Args:
+        root: Archive directory
+        country: Country code
+        country_dir: Country output directory (holds manifest.jsonl)
+        domain: Amazon domain (COUNTRY_CONFIG)
+        currency: Marketplace currency (COUNTRY_CONFIG)
+        run_id: Run to re-parse (default: latest in the manifest)
+        workers: Parser processes (default: CPU count)
+
+    Returns:
+        The new manifest entry, or None if there was nothing to re-parse
+    """
+    manifest = RunManifest(country_dir)
+    run = manifest.open_run(run_id)
+    if run is None:
+        logger.warning(f"  ⚠ {country.upper()}: run {run_id or '(latest)'} not in manifest")
+        return None
+
+    conn = open_index(root)
+    try:
+        rows = conn.execute(
+            "SELECT segment, offset, length, asin FROM pages "
+            "WHERE country = ? AND run_id = ? AND kind = 'product' ORDER BY fetched_at, id",
+            (country, run.run_id)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        logger.warning(f"  ⚠ {country.upper()}: no archived product pages for run {run.run_id}")
+        return None
+
+    logger.info(f"  Re-parsing {len(rows)} product pages of {country.upper()} run {run.run_id}...")
+    start = time.monotonic()
+    tasks = [(str(root), segment, offset, length, asin, domain, currency) for segment, offset, length, asin in rows]
+    bsr_by_asin = {}
+    images_by_asin = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Results come back in task order, so later pages overwrite earlier ones
+        for asin, bsr_subcategories, images in pool.map(_parse_page, tasks, chunksize=max(1, len(tasks) // 64)):
+            if bsr_subcategories:
+                bsr_by_asin[asin] = bsr_subcategories
+            if images:
+                images_by_asin[asin] = images
+    elapsed = time.monotonic() - start
+    logger.info(f"  ✓ Parsed in {elapsed:.1f}s ({len(rows) / max(elapsed, 1e-6):.0f} pages/s) - "
+                f"BSR for {len(bsr_by_asin)} ASINs")
+
+    # Rewrite the run's results through the normal output path
+    timestamp = f"{run.run_id}_{REPARSED_SUFFIX}"
+    stream = ResultStream(country_dir / f"products_{timestamp}.jsonl")
+    changed = 0
+    for result in run.iter_results():
+        for product in result.get('products') or []:
+            asin = product.get('asin')
+            bsr_subcategories = bsr_by_asin.get(asin)
+            if bsr_subcategories and bsr_subcategories != product.get('bsr_subcategories'):
+                product['bsr_subcategories'] = bsr_subcategories
+                changed += 1
+            # Compact duplicate records carry no images
+            if 'images' in product and images_by_asin.get(asin):
+                product['images'] = images_by_asin[asin]
+            stream.write_product(result['keyword'], product)
+        stream.write_keyword(result)
+    stream.close()
+
+    _, consolidated_file, keyword_index = stream.write_views(country_dir, timestamp)
+    entry = manifest.record_run(run.run_id, consolidated_file, keyword_index,
+                                stream_file=stream.path, reparsed=True)
+    logger.info(f"  ✓ {country.upper()}: {changed} product records with a changed BSR → {consolidated_file}")
+    return entry
+
+
+def main():
+    """Entry point for the HTML archive"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Raw HTML archive and offline re-parse")
+    parser.add_argument('command', choices=['reparse', 'stats'])
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    parser.add_argument('--country', help='Only this country (default: all configured countries)')
+    parser.add_argument('--run', help='Run id to re-parse (default: latest run)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parser processes')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    root = archive_root(config)
+
+    if args.command == 'stats':
+        conn = open_index(root)
+        try:
+            rows = conn.execute(
+                "SELECT country, run_id, kind, COUNT(*), SUM(length) FROM pages "
+                "GROUP BY country, run_id, kind ORDER BY country, run_id, kind"
+            ).fetchall()
+        finally:
+            conn.close()
+        for country, run_id, kind, pages, size in rows:
+            print(f"{country:4} {run_id:20} {kind:8} {pages:7} pages {size / 1024 / 1024:8.1f} MB")
+        return
+
+    from layer3_orchestrator import AmazonScraper
+    output_dir = Path(config['settings'].get('output_dir', 'output'))
+    countries = [args.country] if args.country else \
+        (config['settings'].get('countries') or [config['settings'].get('country', 'uk')])
+
+    logger.info(f"\n{'='*70}")
+    logger.info(f"RE-PARSE: {', '.join(c.upper() for c in countries)} ({args.workers} workers)")
+    logger.info(f"{'='*70}")
+    trend_store = open_trend_store(config)
+    index = open_marketplace_index(config)
+    try:
+        for country in countries:
+            country_info = AmazonScraper.COUNTRY_CONFIG[country]
+            entry = reparse_run(root, country, output_dir / country, country_info['domain'],
+                                country_info['currency'], run_id=args.run, workers=args.workers)
+            # The re-parsed entry supersedes the run in stores that already ingested it
+            if entry and trend_store:
+                trend_store.ingest_country(country, output_dir / country)
+            if entry and index:
+                index.ingest_country(country, output_dir / country, country_info['currency'])
+    finally:
+        if trend_store:
+            trend_store.close()
+        if index:
+            index.close()
+
+
+if __name__ == '__main__':
+    main()
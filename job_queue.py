@@ -0,0 +1,531 @@
+"""
+JOB QUEUE: Distributed Worker Mode
+- Shared SQLite job queue of (country, keyword) and (country, ASIN) jobs with leases
+- Expired leases are re-queued, so jobs held by a dead worker are picked up again
+- Workers run the normal AmazonScraper / HTTPClient / ProductParser stack
+- A merge step rebuilds the usual per-country all_keywords_*.json files
+- The queue carries one run id: workers archive pages under it and merge writes its output under it
+
+Usage:
+    python job_queue.py seed              # enqueue keyword jobs from config.json
+    python job_queue.py work              # run a worker (start as many as needed)
+    python job_queue.py status            # show job counts
+    python job_queue.py merge             # write output/{country}/all_keywords_*.json
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import quote_plus
+from typing import Dict, List, Optional
+
+from result_stream import ResultStream
+from run_manifest import RunManifest
+from keyword_source import KeywordSource
+from run_planner import RunBudget, BudgetExhausted
+from html_archive import open_html_archive
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """SQLite-backed job queue with lease expiry"""
+
+    def __init__(self, db_path: str, lease_seconds: float = 300, max_attempts: int = 3):
+        """
+        Open (or create) the queue
+
+        Args:
+            db_path: Path to SQLite database file (must be on storage every worker can reach)
+            lease_seconds: How long a worker owns a job without renewing its lease
+            max_attempts: Leases per job before it is marked failed
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        # isolation_level=None: transactions are managed explicitly (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                country TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL,
+                UNIQUE (kind, country, job_key)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def run_id(self) -> str:
+        """
+        The queue's run id (a run timestamp), set the first time it is asked for
+
+        Workers archive fetched pages under it and merge writes its output under it,
+        so the archived pages belong to the merged run (html_archive.py reparse).
+        """
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('run_id', ?)",
+            (datetime.now().strftime('%Y%m%d_%H%M%S'),)
+        )
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'run_id'").fetchone()[0]
+
+    def enqueue(self, kind: str, country: str, job_key: str, payload: Optional[Dict] = None) -> bool:
+        """
+        Add a job unless the same (kind, country, key) already exists
+
+        Args:
+            kind: 'keyword' or 'asin'
+            country: Country code
+            job_key: Keyword text or ASIN
+            payload: Optional JSON-serializable job input
+
+        Returns:
+            True if a new job was created
+        """
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (kind, country, job_key, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, country, job_key, json.dumps(payload, ensure_ascii=False) if payload is not None else None, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def payload(self, kind: str, country: str, job_key: str) -> Optional[Dict]:
+        """A job's input payload, or None if the job does not exist or has none"""
+        row = self.conn.execute(
+            "SELECT payload FROM jobs WHERE kind = ? AND country = ? AND job_key = ?",
+            (kind, country, job_key)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def requeue(self, kind: str, country: str, job_key: str, payload: Dict):
+        """
+        Replace a job with a fresh pending one carrying a new payload, whatever its status
+
+        The job gets a new id, so a worker still holding the old lease can no longer
+        complete, fail or renew it, and the job is redone with the new payload.
+
+        Args:
+            kind: 'keyword' or 'asin'
+            country: Country code
+            job_key: Keyword text or ASIN
+            payload: New JSON-serializable job input
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO jobs (kind, country, job_key, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, country, job_key, json.dumps(payload, ensure_ascii=False), time.time())
+        )
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """
+        Atomically take the next available job
+
+        Keyword jobs are preferred so ASIN jobs are discovered early.
+        Leased jobs whose lease has expired are treated as available again.
+
+        Args:
+            worker_id: Unique worker identifier
+
+        Returns:
+            Job dict, or None if nothing is available right now
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, kind, country, job_key, payload, attempts FROM jobs "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY CASE kind WHEN 'keyword' THEN 0 ELSE 1 END, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            job_id, kind, country, job_key, payload, attempts = row
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = ?, updated_at = ? "
+                "WHERE id = ?",
+                (worker_id, now + self.lease_seconds, attempts + 1, now, job_id)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return {
+            'id': job_id,
+            'kind': kind,
+            'country': country,
+            'key': job_key,
+            'payload': json.loads(payload) if payload else None,
+            'attempt': attempts + 1
+        }
+
+    def renew(self, job_id: int, worker_id: str) -> bool:
+        """Extend a lease; returns False if the worker no longer owns the job"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (time.time() + self.lease_seconds, time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker_id: str, result: Dict) -> bool:
+        """Store a job's result; ignored if the lease was lost to another worker"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: int, worker_id: str, error: str, attempt: int):
+        """Return a job to the queue, or mark it failed after max_attempts"""
+        status = 'failed' if attempt >= self.max_attempts else 'pending'
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker_id = ? AND status = 'leased'",
+            (status, error[:500], time.time(), job_id, worker_id)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Job counts by status"""
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def is_drained(self) -> bool:
+        """True when no job is pending or leased"""
+        counts = self.counts()
+        return not counts.get('pending') and not counts.get('leased')
+
+    def results(self, kind: str, country: str) -> Dict[str, Dict]:
+        """All finished job results for one kind and country, keyed by job key"""
+        rows = self.conn.execute(
+            "SELECT job_key, result FROM jobs WHERE kind = ? AND country = ? AND status = 'done'",
+            (kind, country)
+        ).fetchall()
+        return {job_key: json.loads(result) for job_key, result in rows}
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def _countries(config: Dict) -> List[str]:
+    countries = config['settings'].get('countries')
+    if countries and isinstance(countries, list):
+        return countries
+    return [config['settings'].get('country', 'uk')]
+
+
+def _queue_path(config: Dict) -> str:
+    distributed = config['settings'].get('distributed', {})
+    return distributed.get('queue_path', str(Path(config['settings']['output_dir']) / 'job_queue.sqlite'))
+
+
+def _open_queue(config: Dict) -> JobQueue:
+    distributed = config['settings'].get('distributed', {})
+    return JobQueue(
+        _queue_path(config),
+        lease_seconds=distributed.get('lease_seconds', 300),
+        max_attempts=distributed.get('max_attempts', 3)
+    )
+
+
+def seed_jobs(config_path: str = "config.json") -> int:
+    """
+    Enqueue one keyword job per (country, keyword) in the config
+
+    Returns:
+        Number of new jobs
+    """
+    with open(config_path) as f:
+        config = json.load(f)
+
+    queue = _open_queue(config)
+    source = KeywordSource.from_config(config)
+    created = 0
+    for country in _countries(config):
+        for keyword in source:  # Streamed, so very large keyword files are fine
+            created += queue.enqueue('keyword', country, keyword)
+    logger.info(f"✓ Seeded {created} keyword jobs → {queue.db_path} (run {queue.run_id()})")
+    queue.close()
+    return created
+
+
+async def _run_keyword_job(scraper, queue: JobQueue, job: Dict) -> Dict:
+    """
+    Fetch and parse a search page, then enqueue one ASIN job per product at the keyword's depth
+
+    Search-depth keywords enqueue nothing. An ASIN already queued at a shallower
+    depth is requeued at this keyword's depth, so every keyword gets at least its tier.
+    """
+    keyword = job['key']
+    country = job['country']
+    search_url = f"https://www.{scraper.domain}/s?k={quote_plus(keyword)}"
+    depth = scraper._depth_for(keyword)
+
+    products = (await scraper._fetch_search_results(keyword))[:scraper.max_products]
+    if depth != scraper.DEPTH_SEARCH:
+        for product in products:
+            payload = {**product, 'depth': depth}
+            if queue.enqueue('asin', country, product['asin'], payload=payload):
+                continue
+            queued = queue.payload('asin', country, product['asin']) or {}
+            if scraper.DEPTHS.index(queued.get('depth', scraper.DEPTH_FULL)) < scraper.DEPTHS.index(depth):
+                queue.requeue('asin', country, product['asin'], payload)
+
+    jobs = 'no ASIN jobs (search depth)' if depth == scraper.DEPTH_SEARCH else 'ASIN jobs'
+    logger.info(f"  ✓ {country.upper()} '{keyword}': {len(products)} products → {jobs}")
+    return {
+        'keyword': keyword,
+        'country': scraper.country,
+        'domain': scraper.domain,
+        'currency': scraper.currency,
+        'search_url': search_url,
+        'scrape_date': datetime.now().isoformat(),
+        'depth': depth,
+        'listings': products  # Search listing per product (position/badges vary per keyword)
+    }
+
+
+async def _run_asin_job(scraper, job: Dict) -> Dict:
+    """Enrich one product via the orchestrator's normal enrichment path, at the depth its keyword asked for"""
+    product = dict(job['payload'])
+    depth = product.pop('depth', scraper.DEPTH_FULL)  # Jobs queued before depth tiers enrich in full
+    scraper.asin_cache.pop(product['asin'], None)  # A re-leased job must enrich in full
+    scraper.asin_depth.pop(product['asin'], None)
+
+    enriched = await scraper._enrich_product(product, current_keyword='', depth=depth)
+
+    # Retry this job's BSR miss here (the scraper's queue is shared by all job loops)
+    entries = [e for e in scraper.bsr_retry_queue if e['product'] is enriched]
+    scraper.bsr_retry_queue = [e for e in scraper.bsr_retry_queue if e['product'] is not enriched]
+    for entry in entries:
+        policy = scraper.retry_policies[entry.get('depth', scraper.DEPTH_FULL)]
+        for attempt in range(2, policy['max_attempts'] + 1):
+            await asyncio.sleep(policy['backoff_seconds'] * 2 ** (attempt - 2))
+            if await scraper._retry_bsr(entry, attempt):  # Upgrades the record in place
+                break
+            if scraper.budget and scraper.budget.exhausted:
+                break
+
+    return enriched
+
+
+async def run_worker(config_path: str = "config.json", worker_id: Optional[str] = None):
+    """
+    Process jobs until the queue is drained
+
+    Runs max_concurrent job loops that share one HTTPClient semaphore per country.
+    settings.budget applies per worker session: one RunBudget is shared by all of
+    this worker's countries and job loops, and other workers have their own.
+
+    Args:
+        config_path: Path to configuration file
+        worker_id: Unique worker name (defaults to host:pid:random)
+    """
+    from layer3_orchestrator import AmazonScraper
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    queue = _open_queue(config)
+    scrapers = {}  # {country: AmazonScraper}
+    budget = RunBudget.from_settings(config['settings'])  # Per worker session
+    run_id = queue.run_id()
+    archive_part = uuid.uuid4().hex[:8]  # Own archive segments: workers never append to the same file
+    processed = 0
+
+    logger.info(f"✓ Worker {worker_id} started ({queue.db_path})")
+
+    async def heartbeat(job_id: int):
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            if not queue.renew(job_id, worker_id):
+                return
+
+    async def job_loop():
+        nonlocal processed
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                if queue.is_drained():
+                    return
+                await asyncio.sleep(5)  # Other workers hold the remaining jobs; their leases may expire
+                continue
+
+            country = job['country']
+            if country not in scrapers:
+                scrapers[country] = AmazonScraper(config_path, country=country, budget=budget)
+                scrapers[country].http_client.archive = open_html_archive(config, country, run_id, part=archive_part)
+            scraper = scrapers[country]
+
+            renewer = asyncio.create_task(heartbeat(job['id']))
+            try:
+                if job['kind'] == 'keyword':
+                    result = await _run_keyword_job(scraper, queue, job)
+                else:
+                    result = await _run_asin_job(scraper, job)
+                queue.complete(job['id'], worker_id, result)
+                processed += 1
+            except BudgetExhausted as e:
+                # Not a job failure: the lease expires and the job is picked up by a later session
+                logger.warning(f"  ⚠ {e} - worker loop stopping before {job['kind']}:{country}:{job['key']}")
+                return
+            except Exception as e:
+                logger.error(f"  ✗ Job {job['kind']}:{country}:{job['key']} failed (attempt {job['attempt']}): {e}")
+                queue.fail(job['id'], worker_id, str(e), job['attempt'])
+            finally:
+                renewer.cancel()
+
+    concurrency = config['settings'].get('max_concurrent', 1)
+    await asyncio.gather(*[job_loop() for _ in range(concurrency)])
+
+    for scraper in scrapers.values():
+        if scraper.http_client.archive:
+            scraper.http_client.archive.close()
+        if scraper.asin_store:
+            scraper.asin_store.close()
+        if scraper.search_cache:
+            scraper.search_cache.close()
+    queue.close()
+    logger.info(f"✓ Worker {worker_id} finished: {processed} jobs")
+
+
+def merge_results(config_path: str = "config.json") -> Dict[str, Path]:
+    """
+    Build output/{country}/all_keywords_*.json from finished jobs, then feed each
+    country's run to the configured side stores (Parquet, BSR trends, marketplace index)
+
+    Keywords keep config order. Each ASIN is enriched once per country; the
+    first keyword that lists it gets the full product, later keywords get the
+    usual duplicate record (with the same BSR). Search-depth keywords get their
+    listings as search-tier records and take no part in that deduplication.
+    Output is written under the queue's run id, so merging again rewrites the same run.
+
+    Returns:
+        Dictionary of {country: consolidated file path}
+    """
+    from layer3_orchestrator import AmazonScraper
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    queue = _open_queue(config)
+    timestamp = queue.run_id()  # The run the workers archived their pages under
+    consolidated_files = {}
+
+    for country in _countries(config):
+        keyword_jobs = queue.results('keyword', country)
+        asin_jobs = queue.results('asin', country)
+        if not keyword_jobs:
+            logger.warning(f"  ⚠ {country.upper()}: no finished keyword jobs")
+            continue
+
+        scraper = AmazonScraper(config_path, country=country)
+        stream = ResultStream(scraper.output_dir / f"products_{timestamp}.jsonl")
+        first_seen = {}  # {asin: first keyword}
+
+        for keyword in KeywordSource.from_config(config):
+            job_result = keyword_jobs.get(keyword)
+            if job_result is None:
+                stream.write_keyword({
+                    'keyword': keyword,
+                    'country': country,
+                    'scrape_date': datetime.now().isoformat(),
+                    'status': 'failed',
+                    'error': 'Keyword job not finished',
+                    'products': []
+                })
+                continue
+
+            count = 0
+            depth = job_result.get('depth', scraper.DEPTH_FULL)
+            for listing in job_result['listings']:
+                asin = listing['asin']
+                if depth == scraper.DEPTH_SEARCH:
+                    stream.write_product(keyword, scraper._search_record(listing, keyword))
+                    count += 1
+                    continue
+
+                enriched = asin_jobs.get(asin)
+                if enriched is None:
+                    continue  # ASIN job failed or still pending
+
+                if asin in first_seen:
+                    product = scraper._build_duplicate(listing, first_seen[asin], enriched.get('bsr_subcategories', []))
+                else:
+                    first_seen[asin] = keyword
+                    product = dict(enriched)
+                    product['search_position'] = listing.get('search_position')
+                    product['badges'] = listing.get('badges', [])
+
+                stream.write_product(keyword, product)
+                count += 1
+
+            header = {k: v for k, v in job_result.items() if k != 'listings'}
+            header['depth'] = depth
+            header.update({'status': 'success', 'total_products': count})
+            stream.write_keyword(header)
+
+        stream.close()
+        if scraper.asin_store:
+            scraper.asin_store.close()
+        _, consolidated_file, keyword_index = stream.write_views(scraper.output_dir, timestamp)
+        RunManifest(scraper.output_dir).record_run(timestamp, consolidated_file, keyword_index, stream_file=stream.path)
+        consolidated_files[country] = consolidated_file
+        logger.info(f"  ✓ {country.upper()}: {consolidated_file}")
+        scraper._update_side_stores(stream, timestamp)
+
+    queue.close()
+    return consolidated_files
+
+
+def main():
+    """Entry point for distributed mode"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Distributed scraping over a shared job queue")
+    parser.add_argument('command', choices=['seed', 'work', 'status', 'merge'])
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    parser.add_argument('--worker-id', help='Worker name (default: host:pid:random)')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        seed_jobs(args.config)
+    elif args.command == 'work':
+        asyncio.run(run_worker(args.config, args.worker_id))
+    elif args.command == 'merge':
+        merge_results(args.config)
+    else:
+        with open(args.config) as f:
+            queue = _open_queue(json.load(f))
+        print(json.dumps(queue.counts(), indent=2))
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+KEYWORD SOURCE: Streaming Keyword Input
+- Reads keywords lazily from the config list or from text/CSV/JSONL files (sharded via glob)
+- Keywords are pulled one at a time, so large lists are never held in memory
+- Tracks a per-shard cursor so a long list can be processed over several sessions
+"""
+
+import os
+import csv
+import glob
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INLINE_SHARD = '<config>'  # Shard name for the keywords list in config.json
+
+
+def _parse_line(line: str, suffix: str) -> Optional[str]:
+    """Extract the keyword from one line of a keyword file (None for blanks, comments, headers)"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    if suffix == '.jsonl':
+        value = json.loads(line)
+        keyword = value.get('keyword') if isinstance(value, dict) else value
+    elif suffix == '.csv':
+        keyword = next(csv.reader([line]))[0]
+        if keyword.strip().lower() == 'keyword':
+            return None  # Header row
+    else:
+        keyword = line
+
+    keyword = str(keyword or '').strip()
+    return keyword or None
+
+
+class KeywordSource:
+    """Lazy keyword iterator over the config list or keyword files"""
+
+    def __init__(self, keywords: Optional[List[str]] = None, paths: Optional[List[str]] = None):
+        """
+        Args:
+            keywords: Inline keyword list (used when no paths are given)
+            paths: Keyword files (.txt one per line, .csv first/'keyword' column, .jsonl string or {"keyword"})
+        """
+        self.keywords = keywords or []
+        self.paths = sorted(paths) if paths else []
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'KeywordSource':
+        """
+        Build from settings.keywords_source ({"path": "keywords/*.txt"}), or config['keywords']
+
+        Raises:
+            FileNotFoundError: If keywords_source matches no files
+        """
+        source = config['settings'].get('keywords_source')
+        if not source:
+            return cls(keywords=config.get('keywords', []))
+
+        patterns = source.get('path') if isinstance(source, dict) else source
+        patterns = [patterns] if isinstance(patterns, str) else patterns
+        paths = [p for pattern in patterns for p in glob.glob(pattern)]
+        if not paths:
+            raise FileNotFoundError(f"keywords_source matched no files: {patterns}")
+        return cls(paths=paths)
+
+    @property
+    def shards(self) -> List[str]:
+        return self.paths or [INLINE_SHARD]
+
+    def iter_shard(self, shard: str, offset: int = 0) -> Iterator[Tuple[str, int]]:
+        """
+        Stream one shard from a cursor
+
+        Args:
+            shard: Shard name (file path, or INLINE_SHARD)
+            offset: Cursor to start from (byte offset for files, index for the config list)
+
+        Yields:
+            (keyword, cursor after this keyword)
+        """
+        if shard == INLINE_SHARD:
+            for index in range(offset, len(self.keywords)):
+                yield self.keywords[index], index + 1
+            return
+
+        suffix = Path(shard).suffix.lower()
+        with open(shard, 'rb') as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                try:
+                    keyword = _parse_line(line.decode('utf-8'), suffix)
+                except (ValueError, UnicodeDecodeError) as e:
+                    logger.warning(f"  ⚠ Skipping unreadable line in {shard}: {e}")
+                    keyword = None
+                if keyword:
+                    yield keyword, f.tell()
+
+    def __iter__(self) -> Iterator[str]:
+        for shard in self.shards:
+            for keyword, _ in self.iter_shard(shard):
+                yield keyword
+
+    def count(self) -> int:
+        """Number of keywords (streams the files, nothing is kept)"""
+        return sum(1 for _ in self)
+
+
+class KeywordProgress:
+    """Per-shard cursors for one country's pass over a keyword source"""
+
+    def __init__(self, path: Path, source: KeywordSource, resume: bool = False):
+        """
+        Args:
+            path: Progress file (e.g. output/uk/keyword_progress.json)
+            source: The keyword source being processed
+            resume: Continue from the saved cursors; otherwise start a new pass
+        """
+        self.path = Path(path)
+        self.source = source
+        self.state = {'shards': source.shards, 'cursors': {}, 'done': 0, 'failed': []}
+
+        if resume and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('shards') == source.shards:
+                self.state = {'failed': [], **saved}
+                logger.info(f"  Keyword progress: {self.state['done']} keywords done in earlier sessions")
+            else:
+                logger.warning("  ⚠ Keyword source changed since the last session - starting a new pass")
+        elif self.path.exists():
+            self.path.unlink()
+
+    @property
+    def done(self) -> int:
+        return self.state['done']
+
+    @property
+    def failed(self) -> List[str]:
+        """Keywords behind the cursors that did not succeed (retried first next session)"""
+        return self.state['failed']
+
+    def pending(self) -> Iterator[Tuple[Optional[str], str, Optional[int]]]:
+        """
+        Stream the keywords not yet done: earlier failures first, then the rest in source order
+
+        Yields:
+            (shard, keyword, cursor after this keyword) - shard and cursor are None
+            for a retried failure
+        """
+        for keyword in list(self.state['failed']):
+            yield None, keyword, None
+        for shard in self.source.shards:
+            for keyword, cursor in self.source.iter_shard(shard, self.state['cursors'].get(shard, 0)):
+                yield shard, keyword, cursor
+
+    def advance(self, shard: Optional[str], cursor: Optional[int], keyword: str, succeeded: bool = True):
+        """
+        Move past a keyword (in memory until save)
+
+        Args:
+            shard: Shard of the keyword (None for a retried failure)
+            cursor: Cursor after the keyword (None for a retried failure)
+            keyword: The keyword
+            succeeded: False keeps the keyword pending in 'failed'
+        """
+        if shard is not None:
+            self.state['cursors'][shard] = cursor
+        if succeeded:
+            if keyword in self.state['failed']:
+                self.state['failed'].remove(keyword)
+            self.state['done'] += 1
+        elif keyword not in self.state['failed']:
+            self.state['failed'].append(keyword)
+
+    def save(self):
+        """
+        Persist the cursors (atomic write)
+
+        Called once the session's output is saved: keywords done in a crashed
+        session are not skipped, they are replayed from the run journal instead.
+        """
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -5,23 +5,33 @@ LAYER 1: HTTP Client & API Communication
 - Builds proxy URLs and authentication
 """
 
+import time
 import asyncio
 import aiohttp
 import logging
 from urllib.parse import urlencode
 from typing import Optional
 
+from run_planner import RunBudget, BudgetExhausted
+from html_archive import HTMLArchive
+from metrics import METRICS, BYTES_BUCKETS
+from tracing import TRACER
+
 logger = logging.getLogger(__name__)
 
 
 class HTTPClient:
     """Handles all HTTP communication with external APIs"""
 
-    def __init__(self, scraperapi_key: str, firecrawl_key: str, country_code: str, semaphore: asyncio.Semaphore):
+    def __init__(self, scraperapi_key: str, firecrawl_key: str, country_code: str, semaphore: asyncio.Semaphore,
+                 budget: Optional[RunBudget] = None, archive: Optional[HTMLArchive] = None):
         self.scraperapi_key = scraperapi_key
         self.firecrawl_key = firecrawl_key
         self.country_code = country_code
         self.semaphore = semaphore
+        self.budget = budget  # Optional hard credit/time limits (shared across countries)
+        self.request_count = 0  # Requests sent to Firecrawl, including retries
+        self.archive = archive  # Optional raw HTML archive (every successfully fetched page)
 
     def build_scraperapi_url(self, amazon_url: str) -> str:
         """
@@ -47,6 +57,7 @@ class HTTPClient:
 
         return f"http://api.scraperapi.com/?{urlencode(params)}"
 
+    @TRACER.traced('fetch_with_firecrawl')
     async def fetch_with_firecrawl(self, url: str) -> Optional[str]:
         """
         Fetch HTML via Firecrawl scrape endpoint using ScraperAPI proxy
@@ -57,12 +68,17 @@ class HTTPClient:
         Returns:
             HTML content as string, or None if failed
 
+        Raises:
+            BudgetExhausted: The run budget refused the request (not a fetch failure:
+                             the page must not be recorded as missing)
+
         Flow:
             1. Wrap Amazon URL with ScraperAPI (for IP rotation)
             2. Send ScraperAPI URL to Firecrawl scrape endpoint
             3. Firecrawl fetches via ScraperAPI proxy
             4. Return raw HTML
         """
+        TRACER.annotate(url=url)
         if not self.firecrawl_key:
             logger.warning("Firecrawl API key not configured")
             return None
@@ -80,8 +96,19 @@ class HTTPClient:
             'formats': ['html']  # Only fetch HTML (not markdown, not extract)
         }
 
-        async with self.semaphore:  # Rate limiting
+        queued_at = time.time_ns()
+        async with self.semaphore, METRICS.in_flight('fetch_in_flight'):  # Rate limiting
+            TRACER.record('fetch.queue', queued_at)
             for attempt in range(3):  # 3 retry attempts
+                if self.budget and not self.budget.charge():
+                    raise BudgetExhausted(f"run budget exhausted: {self.budget.exhausted_reason}")
+                self.request_count += 1
+                if attempt > 0:
+                    METRICS.inc('fetch_retries_total', provider='firecrawl')
+
+                status = 'error'
+                attempt_start = time.perf_counter()
+                attempt_span = TRACER.start_span('fetch.attempt', attempt=attempt + 1, provider='firecrawl')
                 try:
                     async with aiohttp.ClientSession() as session:
                         async with session.post(
@@ -90,12 +117,15 @@ class HTTPClient:
                             json=payload,
                             timeout=aiohttp.ClientTimeout(total=90)
                         ) as response:
+                            status = str(response.status)
                             if response.status == 200:
                                 data = await response.json()
                                 html = data.get('data', {}).get('html', '')
+                                METRICS.observe('html_bytes', len(html), buckets=BYTES_BUCKETS)
 
                                 # Check for suspiciously small HTML (likely error/empty response)
                                 if len(html) < 1000:
+                                    status = 'small_html'
                                     logger.warning(f"  ! Suspicious HTML size: {len(html)} chars - attempt {attempt + 1}/3")
                                     if attempt < 2:
                                         continue  # Retry
@@ -104,6 +134,8 @@ class HTTPClient:
                                         return html  # Return anyway, parser will handle
 
                                 logger.info(f"  + Fetched: {len(html)} chars")
+                                if self.archive:
+                                    self.archive.record(url, html)
                                 return html
                             elif response.status == 429:
                                 logger.warning(f"  ! Rate limit (429) - attempt {attempt + 1}/3")
@@ -111,15 +143,22 @@ class HTTPClient:
                                 logger.warning(f"  ! HTTP {response.status} - attempt {attempt + 1}/3")
 
                 except asyncio.TimeoutError:
+                    status = 'timeout'
                     logger.warning(f"  ! Timeout - attempt {attempt + 1}/3")
                 except Exception as e:
                     logger.warning(f"  ! Error: {str(e)[:50]} - attempt {attempt + 1}/3")
+                finally:
+                    METRICS.observe('fetch_seconds', time.perf_counter() - attempt_start,
+                                    provider='firecrawl', status=status)
+                    TRACER.end_span(attempt_span, status=status)
 
                 # Exponential backoff
                 if attempt < 2:
                     wait_time = 2 ** attempt
                     logger.info(f"  ... Waiting {wait_time}s before retry")
-                    await asyncio.sleep(wait_time)
+                    METRICS.inc('fetch_backoff_seconds_total', wait_time, provider='firecrawl')
+                    with TRACER.span('fetch.backoff', seconds=wait_time):
+                        await asyncio.sleep(wait_time)
 
         logger.error(f"  ✗ Failed to fetch after 3 attempts")
         return None
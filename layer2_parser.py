@@ -6,12 +6,231 @@ LAYER 2: HTML Parser & Data Extractor
 """
 
 import re
+import json
+import time
 import logging
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from typing import List, Dict, Optional, Tuple
 
+from metrics import METRICS, PARSE_BUCKETS
+from tracing import TRACER
+from profiling import PROFILER
+
 logger = logging.getLogger(__name__)
 
+MAX_REVIEW_COUNT = 1000000  # Sanity check: review counts are typically between 1 and 1,000,000
+
+# Variation ("twister") data embedded in product page scripts
+PARENT_ASIN_PATTERN = re.compile(r'"parentAsin"\s*:\s*"([A-Z0-9]{10})"')
+VARIATION_DIMENSIONS_PATTERN = re.compile(r'"dimensions"\s*:\s*(\[[^\]]*\])')
+VARIATION_VALUES_PATTERN = re.compile(r'"dimensionValuesDisplayData"\s*:\s*(\{[^{}]*\})')
+DIMENSION_TO_ASIN_PATTERN = re.compile(r'"dimensionToAsinMap"\s*:\s*(\{[^{}]*\})')
+ASIN_PATTERN = re.compile(r'\b(B[A-Z0-9]{9})\b')
+
+# BSR-only parsing builds a tree for the product details sections only (see _extract_bsr)
+BSR_SECTION_IDS = ['detailBulletsWrapper_feature_div', 'prodDetails', 'detail-bullets',
+                   'productDetails_feature_div', 'detailBullets_feature_div']
+PRODUCT_FACTS_CLASS = re.compile(r'product-facts|prodDetTable', re.I)
+BSR_SECTIONS_STRAINER = SoupStrainer('div', attrs={'id': BSR_SECTION_IDS})
+PRODUCT_FACTS_STRAINER = SoupStrainer('div', attrs={'class': PRODUCT_FACTS_CLASS})
+
+
+class SearchResultPlan:
+    """
+    Extraction plan for search result containers, compiled once per parser
+
+    All fields of a container are collected in a single walk over its descendants:
+    each tag is dispatched on its name to the field slots it can fill, keeping the
+    first match in document order (the same element the per-field find() calls
+    used to return). Sponsored containers stop the walk as soon as the label is seen.
+    """
+
+    def __init__(self, domain: str):
+        """
+        Args:
+            domain: Amazon domain (product URLs are built on it)
+        """
+        self.domain = domain
+        self.product_url_prefix = f"https://www.{domain}/dp/"
+
+        # Labels stay multi-language: pages are requested with an English Accept-Language,
+        # but EU markets still serve a mix of English and local labels
+        self.sponsored = re.compile(r'Sponsored|Patrocinado|Gesponsert|Sponsorisé', re.I)
+        self.ratings_label = re.compile(r'^[\d,\.]+\s+ratings?$', re.I)  # US/UK: "3,032 ratings" (not "... stars, rating details")
+        self.ratings_label_de = re.compile(r'\d+.*Bewertungen', re.I)  # DE: "320 Bewertungen"
+        self.review_span_class = re.compile(r'puis-normal-weight-text|a-size-mini')
+        self.badge_class = re.compile(r'badge|a-badge', re.I)
+        self.number = re.compile(r'([\d,\.]+)')
+        self.bare_number = re.compile(r'^([\d,\.]+)$')
+        self.parenthesized_number = re.compile(r'^\(([\d,\.]+)\)$')
+        self.any_parenthesized_number = re.compile(r'\(([\d,\.]+)\)')
+        self.rating_value = re.compile(r'([\d]+[.,][\d]+)')  # "4.3 out of 5", "4,3 von 5 Sternen"
+
+    def product_url(self, asin: str) -> str:
+        """Product URL built from the ASIN"""
+        return self.product_url_prefix + asin
+
+    def extract(self, div) -> Optional[Dict]:
+        """
+        Collect all fields of one result container in a single tree walk
+
+        Args:
+            div: Search result container
+
+        Returns:
+            {'title', 'price', 'rating', 'review_count', 'badges', 'main_image'},
+            or None if the result is sponsored
+        """
+        title = price_whole = price_fraction = rating = image = None
+        ratings_link = ratings_link_de = reviews_block = None
+        underline_spans = []
+        review_spans = []
+        badge_containers = []
+
+        for tag in div.descendants:
+            name = tag.name
+            if name == 'span':
+                text = tag.string
+                if text is not None and self.sponsored.search(text):
+                    return None
+                classes = tag.get('class') or ()
+                if not classes:
+                    continue
+                if price_whole is None and 'a-price-whole' in classes:
+                    price_whole = tag
+                if price_fraction is None and 'a-price-fraction' in classes:
+                    price_fraction = tag
+                if rating is None and 'a-icon-alt' in classes:
+                    rating = tag
+                if 's-underline-text' in classes:
+                    underline_spans.append(tag)
+                if any(self.review_span_class.search(c) for c in classes):
+                    review_spans.append(tag)
+                if any(self.badge_class.search(c) for c in classes):
+                    badge_containers.append(tag)
+            elif name == 'div':
+                if reviews_block is None and tag.get('data-cy') == 'reviews-block':
+                    reviews_block = tag
+                classes = tag.get('class')
+                if classes and any(self.badge_class.search(c) for c in classes):
+                    badge_containers.append(tag)
+            elif name == 'a':
+                label = tag.get('aria-label')
+                if label:
+                    if ratings_link is None and self.ratings_label.search(label):
+                        ratings_link = tag
+                    if ratings_link_de is None and self.ratings_label_de.search(label):
+                        ratings_link_de = tag
+            elif name == 'h2':
+                if title is None:
+                    title = tag
+            elif name == 'img':
+                if image is None and 's-image' in (tag.get('class') or ()):
+                    image = tag
+
+        return {
+            'title': title.get_text(strip=True) if title else '',
+            'price': self._price(price_whole, price_fraction),
+            'rating': self._rating(rating),
+            'review_count': self._review_count(ratings_link, reviews_block, underline_spans,
+                                               ratings_link_de, review_spans),
+            'badges': self._badges(badge_containers),
+            'main_image': image.get('src', '') if image else ''
+        }
+
+    def _price(self, price_whole, price_fraction) -> Optional[float]:
+        """Price from the whole/fraction spans"""
+        if price_whole and price_fraction:
+            try:
+                # Handle different decimal separators (UK uses ., EU uses ,)
+                whole = price_whole.get_text(strip=True).replace(',', '').replace('.', '')
+                fraction = price_fraction.get_text(strip=True)
+                return float(f"{whole}.{fraction}")
+            except (ValueError, AttributeError):
+                return None
+        return None
+
+    def _rating(self, rating_elem) -> Optional[float]:
+        """Rating (out of 5) - handles both period and comma decimal separators"""
+        if rating_elem:
+            match = self.rating_value.search(rating_elem.get_text())
+            if match:
+                try:
+                    return float(match.group(1).replace(',', '.'))
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    def _count(number: str) -> Optional[int]:
+        """Review count from "12,581" / "1.234" / "320" (None if invalid or implausible)"""
+        try:
+            count = int(number.replace(',', '').replace('.', ''))
+        except ValueError:
+            return None
+        return count if 1 <= count < MAX_REVIEW_COUNT else None
+
+    def _review_count(self, ratings_link, reviews_block, underline_spans, ratings_link_de, review_spans) -> int:
+        """
+        Number of reviews (multi-language), from the candidates collected by the walk
+
+        UK/US format: <a aria-label="12,581 ratings"><span>12,581</span></a>
+        US alt format: <a aria-label="3,032 ratings"><span>(3K)</span></a>
+        German format: <a aria-label="320 Bewertungen">(320)</a>
+        """
+        # Method 1: US/UK aria-label "X ratings" (US has the full count in the aria-label)
+        if ratings_link:
+            match = self.number.search(ratings_link.get('aria-label', ''))
+            count = self._count(match.group(1)) if match else None
+            if count:
+                return count
+
+        # Method 2: s-underline-text span inside the reviews block (UK: actual number visible)
+        if reviews_block:
+            rating_span = next((span for span in underline_spans
+                                if any(parent is reviews_block for parent in span.parents)), None)
+            if rating_span:
+                match = self.bare_number.search(rating_span.get_text(strip=True))
+                count = self._count(match.group(1)) if match else None
+                if count:
+                    return count
+
+        # Method 3: German-style aria-label "320 Bewertungen"
+        if ratings_link_de:
+            match = self.number.search(ratings_link_de.get('aria-label', ''))
+            count = self._count(match.group(1)) if match else None
+            if count:
+                return count
+
+        # Method 4: Text in parentheses like "(320)" near ratings (some German formats)
+        for span in review_spans:
+            match = self.parenthesized_number.search(span.get_text(strip=True))
+            count = self._count(match.group(1)) if match else None
+            if count:
+                return count
+
+        # Method 5: Fallback - any number in parentheses in reviews block
+        if reviews_block:
+            match = self.any_parenthesized_number.search(reviews_block.get_text())
+            count = self._count(match.group(1)) if match else None
+            if count:
+                return count
+
+        return 0
+
+    def _badges(self, badge_containers: List) -> List[str]:
+        """Badges (Best Seller, Amazon's Choice, etc.), without duplicates or nested repeats"""
+        badges = []
+        seen_badges = set()
+        for container in badge_containers:
+            badge_text = container.get_text(separator=' ', strip=True)
+            # Filter: meaningful length, not duplicate, not substring
+            if badge_text and 5 < len(badge_text) < 100:
+                if badge_text not in seen_badges and not any(badge_text in s or s in badge_text for s in seen_badges):
+                    badges.append(badge_text)
+                    seen_badges.add(badge_text)
+        return badges
+
 
 class ProductParser:
     """Extracts structured product data from Amazon HTML"""
@@ -19,7 +238,18 @@ class ProductParser:
     def __init__(self, domain: str, currency: str):
         self.domain = domain
         self.currency = currency
-
+        self.search_plan = SearchResultPlan(domain)
+
+    def _timed(self, extractor: str, func, *args):
+        """Run an extractor and record its duration in the parse_seconds histogram"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            METRICS.observe('parse_seconds', time.perf_counter() - start, buckets=PARSE_BUCKETS, extractor=extractor)
+
+    @TRACER.traced()
+    @PROFILER.profiled
     def parse_search_results(self, html: str) -> List[Dict]:
         """
         Extract product list from search results page
@@ -30,13 +260,34 @@ class ProductParser:
         Returns:
             List of product dictionaries with basic data
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        products = []
+        start = time.perf_counter()
+        soup = self._timed('soup', BeautifulSoup, html, 'html.parser')
 
         # Find all product containers
-        product_divs = soup.find_all('div', {'data-component-type': 's-search-result'})
+        product_divs = self.find_result_containers(soup)
         logger.info(f"  Found {len(product_divs)} product containers")
 
+        products = self.extract_search_results(product_divs)
+
+        logger.info(f"  ✓ Extracted {len(products)} valid products")
+        METRICS.observe('parse_seconds', time.perf_counter() - start, buckets=PARSE_BUCKETS, extractor='search_page')
+        return products
+
+    def find_result_containers(self, soup) -> List:
+        """Search result containers of a parsed search page, in page order"""
+        return soup.find_all('div', {'data-component-type': 's-search-result'})
+
+    def extract_search_results(self, product_divs: List) -> List[Dict]:
+        """
+        Run the extraction plan over result containers
+
+        Args:
+            product_divs: Containers from find_result_containers
+
+        Returns:
+            Product dicts of the non-sponsored results, with search_position (1-indexed)
+        """
+        products = []
         position_counter = 0  # Track non-sponsored position
 
         for idx, div in enumerate(product_divs, 1):
@@ -46,35 +297,25 @@ class ProductParser:
                 if not asin or len(asin) != 10 or asin.startswith('000'):
                     continue
 
-                # Skip sponsored products
-                if self._is_sponsored(div):
+                # One walk over the container; None for sponsored products
+                fields = self._timed('search_result', self.search_plan.extract, div)
+                if fields is None:
                     continue
 
                 # Increment position for non-sponsored products
                 position_counter += 1
 
-                # Extract all basic fields
-                title = self._extract_title(div)
-                price = self._extract_price(div)
-                rating = self._extract_rating(div)
-                review_count = self._extract_review_count(div)
-                badges = self._extract_badges(div)
-                image_url = self._extract_image(div)
-
-                # Build product URL from ASIN
-                product_url = f"https://www.{self.domain}/dp/{asin}"
-
                 product = {
                     'asin': asin,
                     'search_position': position_counter,  # Add position (1-indexed)
-                    'title': title,
-                    'price': price,
+                    'title': fields['title'],
+                    'price': fields['price'],
                     'currency': self.currency,
-                    'rating': rating,
-                    'review_count': review_count,
-                    'badges': badges,
-                    'url': product_url,
-                    'main_image': image_url
+                    'rating': fields['rating'],
+                    'review_count': fields['review_count'],
+                    'badges': fields['badges'],
+                    'url': self.search_plan.product_url(asin),
+                    'main_image': fields['main_image']
                 }
 
                 products.append(product)
@@ -83,9 +324,10 @@ class ProductParser:
                 logger.error(f"  ✗ Error parsing product {idx}: {e}")
                 continue
 
-        logger.info(f"  ✓ Extracted {len(products)} valid products")
         return products
 
+    @TRACER.traced()
+    @PROFILER.profiled
     def parse_product_page(self, html: str) -> Tuple[Optional[int], Optional[str], List[Dict[str, any]], List[str]]:
         """
         Extract detailed data from individual product page
@@ -100,179 +342,26 @@ class ProductParser:
             - bsr_subcategories: List of ALL subcategory dicts with rank and category
             - images_list: List of all product image URLs
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        start = time.perf_counter()
+        soup = self._timed('soup', BeautifulSoup, html, 'html.parser')
 
         # Extract BSR (Best Sellers Rank) - now returns primary + all subcategories
-        bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr(soup, html)
+        bsr_rank, bsr_category, bsr_subcategories = self._timed('bsr', self._extract_bsr, soup, html)
 
         # Extract product images
-        images = self._extract_product_images(soup)
-
-        return bsr_rank, bsr_category, bsr_subcategories, images
-
-    def _is_sponsored(self, div) -> bool:
-        """Check if product is sponsored (multi-language)"""
-        sponsored_span = div.find('span', text=re.compile(r'Sponsored|Patrocinado|Gesponsert|Sponsorisé', re.I))
-        return sponsored_span is not None
-
-    def _extract_title(self, div) -> str:
-        """Extract product title"""
-        title_elem = div.find('h2')
-        return title_elem.get_text(strip=True) if title_elem else ''
-
-    def _extract_price(self, div) -> Optional[float]:
-        """Extract product price"""
-        price_whole = div.find('span', class_='a-price-whole')
-        price_fraction = div.find('span', class_='a-price-fraction')
-
-        if price_whole and price_fraction:
-            try:
-                # Handle different decimal separators (UK uses ., EU uses ,)
-                whole = price_whole.get_text(strip=True).replace(',', '').replace('.', '')
-                fraction = price_fraction.get_text(strip=True)
-                price_str = f"{whole}.{fraction}"
-                return float(price_str)
-            except (ValueError, AttributeError):
-                return None
-        return None
-
-    def _extract_rating(self, div) -> Optional[float]:
-        """Extract product rating (out of 5) - handles both period and comma decimal separators"""
-        rating_elem = div.find('span', class_='a-icon-alt')
-        if rating_elem:
-            rating_text = rating_elem.get_text()
-            # Match ratings with either period or comma as decimal separator
-            # Examples: "4.3 out of 5", "4,3 von 5 Sternen", "4.3 de 5 estrellas"
-            match = re.search(r'([\d]+[.,][\d]+)', rating_text)
-            if match:
-                try:
-                    # Replace comma with period for float conversion
-                    rating_str = match.group(1).replace(',', '.')
-                    return float(rating_str)
-                except ValueError:
-                    return None
-        return None
-
-    def _extract_review_count(self, div) -> int:
-        """
-        Extract number of reviews (multi-language)
-
-        UK/US format: <a aria-label="12,581 ratings"><span>12,581</span></a>
-        US alt format: <a aria-label="3,032 ratings"><span>(3K)</span></a>
-        German format: <a aria-label="320 Bewertungen">(320)</a>
-        """
-        # Method 1: Look for US/UK aria-label with "ratings" (exact format: "X ratings")
-        # Example: aria-label="3,032 ratings" (US specific - has full count in aria-label)
-        # This is checked FIRST for US market products
-        # Pattern must match ONLY "X ratings", NOT "X out of 5 stars, rating details"
-        review_link = div.find('a', {'aria-label': re.compile(r'^[\d,\.]+\s+ratings?$', re.I)})
-        if review_link:
-            aria_text = review_link.get('aria-label', '')
-            # Extract first number from aria-label
-            match = re.search(r'([\d,\.]+)', aria_text)
-            if match:
-                try:
-                    count_str = match.group(1).replace(',', '').replace('.', '')
-                    count = int(count_str)
-                    # Sanity check: review counts are typically between 1 and 1,000,000
-                    if 1 <= count < 1000000:
-                        return count
-                except ValueError:
-                    pass
-
-        # Method 2: Look for <span> inside reviews link with class s-underline-text
-        # This is the PRIMARY method for UK markets (actual number visible)
-        reviews_block = div.find('div', {'data-cy': 'reviews-block'})
-        if reviews_block:
-            # Find the ratings link span
-            rating_span = reviews_block.find('span', class_='s-underline-text')
-            if rating_span:
-                text = rating_span.get_text(strip=True)
-                # Match numbers like: 12,581 or 1.234 or 320
-                match = re.search(r'^([\d,\.]+)$', text)
-                if match:
-                    try:
-                        count_str = match.group(1).replace(',', '').replace('.', '')
-                        count = int(count_str)
-                        # Sanity check: review counts are typically between 1 and 1,000,000
-                        if 1 <= count < 1000000:
-                            return count
-                    except ValueError:
-                        pass
-
-        # Method 3: Look for German-style aria-label with "Bewertungen"
-        # Example: aria-label="320 Bewertungen"
-        review_link_de = div.find('a', {'aria-label': re.compile(r'\d+.*Bewertungen', re.I)})
-        if review_link_de:
-            aria_text = review_link_de.get('aria-label', '')
-            # Extract first number from aria-label
-            match = re.search(r'([\d,\.]+)', aria_text)
-            if match:
-                try:
-                    count_str = match.group(1).replace(',', '').replace('.', '')
-                    count = int(count_str)
-                    if 1 <= count < 1000000:
-                        return count
-                except ValueError:
-                    pass
+        images = self._timed('images', self._extract_product_images, soup)
 
-        # Method 3: Look for text in parentheses like "(320)" near ratings
-        # This appears in some German formats
-        review_spans = div.find_all('span', class_=re.compile(r'puis-normal-weight-text|a-size-mini'))
-        for span in review_spans:
-            text = span.get_text(strip=True)
-            # Match parentheses with number: (320), (1,234), (1.234)
-            match = re.search(r'^\(([\d,\.]+)\)$', text)
-            if match:
-                try:
-                    count_str = match.group(1).replace(',', '').replace('.', '')
-                    count = int(count_str)
-                    if 1 <= count < 1000000:
-                        return count
-                except ValueError:
-                    continue
+        METRICS.observe('parse_seconds', time.perf_counter() - start, buckets=PARSE_BUCKETS, extractor='product_page')
 
-        # Method 4: Fallback - any number in parentheses in reviews block
-        if reviews_block:
-            text = reviews_block.get_text()
-            match = re.search(r'\(([\d,\.]+)\)', text)
-            if match:
-                try:
-                    count_str = match.group(1).replace(',', '').replace('.', '')
-                    count = int(count_str)
-                    if 1 <= count < 1000000:
-                        return count
-                except ValueError:
-                    pass
-
-        return 0
-
-    def _extract_badges(self, div) -> List[str]:
-        """Extract product badges (Best Seller, Amazon's Choice, etc.)"""
-        badges = []
-        seen_badges = set()
-
-        badge_containers = div.find_all(['span', 'div'], class_=re.compile(r'badge|a-badge', re.I))
-        for container in badge_containers:
-            badge_text = container.get_text(separator=' ', strip=True)
-            # Filter: meaningful length, not duplicate, not substring
-            if badge_text and 5 < len(badge_text) < 100:
-                if badge_text not in seen_badges and not any(badge_text in s or s in badge_text for s in seen_badges):
-                    badges.append(badge_text)
-                    seen_badges.add(badge_text)
-
-        return badges
-
-    def _extract_image(self, div) -> str:
-        """Extract main product image URL"""
-        img_elem = div.find('img', class_='s-image')
-        return img_elem.get('src', '') if img_elem else ''
+        return bsr_rank, bsr_category, bsr_subcategories, images
 
-    def _extract_bsr(self, soup, html: str) -> Tuple[Optional[int], Optional[str], List[Dict[str, any]]]:
+    @TRACER.traced()
+    def _extract_bsr(self, soup, html: str, full_tree: bool = True) -> Tuple[Optional[int], Optional[str], List[Dict[str, any]]]:
         """
         Extract Best Sellers Rank with enhanced multi-language support
 
-        Returns primary BSR (first subcategory) + list of ALL subcategories
+        Returns primary BSR (first subcategory) + list of ALL subcategories.
+        With full_tree=False, soup only holds the BSR_SECTION_IDS sections (parse_bsr).
 
         Tries 7 methods (enhanced for DE/IT):
         1-6. Multiple product details sections
@@ -288,6 +377,7 @@ class ProductParser:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(detail_bullets)
             if bsr_rank:
                 logger.debug(f"  BSR found via detailBulletsWrapper: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='detailBulletsWrapper')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 2: Product details section
@@ -296,6 +386,7 @@ class ProductParser:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(prod_info)
             if bsr_rank:
                 logger.debug(f"  BSR found via prodDetails: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='prodDetails')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 3: Detail bullets alternative
@@ -304,6 +395,7 @@ class ProductParser:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(detail_bullets_alt)
             if bsr_rank:
                 logger.debug(f"  BSR found via detail-bullets: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='detail-bullets')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 4: Product details feature div (common on DE/IT)
@@ -312,6 +404,7 @@ class ProductParser:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(product_details_feature)
             if bsr_rank:
                 logger.debug(f"  BSR found via productDetails_feature_div: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='productDetails_feature_div')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 5: Detail bullets feature div (alternative on DE/IT)
@@ -320,14 +413,17 @@ class ProductParser:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(detail_bullets_feature)
             if bsr_rank:
                 logger.debug(f"  BSR found via detailBullets_feature_div: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='detailBullets_feature_div')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 6: Product facts section (sometimes used on EU markets)
-        product_facts = soup.find('div', class_=re.compile(r'product-facts|prodDetTable', re.I))
+        facts_soup = soup if full_tree else self._strained_soup(html, PRODUCT_FACTS_STRAINER)
+        product_facts = facts_soup.find('div', class_=PRODUCT_FACTS_CLASS)
         if product_facts:
             bsr_rank, bsr_category, bsr_subcategories = self._extract_bsr_from_element(product_facts)
             if bsr_rank:
                 logger.debug(f"  BSR found via product-facts: {bsr_rank} ({len(bsr_subcategories)} subcategories)")
+                METRICS.inc('bsr_extractions_total', method='product-facts')
                 return bsr_rank, bsr_category, bsr_subcategories
 
         # Method 7: Multi-language regex patterns (Enhanced for DE/IT)
@@ -377,11 +473,13 @@ class ProductParser:
                     bsr_category = match.group(2).strip() if len(match.groups()) > 1 else None
                     bsr_subcategories = [{"rank": bsr_rank, "category": bsr_category}]  # Single category from regex
                     logger.debug(f"  BSR found via regex pattern #{idx}: {bsr_rank}")
+                    METRICS.inc('bsr_extractions_total', method=f'regex_{idx}')
                     return bsr_rank, bsr_category, bsr_subcategories
                 except (ValueError, IndexError):
                     continue
 
         logger.debug("  BSR extraction failed - no patterns matched")
+        METRICS.inc('bsr_extractions_total', method='none')
         return None, None, []
 
     def _extract_bsr_from_element(self, element) -> Tuple[Optional[int], Optional[str], List[Dict[str, any]]]:
@@ -493,6 +591,76 @@ class ProductParser:
 
         return None, None, []
 
+    @TRACER.traced()
+    @PROFILER.profiled
+    def parse_bsr(self, html: str) -> Tuple[Optional[int], Optional[str], List[Dict[str, any]]]:
+        """
+        Extract only the BSR from a product page (BSR-only enrichment)
+
+        Same methods and order as parse_product_page, but only the product details
+        sections are built into a tree and no image work is done.
+
+        Args:
+            html: Product page HTML
+
+        Returns:
+            Tuple of (bsr_rank, bsr_category, bsr_subcategories)
+        """
+        start = time.perf_counter()
+        soup = self._timed('soup', self._strained_soup, html, BSR_SECTIONS_STRAINER)
+        result = self._timed('bsr', self._extract_bsr, soup, html, False)
+        METRICS.observe('parse_seconds', time.perf_counter() - start, buckets=PARSE_BUCKETS, extractor='bsr_page')
+        return result
+
+    @staticmethod
+    def _strained_soup(html: str, strainer: SoupStrainer):
+        """Soup holding only the elements matched by the strainer (and their subtrees)"""
+        return BeautifulSoup(html, 'html.parser', parse_only=strainer)
+
+    def parse_variations(self, html: str) -> Optional[Dict]:
+        """
+        Extract the parent/variation relationship from a product page's twister data
+
+        Args:
+            html: Product page HTML
+
+        Returns:
+            {'parent_asin', 'dimensions', 'variants': {asin: [dimension values]}},
+            or None if the product has no variations
+        """
+        start = time.perf_counter()
+        try:
+            parent = PARENT_ASIN_PATTERN.search(html)
+            if not parent:
+                return None
+
+            variants = {}
+            values = VARIATION_VALUES_PATTERN.search(html)
+            if values:
+                try:
+                    variants = {asin: list(v) for asin, v in json.loads(values.group(1)).items()}
+                except (ValueError, AttributeError, TypeError):
+                    variants = {asin: [] for asin in ASIN_PATTERN.findall(values.group(1))}
+            if not variants:
+                # Older layout: only "0_1": "ASIN" coordinates, no display values
+                mapping = DIMENSION_TO_ASIN_PATTERN.search(html)
+                if mapping:
+                    variants = {asin: [] for asin in ASIN_PATTERN.findall(mapping.group(1))}
+            if not variants:
+                return None
+
+            dimensions = []
+            match = VARIATION_DIMENSIONS_PATTERN.search(html)
+            if match:
+                try:
+                    dimensions = [d for d in json.loads(match.group(1)) if isinstance(d, str)]
+                except ValueError:
+                    pass
+
+            return {'parent_asin': parent.group(1), 'dimensions': dimensions, 'variants': variants}
+        finally:
+            METRICS.observe('parse_seconds', time.perf_counter() - start, buckets=PARSE_BUCKETS, extractor='variations')
+
     def _extract_product_images(self, soup) -> List[str]:
         """
         Extract ALL main product images including those hidden behind +3 overlay
@@ -6,16 +6,34 @@ LAYER 3: Orchestrator & Main Scraper Logic
 """
 
 import asyncio
+import argparse
 import json
+import math
+import time
 import logging
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import quote_plus
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 from layer1_http_client import HTTPClient
 from layer2_parser import ProductParser
 from layer4_analyzer import AIAnalyzer
+from asin_store import ASINStore
+from search_cache import SearchCache, unchanged_positions
+from keyword_source import KeywordSource, KeywordProgress
+from run_journal import RunJournal
+from result_stream import ResultStream
+from run_manifest import RunManifest
+from run_planner import RunBudget, RunPlanner, BudgetExhausted, append_run_history
+from models import Product, Observation
+from columnar_sink import ColumnarSink
+from bsr_trends import open_trend_store
+from marketplace_index import open_marketplace_index
+from html_archive import open_html_archive
+from metrics import METRICS
+from tracing import TRACER
+from profiling import PROFILER, install_uvloop
 
 logger = logging.getLogger(__name__)
 
@@ -33,24 +51,67 @@ class AmazonScraper:
         'it': {'domain': 'amazon.it', 'currency': 'EUR', 'code': 'it'}
     }
 
-    def __init__(self, config_path: str = "config.json"):
+    # Fields that can only be obtained by fetching the product page
+    PRODUCT_PAGE_FIELDS = ('bsr_subcategories', 'images')
+
+    # Enrichment depth tiers (settings.enrichment), shallowest first. Record fields per tier:
+    #   search: asin, search_position, title, price, currency, rating, review_count, badges, url,
+    #           bsr_subcategories (always empty)
+    #   bsr:    the search fields with bsr_subcategories filled
+    #   full:   the bsr fields plus images
+    # (parent_asin / variant_of / bsr_from are added by variant folding when set)
+    DEPTH_SEARCH = 'search'  # Search listing only - no product page fetch
+    DEPTH_BSR = 'bsr'  # Product page parsed for the rank block only - no images
+    DEPTH_FULL = 'full'  # BSR + images (default)
+    DEPTHS = (DEPTH_SEARCH, DEPTH_BSR, DEPTH_FULL)
+
+    def __init__(self, config_path: str = "config.json", resume: bool = False, budget: Optional[RunBudget] = None,
+                 country: Optional[str] = None, depth: Optional[str] = None):
         """
         Initialize scraper from config file
 
         Args:
             config_path: Path to JSON configuration file
+            resume: Rebuild state from the run journal and only fetch missing work
+            budget: Optional run budget (shared across countries); built from settings if omitted
+            country: Optional country override (defaults to settings.country)
+            depth: Optional run enrichment depth override (defaults to settings.enrichment.depth)
         """
         # Load configuration
         with open(config_path) as f:
             self.config = json.load(f)
 
         # Extract settings
-        self.keywords = self.config['keywords']
+        self.keyword_source = KeywordSource.from_config(self.config)  # Streamed, never loaded in full
+        self.keywords_per_session = self.config['settings'].get('keywords_per_session')  # None = whole list
         self.max_concurrent = self.config['settings']['max_concurrent']
         self.max_products = self.config['settings'].get('max_products_to_scrape', 10)
+        self.search_pages = self.config['settings'].get('search_pages', 1)  # Max search result pages per keyword
+
+        # BSR retry policy (first pass counts as attempt 1; misses are retried at the end)
+        bsr_retry = self.config['settings'].get('bsr_retry', {})
+        self.max_bsr_attempts = bsr_retry.get('max_attempts', 3)
+        self.bsr_retry_backoff = bsr_retry.get('backoff_seconds', 2)
+
+        # Enrichment depth: run default, per-keyword overrides and a retry policy per tier
+        # (tiers without their own policy use bsr_retry)
+        enrichment = self.config['settings'].get('enrichment') or {}
+        self.depth = depth or enrichment.get('depth', self.DEPTH_FULL)
+        self.keyword_depths = {} if depth else enrichment.get('keywords', {})  # {keyword: depth}
+        for tier in [self.depth, *self.keyword_depths.values()]:
+            if tier not in self.DEPTHS:
+                raise ValueError(f"Unknown enrichment depth '{tier}' (expected one of: {', '.join(self.DEPTHS)})")
+        tier_retry = enrichment.get('retry', {})
+        self.retry_policies = {
+            tier: {
+                'max_attempts': tier_retry.get(tier, {}).get('max_attempts', self.max_bsr_attempts),
+                'backoff_seconds': tier_retry.get(tier, {}).get('backoff_seconds', self.bsr_retry_backoff)
+            }
+            for tier in (self.DEPTH_BSR, self.DEPTH_FULL)
+        }
 
         # Country setup
-        country = self.config['settings'].get('country', 'uk')
+        country = country or self.config['settings'].get('country', 'uk')
         country_info = self.COUNTRY_CONFIG.get(country, self.COUNTRY_CONFIG['uk'])
         self.country = country
         self.domain = country_info['domain']
@@ -59,26 +120,98 @@ class AmazonScraper:
 
         # Output directory (organized by country)
         base_output_dir = Path(self.config['settings']['output_dir'])
+        self.base_output_dir = base_output_dir
         self.output_dir = base_output_dir / country
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         # Initialize layers
         semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.budget = budget if budget is not None else RunBudget.from_settings(self.config['settings'])
         self.http_client = HTTPClient(
             scraperapi_key=self.config['api_keys']['scraperapi'],
             firecrawl_key=self.config['api_keys']['firecrawl'],
             country_code=self.country_code,
-            semaphore=semaphore
+            semaphore=semaphore,
+            budget=self.budget
         )
         self.parser = ProductParser(domain=self.domain, currency=self.currency)
 
         # ASIN cache for deduplication within a single run
-        self.asin_cache = {}  # {asin: {full_product_data, first_keyword}}
+        self.asin_cache = {}  # {asin: Product} - static data and first keyword
+        self.asin_depth = {}  # {asin: depth its asin_cache record was enriched at}
+
+        # Deferred BSR retries: [{'keyword', 'product'}]
+        self.bsr_retry_queue = []
+
+        # Run counters (for run history)
+        self.store_hits = 0  # Product pages skipped thanks to the persistent ASIN store
+        self.search_requests = 0  # Search result pages fetched
+
+        # Persistent ASIN store for cross-run reuse (optional)
+        self.asin_store = None
+        self.skip_fresh = True  # Skip product pages whose fields are still fresh in the store
+        store_settings = self.config['settings'].get('asin_store')
+        if store_settings:
+            self.asin_store = ASINStore(
+                db_path=store_settings.get('path', str(base_output_dir / 'asin_store.sqlite')),
+                ttl_hours=store_settings.get('ttl_hours')
+            )
+
+        # Recent search results cache (optional)
+        self.search_cache = None
+        self.refresh_positions = False  # Refetch search pages, reuse data for ASINs that did not move
+        self.stable_asins = {}  # {keyword: ASINs whose search position is unchanged since the last run}
+        self.stable_ttl_hours = None
+        self.search_cache_hits = 0
+        cache_settings = self.config['settings'].get('search_cache')
+        if cache_settings:
+            self.search_cache = SearchCache(
+                db_path=cache_settings.get('path', str(base_output_dir / 'search_cache.sqlite')),
+                ttl_hours=cache_settings.get('ttl_hours', 24)
+            )
+            self.refresh_positions = cache_settings.get('refresh_positions', False)
+            self.stable_ttl_hours = cache_settings.get('stable_ttl_hours', 72)
+            if self.refresh_positions and not self.asin_store:
+                logger.warning("⚠ search_cache.refresh_positions needs asin_store to reuse product data")
+
+        # Optional Parquet time-series output (needs pyarrow)
+        self.columnar_root = None
+        columnar_settings = self.config['settings'].get('columnar_output')
+        if columnar_settings:
+            path = columnar_settings.get('path') if isinstance(columnar_settings, dict) else None
+            self.columnar_root = Path(path or base_output_dir / 'columnar')
+
+        # Optional variant folding: siblings of a fetched variant reuse its BSR and images
+        self.variant_parents = {}  # {child ASIN: parent ASIN}
+        self.variant_families = {}  # {parent ASIN: {'parent', 'source', 'dimensions', 'bsr_subcategories', 'images'}}
+        self.variant_skips = 0  # Product pages not fetched because a sibling's page stood in
+        self.variant_bsr_fills = 0  # Fetched pages without a BSR that got a sibling's BSR
+        variant_settings = self.config['settings'].get('variant_folding')
+        self.variant_folding = bool(variant_settings)
+        self.skip_variant_fetch = isinstance(variant_settings, dict) and variant_settings.get('skip_fetch', False)
+        # Product fetches queue here before checking for a sibling, so siblings listed under the
+        # same keyword beyond the first max_concurrent wait for an earlier fetch. Siblings that get
+        # one of the first max_concurrent slots still all fetch (their parent is not known yet)
+        self.variant_gate = asyncio.Semaphore(self.max_concurrent) if self.skip_variant_fetch else None
+
+        # Optional cross-run BSR trend store and cross-country ASIN index, updated after each saved run
+        self.trends_enabled = bool(self.config['settings'].get('bsr_trends'))
+        self.marketplace_index_enabled = bool(self.config['settings'].get('marketplace_index'))
+
+        # Checkpoint journal and streaming product output (opened by scrape_all)
+        self.resume = resume
+        self.journal = None
+        self.result_stream = None
+        self.run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
         logger.info(f"✓ Initialized Amazon {country.upper()} Scraper")
         logger.info(f"  Domain: {self.domain}")
         logger.info(f"  Concurrency: {self.max_concurrent}")
+        if self.depth != self.DEPTH_FULL or self.keyword_depths:
+            logger.info(f"  Enrichment depth: {self.depth} ({len(self.keyword_depths)} keyword overrides)")
         logger.info(f"  Output: {self.output_dir}")
+        if self.asin_store:
+            logger.info(f"  ASIN store: {self.asin_store.db_path}")
 
     async def scrape_keyword(self, keyword: str) -> Dict:
         """
@@ -97,24 +230,32 @@ class AmazonScraper:
         search_url = f"https://www.{self.domain}/s?k={quote_plus(keyword)}"
 
         try:
-            # Step 1: Fetch search results page
-            html = await self.http_client.fetch_with_firecrawl(search_url)
-            if not html:
-                raise Exception("Failed to fetch search page")
-
-            # Step 2: Parse search results
-            products = self.parser.parse_search_results(html)
-            logger.info(f"  Extracted {len(products)} products from search")
+            products = self.journal.get_search_page(keyword)
+            if products is not None:
+                logger.info(f"  ↺ Search page restored from journal ({len(products)} products)")
+            else:
+                # Steps 1-2: Fetch and parse search results (or reuse recent cached results)
+                products = self._get_cached_search(keyword)
+                if products is None:
+                    with METRICS.label_context(stage='search'), METRICS.timer('stage_seconds'):
+                        products = await self._fetch_search_results(keyword)
+                    logger.info(f"  Extracted {len(products)} products from search")
+                    self._cache_search(keyword, products)
+                self.journal.record_search_page(keyword, products)
 
             # Step 3: Scrape individual product pages (parallel)
             if products:
                 logger.info(f"  Enriching product data (max: {self.max_products})...")
                 product_tasks = [
-                    self._enrich_product(product, keyword)
+                    self._process_product(product, keyword)
                     for product in products[:self.max_products]
                 ]
-                enriched_products = await asyncio.gather(*product_tasks)
+                with METRICS.label_context(stage='enrich'), METRICS.timer('stage_seconds'):
+                    enriched_products = await asyncio.gather(*product_tasks)
                 products = [p for p in enriched_products if p is not None]
+                if len(products) < len(enriched_products):
+                    # Refused products were neither journaled nor stored: the keyword stays pending
+                    raise BudgetExhausted(f"run budget exhausted: {self.budget.exhausted_reason}")
 
             # Step 4: Build output
             result = {
@@ -124,167 +265,337 @@ class AmazonScraper:
                 'currency': self.currency,
                 'search_url': search_url,
                 'scrape_date': datetime.now().isoformat(),
+                'depth': self._depth_for(keyword),
                 'status': 'success',
                 'total_products': len(products),
                 'products': products
             }
 
             logger.info(f"✓ SUCCESS: {len(products)} products")
+            self.result_stream.write_keyword(result)
             return result
 
+        except BudgetExhausted as e:
+            # Not a scrape failure: the keyword stays pending and its journaled work is reused on --resume
+            logger.warning(f"⚠ BUDGET STOP: '{keyword}' left pending ({e})")
+            error = str(e)
         except Exception as e:
             logger.error(f"✗ FAILED: {e}")
-            return {
-                'keyword': keyword,
-                'country': self.country,
-                'search_url': search_url,
-                'scrape_date': datetime.now().isoformat(),
-                'status': 'failed',
-                'error': str(e),
-                'products': []
-            }
+            error = str(e)
+
+        # Products already streamed for this keyword are dropped from the output (see iter_keyword_results)
+        result = {
+            'keyword': keyword,
+            'country': self.country,
+            'search_url': search_url,
+            'scrape_date': datetime.now().isoformat(),
+            'status': 'failed',
+            'error': error,
+            'products': []
+        }
+        self.result_stream.write_keyword(result)
+        return result
+
+    @TRACER.traced()
+    async def _fetch_search_results(self, keyword: str) -> List[Dict]:
+        """
+        Fetch and parse search results, crawling pages 2..search_pages only when needed
+
+        Deeper pages are fetched concurrently in waves sized from the yield of the
+        pages seen so far, and crawling stops as soon as max_products unique ASINs
+        are collected (or a page comes back empty).
 
-    async def _enrich_product(self, product: Dict, current_keyword: str) -> Optional[Dict]:
+        Args:
+            keyword: Search keyword
+
+        Returns:
+            Merged non-sponsored products with continuous search_position (1..N)
+        """
+        search_url = f"https://www.{self.domain}/s?k={quote_plus(keyword)}"
+
+        self.search_requests += 1
+        html = await self.http_client.fetch_with_firecrawl(search_url)
+        if not html:
+            raise Exception("Failed to fetch search page")
+
+        merged = []
+        seen_asins = set()
+        self._merge_search_page(merged, seen_asins, self.parser.parse_search_results(html))
+
+        next_page = 2
+        while len(merged) < self.max_products and next_page <= self.search_pages:
+            # Size the wave from the average unique yield per page so far
+            avg_yield = max(len(merged) / (next_page - 1), 1)
+            pages_needed = math.ceil((self.max_products - len(merged)) / avg_yield)
+            wave = list(range(next_page, min(next_page + pages_needed, self.search_pages + 1)))
+
+            logger.info(f"  Fetching search pages {wave[0]}-{wave[-1]} ({len(merged)}/{self.max_products} products so far)")
+            self.search_requests += len(wave)
+            pages_html = await asyncio.gather(*[
+                self.http_client.fetch_with_firecrawl(f"{search_url}&page={page}")
+                for page in wave
+            ])
+
+            exhausted = False
+            for page, page_html in zip(wave, pages_html):
+                if not page_html:
+                    logger.warning(f"  ⚠ Search page {page} failed - skipping")
+                    continue
+                page_products = self.parser.parse_search_results(page_html)
+                if not page_products:
+                    exhausted = True  # Past the last page of results
+                    break
+                self._merge_search_page(merged, seen_asins, page_products)
+
+            if exhausted:
+                break
+            next_page += len(wave)
+
+        # Positions continue across pages (sponsored results were already excluded)
+        for position, product in enumerate(merged, 1):
+            product['search_position'] = position
+
+        return merged
+
+    def _get_cached_search(self, keyword: str) -> Optional[List[Dict]]:
+        """Fresh cached search results for the keyword (None if disabled, stale, or in refresh-positions mode)"""
+        if not self.search_cache or self.refresh_positions:
+            return None
+
+        cached = self.search_cache.get(self.country, keyword)
+        if cached is None:
+            return None
+        logger.info(f"  ⚡ Search results fresh in cache ({cached['age_hours']:.1f}h old, {len(cached['products'])} products)")
+        self.search_cache_hits += 1
+        return cached['products']
+
+    def _cache_search(self, keyword: str, products: List[Dict]):
+        """
+        Store fetched search results; in refresh-positions mode, first compare
+        them with the previous ranking to find ASINs that did not move
+        """
+        if not self.search_cache:
+            return
+
+        if self.refresh_positions:
+            previous = self.search_cache.get(self.country, keyword, fresh_only=False)
+            stable = unchanged_positions(previous['products'], products) if previous else set()
+            self.stable_asins[keyword] = stable
+            if previous:
+                logger.info(f"  {len(stable)}/{len(products)} ASINs kept their position since the last run")
+
+        self.search_cache.put(self.country, keyword, products)
+
+    def _merge_search_page(self, merged: List[Dict], seen_asins: set, page_products: List[Dict]):
+        """Append a page's products, skipping ASINs already listed on earlier pages"""
+        for product in page_products:
+            if product['asin'] not in seen_asins:
+                seen_asins.add(product['asin'])
+                merged.append(product)
+
+    async def _process_product(self, product: Dict, current_keyword: str) -> Optional[Dict]:
+        """
+        Enrich a product, reusing the journaled result when resuming
+
+        Args:
+            product: Basic product dict from search results
+            current_keyword: The keyword being processed
+
+        Returns:
+            Enriched product dict, or None if the run budget refused its fetch
+        """
+        asin = product.get('asin')
+        journaled = self.journal.get_product(current_keyword, asin)
+        if journaled is not None:
+            # Rebuild the dedup cache and variant families exactly as the original run did
+            depth = self._depth_for(current_keyword)
+            if depth != self.DEPTH_SEARCH and not journaled.get('is_duplicate') and not self._covers(asin, depth):
+                self.asin_cache[asin] = Product.from_dict(journaled, current_keyword)
+                self.asin_depth[asin] = depth
+            variants = self.journal.get_variants(current_keyword, asin)
+            if variants is not None and self.variant_folding:
+                self._register_variants(asin, variants['variations'], variants['bsr_subcategories'],
+                                        variants['images'])
+            self.result_stream.write_product(current_keyword, journaled)
+            return journaled
+
+        try:
+            with TRACER.span('asin', new_trace=True, asin=asin, keyword=current_keyword, country=self.country):
+                if self.variant_gate:
+                    async with self.variant_gate:
+                        enriched = await self._enrich_product(product, current_keyword)
+                else:
+                    enriched = await self._enrich_product(product, current_keyword)
+        except BudgetExhausted as e:
+            logger.warning(f"    ⚠ {asin}: not fetched ({e})")
+            return None
+        if enriched is not None:
+            self.journal.record_product(current_keyword, enriched)
+            self.result_stream.write_product(current_keyword, enriched)
+        return enriched
+
+    @TRACER.traced()
+    def _search_record(self, product: Dict, keyword: str) -> Dict:
+        """
+        Render a search-tier record (no product page): the listing in the output schema, without images
+
+        Args:
+            product: Basic product dict from search results
+            keyword: The keyword being processed
+
+        Returns:
+            Output record with an empty bsr_subcategories and no parser-internal keys (main_image)
+        """
+        return Observation.from_dict(product).to_dict(Product.from_dict(product, keyword), include_images=False)
+
+    async def _enrich_product(self, product: Dict, current_keyword: str, depth: Optional[str] = None) -> Optional[Dict]:
         """
         Enrich product with data from individual product page
         For duplicates: Still fetches BSR but uses cached data for other fields
 
+        The product page is fetched once. A BSR miss keeps this first-pass result
+        and queues the product for a deferred retry (see _process_bsr_retries),
+        so an unlucky page never holds up the rest of the keyword.
+
         Args:
             product: Basic product dict from search results
             current_keyword: The keyword being processed
+            depth: Enrichment tier (defaults to the keyword's depth): 'search' returns the
+                   listing as is, 'bsr' parses the rank block only, 'full' adds images
 
         Returns:
-            Enriched product dict with BSR and images
+            Enriched product dict with BSR (and images at full depth)
         """
+        depth = depth or self._depth_for(current_keyword)
+        if depth == self.DEPTH_SEARCH:
+            return self._search_record(product, current_keyword)
+
         if not product.get('url'):
             return product
 
         asin = product.get('asin')
-
-        # Check if we've already scraped this ASIN in a previous keyword
-        if asin in self.asin_cache:
-            cached_data = self.asin_cache[asin]
-            logger.info(f"    ⟳ {asin}: DUPLICATE - fetching BSR (first seen in '{cached_data['first_keyword']}')")
+        retry_policy = self.retry_policies[depth]
+
+        # Check if we've already scraped this ASIN in a previous keyword (at this depth or deeper)
+        if asin in self.asin_cache and self._covers(asin, depth):
+            first_keyword = self.asin_cache[asin].first_keyword
+            logger.info(f"    ⟳ {asin}: DUPLICATE - fetching BSR (first seen in '{first_keyword}')")
+
+            # Skip the fetch entirely if the persistent store has a fresh BSR
+            fresh = self._get_fresh_from_store(asin, ['bsr_subcategories'], current_keyword)
+            if fresh is not None:
+                logger.info(f"    ⚡ {asin}: BSR fresh in ASIN store - skipping fetch (duplicate)")
+                self.store_hits += 1
+                return self._build_duplicate(product, first_keyword, fresh['bsr_subcategories'])
+
+            # Skip the fetch if a sibling variant's page was already fetched (skip_fetch mode)
+            family = self._variant_family(asin) if self.skip_variant_fetch else None
+            if family is not None:
+                return self._build_duplicate(self._fold_variant(product, family, fetched=False), first_keyword,
+                                             family['bsr_subcategories'])
 
             try:
-                # BSR Retry Logic for duplicates: Try up to 3 times to get BSR
-                max_bsr_retries = 3
-                bsr_rank = None
-                bsr_category = None
-
-                for attempt in range(1, max_bsr_retries + 1):
-                    # Still fetch product page to get BSR (which should be scraped for every keyword)
-                    html = await self.http_client.fetch_with_firecrawl(product['url'])
-                    if not html:
-                        logger.warning(f"    ⚠ Failed to fetch BSR for {asin} (attempt {attempt}/{max_bsr_retries})")
-                        if attempt < max_bsr_retries:
-                            await asyncio.sleep(2)
-                            continue
-                    else:
-                        # Parse product page for BSR only
-                        bsr_rank, bsr_category, bsr_subcategories, _ = self.parser.parse_product_page(html)
-
-                    # Check if BSR was extracted
-                    if bsr_rank:
-                        logger.info(f"    ✓ {asin}: BSR={bsr_rank} (duplicate, attempt {attempt})")
-                        break
-                    else:
-                        logger.warning(f"    ⚠ No BSR for duplicate {asin} (attempt {attempt}/{max_bsr_retries}) - retrying...")
-                        if attempt < max_bsr_retries:
-                            await asyncio.sleep(2)
-                        else:
-                            logger.warning(f"    ⚠ {asin}: BSR not found after {max_bsr_retries} attempts (duplicate)")
-                            bsr_category = '[REPEATED]'
-
-                # Return product with repeated markers for non-variable data
-                return {
-                    'asin': asin,
-                    'url': product.get('url'),
-                    'search_position': product.get('search_position'),
-                    'title': f"[REPEATED - see '{cached_data['first_keyword']}']",
-                    'price': '[REPEATED]',
-                    'currency': '[REPEATED]',
-                    'rating': '[REPEATED]',
-                    'review_count': '[REPEATED]',
-                    'bsr_subcategories': bsr_subcategories if bsr_subcategories else [],  # Always scraped fresh
-                    'badges': product.get('badges', []),  # Varies per keyword
-                    'images': '[REPEATED]',
-                    'is_duplicate': True,
-                    'first_seen_in': cached_data['first_keyword']
-                }
+                # Still fetch product page to get BSR (which should be scraped for every keyword)
+                bsr_subcategories = []
+                html = await self.http_client.fetch_with_firecrawl(product['url'])
+                if html:
+                    bsr_subcategories, images = self._parse_page(html, depth)
+                    self._record_variants(asin, html, bsr_subcategories, images, current_keyword)
+                else:
+                    logger.warning(f"    ⚠ Failed to fetch BSR for {asin} (attempt 1/{retry_policy['max_attempts']})")
 
+                # A BSR miss is filled from a sibling variant when one has it
+                family = self._variant_family(asin) if not bsr_subcategories else None
+                if family is not None:
+                    bsr_subcategories = family['bsr_subcategories']
+                    self._fold_variant(product, family, fetched=True)
+
+                # Compact record pointing at the first keyword for non-variable data
+                duplicate = self._build_duplicate(product, first_keyword, bsr_subcategories)
+
+                # Sibling data is not written to the store as this ASIN's own
+                if bsr_subcategories and family is None:
+                    logger.info(f"    ✓ {asin}: BSR={bsr_subcategories[0]['rank']} (duplicate)")
+                    self._update_store(asin, {'bsr_subcategories': bsr_subcategories})
+                elif not bsr_subcategories:
+                    self._queue_bsr_retry(duplicate, current_keyword, depth)
+
+                return duplicate
+
+            except BudgetExhausted:
+                raise
             except Exception as e:
                 logger.error(f"    ✗ Error fetching BSR for duplicate {asin}: {e}")
-                return {
-                    'asin': asin,
-                    'url': product.get('url'),
-                    'search_position': product.get('search_position'),
-                    'title': f"[REPEATED - see '{cached_data['first_keyword']}']",
-                    'price': '[REPEATED]',
-                    'currency': '[REPEATED]',
-                    'rating': '[REPEATED]',
-                    'review_count': '[REPEATED]',
-                    'bsr_subcategories': [],
-                    'badges': product.get('badges', []),
-                    'images': '[REPEATED]',
-                    'is_duplicate': True,
-                    'first_seen_in': cached_data['first_keyword']
-                }
+                return self._build_duplicate(product, first_keyword, [])
+
+        # Skip the product page if every page-only field the tier needs is still fresh in the store
+        fields = ['bsr_subcategories'] if depth == self.DEPTH_BSR else self.PRODUCT_PAGE_FIELDS
+        fresh = self._get_fresh_from_store(asin, fields, current_keyword)
+        if fresh is not None:
+            logger.info(f"    ⚡ {asin}: fresh in ASIN store - skipping fetch")
+            self.store_hits += 1
+            product['images'] = fresh.get('images') or []
+            return self._cache_product(product, current_keyword, fresh['bsr_subcategories'] or [], depth)
+
+        # Skip the product page if a sibling variant's page was already fetched (skip_fetch mode)
+        family = self._variant_family(asin) if self.skip_variant_fetch else None
+        if family is not None:
+            self._fold_variant(product, family, fetched=False)
+            product['images'] = family['images'] or ([product['main_image']] if product.get('main_image') else [])
+            return self._cache_product(product, current_keyword, family['bsr_subcategories'], depth)
 
         try:
-            logger.info(f"    Enriching: {asin}")
+            logger.info(f"    Enriching: {asin}" + (" (BSR only)" if depth == self.DEPTH_BSR else ""))
 
-            # BSR Retry Logic: Try up to 3 times to get BSR
-            max_bsr_retries = 3
-            bsr_rank = None
-            bsr_category = None
             bsr_subcategories = []
             images = []
 
-            for attempt in range(1, max_bsr_retries + 1):
-                # Fetch product page
-                html = await self.http_client.fetch_with_firecrawl(product['url'])
-                if not html:
-                    logger.warning(f"    ⚠ Fetch failed for {asin} (attempt {attempt}/{max_bsr_retries})")
-                    if attempt < max_bsr_retries:
-                        await asyncio.sleep(2)  # Wait before retry
-                        continue
-                    else:
-                        # Return with main image only after all retries fail
-                        product['images'] = [product['main_image']] if product.get('main_image') else []
-                        product.pop('main_image', None)
-                        return product
-
-                # Parse product page
-                bsr_rank, bsr_category, bsr_subcategories, images = self.parser.parse_product_page(html)
-
-                # Check if BSR was extracted
-                if bsr_rank:
-                    logger.info(f"    ✓ {asin}: BSR={bsr_rank}, Images={len(images)} (attempt {attempt})")
-                    break  # Success! Exit retry loop
-                else:
-                    logger.warning(f"    ⚠ No BSR found for {asin} (attempt {attempt}/{max_bsr_retries}) - retrying...")
-                    if attempt < max_bsr_retries:
-                        await asyncio.sleep(2)  # Wait before retry
-                    else:
-                        logger.warning(f"    ⚠ {asin}: BSR not found after {max_bsr_retries} attempts")
+            # Fetch product page
+            html = await self.http_client.fetch_with_firecrawl(product['url'])
+            if html:
+                # Parse product page (rank block only at BSR depth)
+                bsr_subcategories, images = self._parse_page(html, depth)
+                parent = self._record_variants(asin, html, bsr_subcategories, images, current_keyword)
+                if parent:
+                    product['parent_asin'] = parent
+            else:
+                logger.warning(f"    ⚠ Fetch failed for {asin} (attempt 1/{retry_policy['max_attempts']})")
 
-            # Update product with enriched data (only bsr_subcategories, no redundant fields)
             if bsr_subcategories:
-                product['bsr_subcategories'] = bsr_subcategories
+                logger.info(f"    ✓ {asin}: BSR={bsr_subcategories[0]['rank']}"
+                            + (f", Images={len(images)}" if depth == self.DEPTH_FULL else ""))
 
             # Use product page images (more complete)
             product['images'] = images if images else ([product['main_image']] if product.get('main_image') else [])
-            product.pop('main_image', None)
+
+            # A BSR miss is filled from a sibling variant when one has it (not stored as this ASIN's own)
+            output_bsr = bsr_subcategories
+            family = self._variant_family(asin) if not bsr_subcategories else None
+            if family is not None:
+                output_bsr = family['bsr_subcategories']
+                product['images'] = images or family['images'] or product['images']
+                self._fold_variant(product, family, fetched=True)
 
             # Cache this ASIN for future keyword lookups
-            self.asin_cache[asin] = {
-                'first_keyword': current_keyword,
-                'product_data': product.copy()
-            }
+            enriched = self._cache_product(product, current_keyword, output_bsr, depth)
 
-            return product
+            # Persist for future runs (BSR only if it was actually found)
+            self._update_store(asin, {
+                'title': product.get('title'),
+                'price': product.get('price'),
+                'rating': product.get('rating'),
+                'review_count': product.get('review_count'),
+                'bsr_subcategories': bsr_subcategories if bsr_subcategories else None,
+                'images': images if images else None
+            })
+
+            if not output_bsr:
+                self._queue_bsr_retry(enriched, current_keyword, depth)
 
+            return enriched
+
+        except BudgetExhausted:
+            raise
         except Exception as e:
             logger.error(f"    ✗ Error enriching {product.get('asin')}: {e}")
             # Return basic product on error
@@ -292,79 +603,507 @@ class AmazonScraper:
             product.pop('main_image', None)
             return product
 
+    def _cache_product(self, product: Dict, current_keyword: str, bsr_subcategories: List[Dict],
+                       depth: str = DEPTH_FULL) -> Dict:
+        """
+        Record a first-seen ASIN in the dedup cache and render its full output record
+
+        Args:
+            product: Search listing with enriched 'images'
+            current_keyword: Keyword that first listed the ASIN
+            bsr_subcategories: BSR found on the product page (may be empty)
+            depth: Enrichment tier ('bsr' records have no images)
+
+        Returns:
+            Full product dict
+        """
+        record = Product.from_dict(product, current_keyword)
+        self.asin_cache[product.get('asin')] = record
+        self.asin_depth[product.get('asin')] = depth
+        return Observation.from_dict(product, bsr_subcategories=bsr_subcategories).to_dict(
+            record, include_images=depth == self.DEPTH_FULL
+        )
+
+    def _depth_for(self, keyword: str) -> str:
+        """Enrichment tier of a keyword (per-keyword override, else the run's depth)"""
+        return self.keyword_depths.get(keyword, self.depth)
+
+    def _covers(self, asin: str, depth: str) -> bool:
+        """True if the ASIN's cached record was enriched at least as deep as depth"""
+        if asin not in self.asin_cache:
+            return False
+        cached = self.asin_depth.get(asin, self.DEPTH_FULL)
+        return self.DEPTHS.index(cached) >= self.DEPTHS.index(depth)
+
+    def _parse_page(self, html: str, depth: str) -> Tuple[List[Dict], List[str]]:
+        """(bsr_subcategories, images) from a product page, parsed only as deep as the tier needs"""
+        if depth == self.DEPTH_BSR:
+            _, _, bsr_subcategories = self.parser.parse_bsr(html)
+            return bsr_subcategories, []
+        _, _, bsr_subcategories, images = self.parser.parse_product_page(html)
+        return bsr_subcategories, images
+
+    def _build_duplicate(self, product: Dict, first_keyword: str, bsr_subcategories: List[Dict]) -> Dict:
+        """Build the output record for an ASIN already enriched under another keyword"""
+        return Observation.from_dict(product, first_seen_in=first_keyword,
+                                     bsr_subcategories=bsr_subcategories or []).to_dict()
+
+    def _record_variants(self, asin: str, html: str, bsr_subcategories: List[Dict], images: List[str],
+                         keyword: Optional[str] = None) -> Optional[str]:
+        """
+        Register the product's variation family from its page (no-op unless variant_folding is set)
+
+        The variation data is journaled with the keyword, so a resumed run rebuilds
+        the same families when it replays the product (see _process_product).
+
+        Returns:
+            Parent ASIN, or None if the product has no variations (or folding is off)
+        """
+        if not self.variant_folding:
+            return None
+        variations = self.parser.parse_variations(html)
+        if not variations:
+            return None
+
+        if self.journal is not None and keyword is not None:
+            self.journal.record_variants(keyword, asin, {
+                'variations': variations, 'bsr_subcategories': bsr_subcategories, 'images': images
+            })
+        return self._register_variants(asin, variations, bsr_subcategories, images)
+
+    def _register_variants(self, asin: str, variations: Dict, bsr_subcategories: List[Dict],
+                           images: List[str]) -> str:
+        """
+        Add a product to its variation family
+
+        The first variant that yields a BSR becomes the family's source: its BSR and
+        images are reused for siblings that are folded instead of fetched.
+
+        Returns:
+            Parent ASIN
+        """
+        parent = variations['parent_asin']
+        family = self.variant_families.setdefault(parent, {
+            'parent': parent, 'source': None, 'dimensions': variations['dimensions'],
+            'bsr_subcategories': [], 'images': []
+        })
+        self.variant_parents[asin] = parent
+        for child in variations['variants']:
+            self.variant_parents.setdefault(child, parent)
+        if bsr_subcategories and family['source'] is None:
+            family.update(source=asin, bsr_subcategories=bsr_subcategories, images=images or [])
+            logger.info(f"    ✓ {asin}: variant of {parent} ({len(variations['variants'])} variants)")
+        return parent
+
+    def _variant_family(self, asin: str) -> Optional[Dict]:
+        """Family of a known variant whose BSR came from a sibling's page (None otherwise)"""
+        family = self.variant_families.get(self.variant_parents.get(asin))
+        if family is None or family['source'] in (None, asin):
+            return None
+        return family
+
+    def _fold_variant(self, product: Dict, family: Dict, fetched: bool) -> Dict:
+        """
+        Mark a product as folded into its variation family (BSR taken from the family source)
+
+        Args:
+            product: Product dict (updated in place)
+            family: The product's variation family
+            fetched: True if the product's own page was requested but had no BSR ('bsr_from'),
+                     False if the sibling's page stood in for an unfetched one ('variant_of')
+        """
+        product['parent_asin'] = family['parent']
+        if fetched:
+            product['bsr_from'] = family['source']
+            self.variant_bsr_fills += 1
+        else:
+            product['variant_of'] = family['source']
+            self.variant_skips += 1
+        logger.info(f"    ⚡ {product.get('asin')}: BSR from sibling {family['source']} (parent {family['parent']}"
+                    + ("" if fetched else ", page not fetched") + ")")
+        return product
+
+    def _queue_bsr_retry(self, product: Dict, keyword: str, depth: str = DEPTH_FULL):
+        """Queue a first-pass BSR miss for a deferred retry (under its tier's retry policy)"""
+        if self.retry_policies[depth]['max_attempts'] <= 1:
+            logger.warning(f"    ⚠ {product.get('asin')}: BSR not found (retries disabled)")
+            return
+        logger.warning(f"    ⚠ No BSR for {product.get('asin')} - queued for deferred retry")
+        self.bsr_retry_queue.append({'keyword': keyword, 'product': product, 'depth': depth})
+        METRICS.set_gauge('bsr_retry_queue_depth', len(self.bsr_retry_queue), keyword=None, stage=None)
+
+    async def _retry_bsr(self, entry: Dict, attempt: int) -> bool:
+        """
+        Refetch one queued product page and upgrade its record in place
+
+        Args:
+            entry: Retry queue entry ({'keyword', 'product', 'depth'})
+            attempt: Attempt number (first pass was attempt 1)
+
+        Returns:
+            True if BSR was found
+        """
+        product = entry['product']
+        asin = product.get('asin')
+        depth = entry.get('depth', self.DEPTH_FULL)
+        max_attempts = self.retry_policies[depth]['max_attempts']
+        METRICS.inc('bsr_retries_total', keyword=entry['keyword'])
+        retry_span = TRACER.span('bsr_retry', new_trace=True, asin=asin, keyword=entry['keyword'], attempt=attempt)
+
+        try:
+            with METRICS.label_context(keyword=entry['keyword']), retry_span:
+                html = await self.http_client.fetch_with_firecrawl(product['url'])
+                if not html:
+                    logger.warning(f"    ⚠ Fetch failed for {asin} (attempt {attempt}/{max_attempts})")
+                    return False
+
+                bsr_subcategories, images = self._parse_page(html, depth)
+            if not bsr_subcategories:
+                logger.warning(f"    ⚠ No BSR found for {asin} (attempt {attempt}/{max_attempts})")
+                return False
+
+        except BudgetExhausted:
+            return False
+        except Exception as e:
+            logger.error(f"    ✗ Error retrying BSR for {asin}: {e}")
+            return False
+
+        logger.info(f"    ✓ {asin}: BSR={bsr_subcategories[0]['rank']} (deferred retry, attempt {attempt})")
+        product['bsr_subcategories'] = bsr_subcategories
+        store_values = {'bsr_subcategories': bsr_subcategories}
+        if not product.get('is_duplicate') and images:
+            product['images'] = images
+            store_values['images'] = images
+            self.asin_cache[asin].images = images
+
+        # Upgrade the already-written record
+        if self.journal:
+            self.journal.record_product(entry['keyword'], product)
+        if self.result_stream:
+            self.result_stream.write_product_update(entry['keyword'], product)
+        self._update_store(asin, store_values)
+        return True
+
+    async def _process_bsr_retries(self):
+        """
+        Retry queued BSR misses in batched rounds with exponential backoff
+        Runs after all keywords, when the first pass no longer needs the capacity.
+        Each enrichment tier retries concurrently under its own policy.
+        """
+        if not self.bsr_retry_queue:
+            return
+        if self.budget and self.budget.exhausted:
+            logger.warning(f"  ⚠ Run budget exhausted - skipping {len(self.bsr_retry_queue)} deferred BSR retries")
+            self.bsr_retry_queue = []
+            return
+
+        logger.info(f"\n  Deferred BSR retries: {len(self.bsr_retry_queue)} products")
+
+        by_depth = {}
+        for entry in self.bsr_retry_queue:
+            by_depth.setdefault(entry.get('depth', self.DEPTH_FULL), []).append(entry)
+        self.bsr_retry_queue = []
+
+        remaining = {depth: len(entries) for depth, entries in by_depth.items()}
+        await asyncio.gather(*[self._retry_rounds(depth, entries, remaining) for depth, entries in by_depth.items()])
+        METRICS.set_gauge('bsr_retry_queue_depth', 0)
+
+    async def _retry_rounds(self, depth: str, pending: List[Dict], remaining: Dict[str, int]):
+        """
+        Retry rounds for one tier's queued misses
+
+        Args:
+            depth: Enrichment tier of the entries
+            pending: Queued entries of that tier
+            remaining: {depth: entries still queued} shared by all tiers (for the queue gauge)
+        """
+        policy = self.retry_policies[depth]
+        attempt = 2
+        while pending and attempt <= policy['max_attempts'] and not (self.budget and self.budget.exhausted):
+            wait_time = policy['backoff_seconds'] * 2 ** (attempt - 2)
+            logger.info(f"  ... {depth.upper()} round {attempt - 1}: waiting {wait_time}s, "
+                        f"then retrying {len(pending)} products")
+            await asyncio.sleep(wait_time)
+
+            with METRICS.label_context(stage='bsr_retry'), METRICS.timer('stage_seconds'):
+                outcomes = await asyncio.gather(*[self._retry_bsr(entry, attempt) for entry in pending])
+            pending = [entry for entry, found in zip(pending, outcomes) if not found]
+            remaining[depth] = len(pending)
+            METRICS.set_gauge('bsr_retry_queue_depth', sum(remaining.values()))
+            attempt += 1
+
+        for entry in pending:
+            logger.warning(f"    ⚠ {entry['product'].get('asin')}: BSR not found after {policy['max_attempts']} attempts")
+
+    def _get_fresh_from_store(self, asin: str, fields, keyword: Optional[str] = None) -> Optional[Dict]:
+        """
+        Look up fields in the persistent ASIN store
+
+        Args:
+            asin: Product ASIN
+            fields: Field names that must ALL be fresh
+            keyword: Current keyword; ASINs that kept their search position for it
+                     (refresh-positions mode) keep static fields fresh for at least stable_ttl_hours
+                     (BSR always keeps its own TTL)
+
+        Returns:
+            Dictionary of fresh values, or None if the store is disabled (or skip_fresh is off) or any field is stale
+        """
+        if not self.asin_store or not asin or not self.skip_fresh:
+            return None
+
+        min_ttl_hours = self.stable_ttl_hours if asin in self.stable_asins.get(keyword, ()) else None
+        fresh = self.asin_store.get_fresh(self.country, asin, fields, min_ttl_hours=min_ttl_hours)
+        if len(fresh) < len(fields):
+            return None
+        return fresh
+
+    def _update_store(self, asin: str, values: Dict):
+        """Write field values to the persistent ASIN store (no-op if disabled)"""
+        if not self.asin_store or not asin:
+            return
+        try:
+            self.asin_store.update(self.country, asin, values)
+        except Exception as e:
+            logger.warning(f"    ⚠ ASIN store update failed for {asin}: {e}")
+
     async def scrape_all(self) -> List[Dict]:
         """
         Scrape all keywords from configuration
         Keywords are processed sequentially to enable ASIN deduplication
 
+        Products are streamed to disk as they are enriched, so the returned
+        results carry keyword metadata only (no 'products' lists).
+
         Returns:
             List of results for all keywords
         """
+        start_time = time.monotonic()
+
+        # Per-shard keyword cursors (lets long lists span several sessions with --resume)
+        progress = KeywordProgress(self.output_dir / 'keyword_progress.json', self.keyword_source, resume=self.resume)
+
         logger.info(f"\n{'*'*70}")
-        logger.info(f"STARTING SCRAPE: {len(self.keywords)} keywords")
+        logger.info(f"STARTING SCRAPE: {self.keyword_source.count() - progress.done} keywords"
+                    + (f" ({progress.done} done in earlier sessions)" if progress.done else ""))
         logger.info(f"ASIN Deduplication: ENABLED (sequential processing)")
         logger.info(f"{'*'*70}\n")
 
+        # Checkpoint journal (crash-safe, enables --resume)
+        self.journal = RunJournal(self.output_dir / 'run_journal.jsonl', resume=self.resume)
+
+        # Streaming product output (results are not kept in memory)
+        self.result_stream = ResultStream(self.output_dir / f"products_{self.run_timestamp}.jsonl")
+
+        # Raw HTML archive for offline re-parsing (optional)
+        self.http_client.archive = open_html_archive(self.config, self.country, self.run_timestamp)
+
         # Scrape keywords sequentially to build ASIN cache
+        # Keywords are pulled lazily: the next one is read only when the previous one is done
         results = []
-        for keyword in self.keywords:
-            result = await self.scrape_keyword(keyword)
-            results.append(result)
-
-        # Save results
-        self._save_results(results)
+        duplicate_count = 0
+        source_finished = True
+        for shard, keyword, cursor in progress.pending():
+            if self.budget and self.budget.exhausted:
+                logger.warning(f"  ⚠ Run budget exhausted ({self.budget.exhausted_reason}) - stopping before '{keyword}'")
+                logger.warning(f"    Remaining keywords can be fetched later with --resume")
+                source_finished = False
+                break
+            if self.keywords_per_session and len(results) >= self.keywords_per_session:
+                logger.info(f"  Session limit reached ({self.keywords_per_session} keywords) - continue with --resume")
+                source_finished = False
+                break
+
+            keyword_span = TRACER.span('keyword', new_trace=True, keyword=keyword, country=self.country)
+            with METRICS.label_context(country=self.country, keyword=keyword), keyword_span:
+                result = await self.scrape_keyword(keyword)
+            duplicate_count += sum(1 for p in result.get('products', []) if p.get('is_duplicate', False))
+            PROFILER.snapshot(f"{self.country}:{keyword}", asin_cache=len(self.asin_cache), results=len(results) + 1)
+
+            # Products already live in the result stream - keep only metadata
+            results.append({k: v for k, v in result.items() if k != 'products'})
+            progress.advance(shard, cursor, keyword, succeeded=result['status'] == 'success')
+
+        # Retry BSR misses now that the first pass is done
+        with METRICS.label_context(country=self.country):
+            await self._process_bsr_retries()
+
+        # Save results (a journal that was already saved has nothing new to write)
+        if self.journal.completed:
+            logger.info("  Journal already complete - skipping save")
+            self.result_stream.close()
+            self.result_stream.path.unlink(missing_ok=True)
+        else:
+            self._save_results(results)
+            progress.save()
+            # A run stopped by its budget or session limit (or with failed keywords) stays resumable
+            if source_finished and not (self.budget and self.budget.exhausted) and not progress.failed:
+                self.journal.record_complete()
+            elif not progress.failed:
+                # Saved keywords are covered by the progress cursors; start the next session's journal empty
+                self.journal.close()
+                self.journal.path.unlink(missing_ok=True)
+            else:
+                # Failed keywords are retried first with --resume, reusing their journaled pages and products
+                logger.warning(f"  ⚠ {len(progress.failed)} failed keywords stay pending - retried with --resume")
+        self.journal.close()
 
         # Summary with deduplication stats
         successful = sum(1 for r in results if r['status'] == 'success')
         total_products = sum(r.get('total_products', 0) for r in results)
-        duplicate_count = sum(
-            1 for r in results if r['status'] == 'success'
-            for p in r.get('products', [])
-            if p.get('is_duplicate', False)
-        )
 
         logger.info(f"\n{'='*70}")
         logger.info(f"COMPLETE: {successful}/{len(results)} keywords | {total_products} products")
         logger.info(f"Unique ASINs: {len(self.asin_cache)}")
         logger.info(f"Duplicate ASINs: {duplicate_count} (BSR still scraped per keyword)")
+        if self.variant_folding:
+            logger.info(f"Variant families: {len(self.variant_families)} | Sibling pages not fetched: "
+                        f"{self.variant_skips} | BSR misses filled from a sibling: {self.variant_bsr_fills}")
         logger.info(f"Output directory: {self.output_dir}")
         logger.info(f"{'='*70}\n")
 
+        # Record metrics so the run planner can learn from this run
+        append_run_history(self.base_output_dir, {
+            'timestamp': self.run_timestamp,
+            'country': self.country,
+            'keywords': len(results),
+            'max_products': self.max_products,
+            'product_slots': sum(1 for r in results if r.get('depth') != self.DEPTH_SEARCH) * self.max_products,
+            'max_concurrent': self.max_concurrent,
+            'products': total_products,
+            'requests': self.http_client.request_count,
+            'search_requests': self.search_requests,
+            'store_hits': self.store_hits,
+            'search_cache_hits': self.search_cache_hits,
+            'variant_skips': self.variant_skips,
+            'variant_bsr_fills': self.variant_bsr_fills,
+            'wall_seconds': round(time.monotonic() - start_time, 1)
+        })
+
+        if self.asin_store:
+            self.asin_store.close()
+        if self.search_cache:
+            self.search_cache.close()
+        if self.http_client.archive:
+            self.http_client.archive.close()
+
         return results
 
+    @TRACER.traced()
     def _save_results(self, results: List[Dict]):
         """
         Save results to JSON files (organized by country)
+        Files are built from the product stream, one keyword at a time
 
         Saves:
-        1. Individual keyword files: output/{country}/{keyword}_{timestamp}.json
-        2. Consolidated file: output/{country}/all_keywords_{timestamp}.json
+        1. Product stream: output/{country}/products_{timestamp}.jsonl (written during the run)
+        2. Individual keyword files: output/{country}/{keyword}_{timestamp}.json
+        3. Consolidated file: output/{country}/all_keywords_{timestamp}.json
+           plus its keyword index, recorded in output/{country}/manifest.jsonl
+        4. Parquet tables (if columnar_output is set): output/columnar/{table}/country=../date=../run_{timestamp}.parquet
+        5. BSR trends (if bsr_trends is set): the run is ingested into output/bsr_trends.sqlite
+        6. Cross-country index (if marketplace_index is set): output/marketplace_index.sqlite
+
+        Args:
+            results: Keyword metadata from scrape_all (products are read from the stream)
         """
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.result_stream.close()
+        keyword_files, consolidated_file, keyword_index = self.result_stream.write_views(
+            self.output_dir, self.run_timestamp
+        )
+        RunManifest(self.output_dir).record_run(
+            self.run_timestamp, consolidated_file, keyword_index, stream_file=self.result_stream.path
+        )
 
-        # Save individual keyword files
-        for result in results:
-            if result['status'] == 'success':
-                keyword = result['keyword'].replace(' ', '_').replace('/', '_')
-                keyword_file = self.output_dir / f"{keyword}_{timestamp}.json"
-                with open(keyword_file, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-                logger.info(f"  Saved: {keyword_file}")
-
-        # Save consolidated file
-        consolidated_file = self.output_dir / f"all_keywords_{timestamp}.json"
-        with open(consolidated_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        for keyword_file in keyword_files:
+            logger.info(f"  Saved: {keyword_file}")
         logger.info(f"  Consolidated: {consolidated_file}")
+        logger.info(f"  Stream: {self.result_stream.path}")
+
+        self._update_side_stores(self.result_stream, self.run_timestamp)
+
+    def _update_side_stores(self, stream: ResultStream, run_id: str):
+        """
+        Feed a saved run to the optional side stores: Parquet tables, BSR trends, marketplace index
+
+        The run's JSON output is already written, so a failing store is logged and
+        skipped instead of aborting the run.
+
+        Args:
+            stream: The run's closed product stream
+            run_id: Run timestamp (as recorded in the manifest)
+        """
+        if self.columnar_root:
+            try:
+                sink = ColumnarSink(self.columnar_root)
+                for path in sink.write_run(stream.iter_keyword_results(), self.country, run_id):
+                    logger.info(f"  Parquet: {path}")
+            except ImportError:
+                logger.warning("  ⚠ columnar_output needs pyarrow (pip install pyarrow) - Parquet output skipped")
+            except Exception as e:
+                logger.error(f"  ✗ Parquet output failed: {e}")
+
+        if self.trends_enabled:
+            try:
+                trend_store = open_trend_store(self.config)
+                try:
+                    trend_store.ingest_country(self.country, self.output_dir)
+                finally:
+                    trend_store.close()
+            except Exception as e:
+                logger.error(f"  ✗ BSR trend ingest failed: {e}")
 
+        if self.marketplace_index_enabled:
+            try:
+                index = open_marketplace_index(self.config)
+                try:
+                    index.ingest_country(self.country, self.output_dir, self.currency)
+                finally:
+                    index.close()
+            except Exception as e:
+                logger.error(f"  ✗ Marketplace index ingest failed: {e}")
 
-async def run_multi_country(config_path: str = "config.json"):
+
+async def _start_telemetry(settings: Dict):
+    """
+    Enable tracing if settings.tracing is set, and start the Prometheus
+    endpoint if settings.metrics.port is configured
+    """
+    if settings.get('tracing'):
+        TRACER.enable()
+
+    metrics_settings = settings.get('metrics') or {}
+    if not metrics_settings.get('port'):
+        return
+    try:
+        await METRICS.start_server(metrics_settings.get('host', '127.0.0.1'), metrics_settings['port'])
+    except OSError as e:
+        logger.warning(f"⚠ Metrics endpoint not started: {e}")
+
+
+async def _finish_telemetry(settings: Dict):
+    """Write output/metrics_summary_{timestamp}.json (plus traces/profiles if enabled) and stop the endpoint"""
+    output_dir = Path(settings.get('output_dir', 'output'))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    summary_file = METRICS.write_summary(output_dir / f"metrics_summary_{timestamp}.json")
+    logger.info(f"Metrics summary: {summary_file}")
+    if TRACER.enabled:
+        TRACER.export(output_dir / f"traces_{timestamp}.json")
+    if PROFILER.enabled:
+        PROFILER.write(output_dir, timestamp)
+    await METRICS.stop_server()
+
+
+async def run_multi_country(config_path: str = "config.json", resume: bool = False, depth: Optional[str] = None):
     """
     Run scraper for multiple countries if 'countries' is specified in config.
     Falls back to single country mode if 'country' is specified instead.
 
     Args:
         config_path: Path to configuration file
+        resume: Resume from each country's run journal instead of starting over
+        depth: Enrichment depth for every keyword of the run (overrides settings.enrichment)
 
     Returns:
         Dictionary with results per country
@@ -377,13 +1116,18 @@ async def run_multi_country(config_path: str = "config.json"):
     countries = config['settings'].get('countries')
     single_country = config['settings'].get('country')
 
+    # One budget for the whole run (all countries)
+    budget = RunBudget.from_settings(config['settings'])
+
+    await _start_telemetry(config['settings'])
+
     if countries and isinstance(countries, list):
         # Multi-country mode
         logger.info(f"\n{'#'*80}")
         logger.info(f"# MULTI-COUNTRY MODE: {len(countries)} countries")
         logger.info(f"{'#'*80}")
         logger.info(f"Countries: {', '.join(c.upper() for c in countries)}")
-        logger.info(f"Keywords: {len(config['keywords'])}")
+        logger.info(f"Keywords: {KeywordSource.from_config(config).count()}")
         logger.info(f"Products per keyword: {config['settings'].get('max_products_to_scrape', 10)}")
         logger.info(f"Concurrency: {config['settings'].get('max_concurrent', 2)}")
         logger.info(f"{'#'*80}\n")
@@ -391,6 +1135,14 @@ async def run_multi_country(config_path: str = "config.json"):
         all_results = {}
 
         for country in countries:
+            if budget and budget.exhausted:
+                logger.warning(f"⚠ Skipping {country.upper()}: run budget exhausted ({budget.exhausted_reason})")
+                all_results[country] = {
+                    'status': 'failed',
+                    'error': f"Run budget exhausted: {budget.exhausted_reason}"
+                }
+                continue
+
             logger.info(f"\n{'='*80}")
             logger.info(f"COUNTRY: {country.upper()}")
             logger.info(f"{'='*80}\n")
@@ -408,7 +1160,7 @@ async def run_multi_country(config_path: str = "config.json"):
 
             try:
                 # Run scraper for this country
-                scraper = AmazonScraper(temp_file)
+                scraper = AmazonScraper(temp_file, resume=resume, budget=budget, depth=depth)
                 results = await scraper.scrape_all()
                 all_results[country] = {
                     'status': 'success',
@@ -438,10 +1190,17 @@ async def run_multi_country(config_path: str = "config.json"):
             if result['status'] == 'success':
                 products = sum(r.get('total_products', 0) for r in result['results'])
                 keywords_success = sum(1 for r in result['results'] if r['status'] == 'success')
-                logger.info(f"  {country.upper()}: ✓ {keywords_success}/{len(config['keywords'])} keywords, {products} products")
+                logger.info(f"  {country.upper()}: ✓ {keywords_success}/{len(result['results'])} keywords, {products} products")
             else:
                 logger.info(f"  {country.upper()}: ✗ FAILED - {result.get('error', 'Unknown error')}")
 
+        index = open_marketplace_index(config)
+        if index:
+            shared = index.shared_asins(min_countries=2)
+            index.close()
+            logger.info(f"\n  Cross-country: {len(shared)} ASINs listed in 2+ marketplaces "
+                        f"(python marketplace_index.py get <ASIN>)")
+
         logger.info(f"\n{'='*80}\n")
 
         # AI analysis disabled for now
@@ -455,12 +1214,13 @@ async def run_multi_country(config_path: str = "config.json"):
                 logger.info(f"# LAYER 4: AI ANALYSIS (GPT-5-nano)")
                 logger.info(f"{'#'*80}\n")
 
-                analyzer = AIAnalyzer(openai_key)
+                analyzer = AIAnalyzer.from_config(config)
                 successful_countries = [c for c, r in all_results.items() if r['status'] == 'success']
 
                 if successful_countries:
                     output_dir = Path(config['settings']['output_dir'])
-                    report_path = analyzer.generate_multi_country_report(output_dir, successful_countries)
+                    report_path = await analyzer.generate_multi_country_report(output_dir, successful_countries)
+                    analyzer.close()
                     logger.info(f"✓ AI Analysis Report: {report_path}\n")
                 else:
                     logger.warning("No successful country results to analyze\n")
@@ -470,6 +1230,7 @@ async def run_multi_country(config_path: str = "config.json"):
             logger.error(f"\n✗ AI Analysis failed: {e}\n")
         """
 
+        await _finish_telemetry(config['settings'])
         return all_results
 
     else:
@@ -478,9 +1239,10 @@ async def run_multi_country(config_path: str = "config.json"):
         logger.info(f"SINGLE COUNTRY MODE")
         logger.info(f"{'*'*80}\n")
 
-        scraper = AmazonScraper(config_path)
+        scraper = AmazonScraper(config_path, resume=resume, budget=budget, depth=depth)
         results = await scraper.scrape_all()
 
+        await _finish_telemetry(config['settings'])
         return {scraper.country: {'status': 'success', 'results': results}}
 
 
@@ -492,8 +1254,42 @@ def main():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
+    parser = argparse.ArgumentParser(description="Amazon multi-country scraper")
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume an interrupted run from output/{country}/run_journal.jsonl')
+    parser.add_argument('--plan', action='store_true',
+                        help='Dry run: estimate requests, credits and wall time without scraping')
+    parser.add_argument('--trace', action='store_true',
+                        help='Record tracing spans to output/traces_{timestamp}.json (OTLP/JSON)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile parse stages, sample stacks and track memory per keyword (output/profile_*)')
+    parser.add_argument('--uvloop', action='store_true',
+                        help='Run on uvloop if it is installed')
+    parser.add_argument('--depth', choices=AmazonScraper.DEPTHS,
+                        help='Enrichment depth for every keyword: search, bsr or full (default: settings.enrichment)')
+    args = parser.parse_args()
+
+    if args.trace:
+        TRACER.enable()
+
+    if args.plan:
+        with open(args.config) as f:
+            config = json.load(f)
+        if args.depth:
+            config['settings']['enrichment'] = {**(config['settings'].get('enrichment') or {}),
+                                                'depth': args.depth, 'keywords': {}}
+        planner = RunPlanner(config, resume=args.resume)
+        planner.log_plan(planner.plan())
+        return
+
+    if args.uvloop:
+        install_uvloop()
+    if args.profile:
+        PROFILER.enable()
+
     # Run scraper (supports both single and multi-country)
-    results = asyncio.run(run_multi_country("config.json"))
+    results = asyncio.run(run_multi_country(args.config, resume=args.resume, depth=args.depth))
 
     print("\nDone! Check output/ folder")
 
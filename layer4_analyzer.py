@@ -3,59 +3,41 @@ LAYER 4: AI Analysis & Insights
 - Analyzes scraped product data using OpenAI GPT-5-nano
 - Generates competitive analysis and keyword effectiveness reports
 - Produces markdown reports with actionable insights
+- Countries are analyzed concurrently (bounded by max_concurrent) through an async backend
+- Responses are cached by model + prompt hash: unchanged data never triggers another call
+- Pluggable backends: 'openai' (AsyncOpenAI) or 'stub' (local, offline, for tests and benchmarks)
+- Prompts are measured in tokens (tiktoken when installed); markets too large for one prompt are
+  split into keyword chunks analyzed concurrently (map), then combined into one report (reduce)
 """
 
 import json
+import time
+import sqlite3
+import asyncio
+import hashlib
 import logging
+import argparse
 import openai
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-logger = logging.getLogger(__name__)
-
-
-class AIAnalyzer:
-    """AI-powered analysis of Amazon scraping results"""
-
-    def __init__(self, openai_api_key: str):
-        """
-        Initialize AI analyzer with OpenAI API key
-
-        Args:
-            openai_api_key: OpenAI API key for GPT-5-nano
-        """
-        self.client = openai.OpenAI(api_key=openai_api_key)
-        self.model = "gpt-5-nano"
-        logger.info("✓ Initialized AI Analyzer (GPT-5-nano)")
-
-    def analyze_country_data(self, country: str, json_data: Dict) -> str:
-        """
-        Analyze scraped data for a single country using GPT-5-nano
-
-        Args:
-            country: Country code (e.g., 'uk', 'us')
-            json_data: Parsed JSON data from all_keywords_*.json file
-
-        Returns:
-            Markdown-formatted analysis report
-        """
-        logger.info(f"\n{'='*70}")
-        logger.info(f"AI ANALYSIS: {country.upper()}")
-        logger.info(f"{'='*70}")
+from metrics import METRICS
+from tracing import TRACER
+from analytics import build_summary_sections
+from run_manifest import RunManifest
+from bsr_trends import TrendStore, open_trend_store
 
-        # Prepare data summary for GPT
-        data_summary = self._prepare_data_summary(json_data)
+logger = logging.getLogger(__name__)
 
-        # Create prompt for GPT-5-nano
-        prompt = f"""You are an expert Amazon marketplace analyst. Analyze the following product data and provide insights.
+SYSTEM_PROMPT = "You are an expert Amazon marketplace analyst specializing in competitive intelligence and keyword optimization."
 
-**Market**: {country.upper()}
-**Keywords Analyzed**: {len(json_data)} keywords
-**Data Summary**:
-{data_summary}
+DEFAULT_MODEL = "gpt-5-nano"
+DEFAULT_MAX_CONCURRENT = 3  # Countries analyzed (and LLM requests in flight) at the same time
+DEFAULT_MAX_PROMPT_TOKENS = 12000  # Larger country prompts are split into keyword chunks
+CHARS_PER_TOKEN_ESTIMATE = 3  # Conservative fallback when tiktoken is not installed
 
-Please provide a comprehensive analysis covering:
+ANALYSIS_INSTRUCTIONS = """Please provide a comprehensive analysis covering:
 
 1. **KEYWORD EFFECTIVENESS ANALYSIS**
    - Which keywords perform best (most products, best BSR rankings)?
@@ -84,27 +66,232 @@ Format your response in clean markdown with headers, bullet points, and tables w
 Be specific with data points (ASINs, numbers, percentages).
 """
 
+CHUNK_INSTRUCTIONS = """Summarize this part in concise markdown (at most about 300 words):
+- Strongest and weakest keywords (product counts, best BSR) with keep/modify/remove suggestions
+- Top competing products (ASIN, BSR, price, rating, reviews)
+- Notable price ranges, rating/review levels and badges
+Be specific with data points (ASINs, numbers, percentages).
+"""
+
+
+def _main_bsr(product: Dict) -> Optional[int]:
+    """Main BSR rank (first bsr_subcategories entry), or None"""
+    bsr = product.get('bsr_subcategories') or []
+    return bsr[0].get('rank') if bsr and isinstance(bsr[0], dict) else None
+
+
+class TokenCounter:
+    """Prompt token counts with the model's tokenizer (tiktoken), or a conservative estimate without it"""
+
+    def __init__(self, model: str):
+        self.encoding = None
         try:
-            logger.info("  Sending data to GPT-5-nano...")
-            logger.info(f"  Input prompt length: {len(prompt)} characters")
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert Amazon marketplace analyst specializing in competitive intelligence and keyword optimization."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=16000  # GPT-5-nano needs room for reasoning + output
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding('o200k_base')  # GPT-4o / GPT-5 family
+        except ImportError:
+            logger.info("  tiktoken not installed - prompt tokens are estimated (pip install tiktoken)")
+        except Exception as e:  # Encoding files are downloaded on first use
+            logger.warning(f"  ⚠ tiktoken unavailable ({e}) - prompt tokens are estimated")
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+
+
+class OpenAIBackend:
+    """Chat completions through the async OpenAI client"""
+
+    name = 'openai'
+
+    def __init__(self, api_key: str):
+        self.client = openai.AsyncOpenAI(api_key=api_key)
+
+    async def complete(self, model: str, system: str, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_completion_tokens=16000  # GPT-5-nano needs room for reasoning + output
+        )
+        return response.choices[0].message.content
+
+
+class StubBackend:
+    """
+    Local stand-in for the LLM: deterministic markdown built from the prompt
+
+    Lets the analysis stage (concurrency, caching, report files) run offline.
+    latency_seconds simulates the generation time for benchmarks.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    async def complete(self, model: str, system: str, prompt: str) -> str:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        keyword_lines = [line for line in prompt.splitlines() if line.startswith('**Keyword:')]
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        lines = [
+            "## Stub Analysis",
+            "",
+            f"- Model: {model} (stub backend, no API call)",
+            f"- Keywords in prompt: {len(keyword_lines)}",
+            f"- Prompt: {len(prompt)} characters, sha256 {digest}",
+            ""
+        ]
+        lines.extend(f"- {line.strip('*').strip()}" for line in keyword_lines)
+        return '\n'.join(lines)
+
+
+class AnalysisCache:
+    """SQLite cache of analysis responses keyed by model + prompt hash"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the cache
+
+        Args:
+            db_path: Path to SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (model, prompt_hash)
             )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """Cached analysis for this exact prompt (None if missing)"""
+        row = self.conn.execute(
+            "SELECT analysis FROM analyses WHERE model = ? AND prompt_hash = ?",
+            (model, self.prompt_hash(prompt))
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, model: str, prompt: str, analysis: str):
+        """Store a successful analysis"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analyses (model, prompt_hash, analysis, created_at) VALUES (?, ?, ?, ?)",
+            (model, self.prompt_hash(prompt), analysis, time.time())
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+class AIAnalyzer:
+    """AI-powered analysis of Amazon scraping results"""
+
+    def __init__(self, openai_api_key: Optional[str] = None, backend=None, model: str = DEFAULT_MODEL,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT, cache_path: Optional[str] = None,
+                 trend_store: Optional[TrendStore] = None, max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS):
+        """
+        Initialize AI analyzer
+
+        Args:
+            openai_api_key: OpenAI API key for GPT-5-nano (used when no backend is given)
+            backend: Object with async complete(model, system, prompt) -> str (e.g. StubBackend)
+            model: Model name (part of the cache key)
+            max_concurrent: Countries analyzed at the same time
+            cache_path: SQLite response cache (None disables caching)
+            trend_store: Cross-run BSR trends added to the prompt (optional)
+            max_prompt_tokens: Token budget per prompt; larger markets are analyzed in keyword chunks
+        """
+        self.backend = backend or OpenAIBackend(openai_api_key)
+        self.model = model
+        self.cache_model = f"{self.backend.name}/{model}"  # Stub responses never mix with real ones
+        self.max_concurrent = max(1, max_concurrent)
+        self.cache = AnalysisCache(cache_path) if cache_path else None
+        self.cache_hits = 0
+        self.trend_store = trend_store
+        self.max_prompt_tokens = max_prompt_tokens
+        self.tokens = TokenCounter(model)
+        self._call_semaphore = None  # LLM requests in flight (all countries) - created on first use, see _complete
+        self._warned_no_pandas = False
+        logger.info(f"✓ Initialized AI Analyzer ({self.model}, {self.backend.name} backend, "
+                    f"{self.max_concurrent} concurrent, cache {'on' if self.cache else 'off'})")
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'AIAnalyzer':
+        """
+        Build from config.json: api_keys.openai, settings.analysis
+        ({"backend": "openai"|"stub", "model", "max_concurrent", "max_prompt_tokens", "cache_path",
+        "stub_latency_seconds"}) and settings.bsr_trends
+        """
+        settings = config['settings'].get('analysis') or {}
+        backend = None
+        if settings.get('backend') == 'stub':
+            backend = StubBackend(latency_seconds=settings.get('stub_latency_seconds', 0.0))
+
+        return cls(
+            openai_api_key=config['api_keys'].get('openai'),
+            backend=backend,
+            model=settings.get('model', DEFAULT_MODEL),
+            max_concurrent=settings.get('max_concurrent', DEFAULT_MAX_CONCURRENT),
+            cache_path=settings.get(
+                'cache_path', str(Path(config['settings'].get('output_dir', 'output')) / 'analysis_cache.sqlite')
+            ),
+            trend_store=open_trend_store(config),
+            max_prompt_tokens=settings.get('max_prompt_tokens', DEFAULT_MAX_PROMPT_TOKENS)
+        )
+
+    @TRACER.traced()
+    async def analyze_country_data(self, country: str, json_data: Dict, trends: Optional[str] = None) -> str:
+        """
+        Analyze scraped data for a single country using GPT-5-nano
 
-            analysis = response.choices[0].message.content
-            logger.info(f"  ✓ Response received: {len(analysis) if analysis else 0} characters")
+        Args:
+            country: Country code (e.g., 'uk', 'us')
+            json_data: Parsed JSON data from all_keywords_*.json file
+            trends: Optional cross-run BSR movement summary (TrendStore.trend_summary)
 
-            # Debug: Check if response is empty
-            if not analysis or len(analysis.strip()) == 0:
-                logger.warning("  ⚠ GPT returned empty response!")
-                logger.info(f"  Response object: {response}")
-                return f"# Analysis Failed\n\nGPT-5-nano returned an empty response. This might be due to model limitations."
+        Returns:
+            Markdown-formatted analysis report
+        """
+        logger.info(f"\n{'='*70}")
+        logger.info(f"AI ANALYSIS: {country.upper()}")
+        logger.info(f"{'='*70}")
+
+        try:
+            overview, keyword_sections = self._summary_sections(json_data)
+            prompt = self._build_prompt(country, len(json_data), self._join_summary(overview, keyword_sections), trends)
+            prompt_tokens = self.tokens.count(prompt)
+            logger.info(f"  Input prompt: {prompt_tokens:,} tokens{'' if self.tokens.exact else ' (estimated)'}, "
+                        f"budget {self.max_prompt_tokens:,}")
+
+            if prompt_tokens <= self.max_prompt_tokens or len(keyword_sections) < 2:
+                logger.info(f"  Sending {country.upper()} data to {self.model}...")
+                analysis = await self._complete(prompt, f"{country.upper()}")
+            else:
+                analysis = await self._map_reduce(country, len(json_data), overview, keyword_sections, trends)
 
             logger.info(f"  ✓ Generated {len(analysis)} character analysis")
             return analysis
@@ -113,43 +300,229 @@ Be specific with data points (ASINs, numbers, percentages).
             logger.error(f"  ✗ AI Analysis failed: {e}")
             return f"# Analysis Failed\n\nError: {str(e)}"
 
+    async def _complete(self, prompt: str, label: str) -> str:
+        """
+        One LLM request through the response cache
+
+        Args:
+            prompt: Prompt text (cache key)
+            label: Name used in log lines
+
+        Returns:
+            Response text
+
+        Raises:
+            ValueError: If the model returns an empty response
+        """
+        if self.cache:
+            cached = self.cache.get(self.cache_model, prompt)
+            if cached is not None:
+                self.cache_hits += 1
+                METRICS.inc('analysis_cache_hits_total')
+                logger.info(f"  ⚡ {label}: data unchanged, reusing cached analysis")
+                return cached
+
+        if self._call_semaphore is None:
+            # Created inside the running loop: before Python 3.10 a semaphore binds to the loop current at creation
+            self._call_semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._call_semaphore:
+            with METRICS.timer('analysis_seconds'):
+                analysis = await self.backend.complete(self.model, SYSTEM_PROMPT, prompt)
+        METRICS.inc('analysis_requests_total')
+        logger.info(f"  ✓ {label}: response received ({len(analysis) if analysis else 0} characters)")
+
+        if not analysis or len(analysis.strip()) == 0:
+            logger.warning(f"  ⚠ {label}: GPT returned empty response!")
+            raise ValueError(f"{self.model} returned an empty response. This might be due to model limitations.")
+
+        if self.cache:
+            self.cache.put(self.cache_model, prompt, analysis)
+        return analysis
+
+    async def _map_reduce(self, country: str, keyword_count: int, overview: str,
+                          keyword_sections: List[str], trends: Optional[str]) -> str:
+        """
+        Analyze a market too large for one prompt
+
+        Map: keyword sections are packed into chunks that fit the token budget and
+        summarized concurrently. Reduce: the partial summaries (condensed further if
+        they do not fit either) are combined with the market overview into the report.
+
+        Returns:
+            Markdown-formatted analysis report
+        """
+        chunks = self._chunk_sections(country, keyword_count, keyword_sections)
+        logger.info(f"  {country.upper()}: prompt over budget - analyzing {len(keyword_sections)} keywords "
+                    f"in {len(chunks)} chunks")
+
+        partials = await asyncio.gather(*(
+            self._complete(
+                self._build_chunk_prompt(country, keyword_count, '\n'.join(chunk), i, len(chunks)),
+                f"{country.upper()} chunk {i}/{len(chunks)}"
+            )
+            for i, chunk in enumerate(chunks, 1)
+        ))
+
+        # Condense partials until the reduce prompt fits (each round merges groups that fit the budget)
+        level = 1
+        while True:
+            prompt = self._build_reduce_prompt(country, keyword_count, overview, partials, trends)
+            if self.tokens.count(prompt) <= self.max_prompt_tokens or len(partials) < 2:
+                break
+            groups = self._chunk_sections(country, keyword_count, [f"\n{p}" for p in partials])
+            if len(groups) >= len(partials):
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            logger.info(f"  {country.upper()}: condensing {len(partials)} partial analyses into {len(groups)}")
+            partials = await asyncio.gather(*(
+                self._complete(
+                    self._build_chunk_prompt(country, keyword_count, '\n'.join(group), i, len(groups)),
+                    f"{country.upper()} condense {level}.{i}"
+                )
+                for i, group in enumerate(groups, 1)
+            ))
+            level += 1
+
+        return await self._complete(prompt, f"{country.upper()} reduce")
+
+    def _chunk_sections(self, country: str, keyword_count: int, sections: List[str]) -> List[List[str]]:
+        """Greedily pack sections (in order) into chunks whose prompts fit the token budget"""
+        budget = self.max_prompt_tokens - self.tokens.count(self._build_chunk_prompt(country, keyword_count, '', 1, 1))
+        chunks, current, used = [], [], 0
+        for section in sections:
+            tokens = self.tokens.count(section) + 1
+            if current and used + tokens > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(section)  # A single oversized section still gets its own chunk
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _build_prompt(self, country: str, keyword_count: int, data_summary: str, trends: Optional[str] = None) -> str:
+        """
+        Build the analysis prompt (the cache key is derived from it)
+
+        Args:
+            country: Country code
+            keyword_count: Number of keywords analyzed
+            data_summary: Output of _prepare_data_summary
+            trends: Optional cross-run BSR movement summary
+
+        Returns:
+            Prompt text
+        """
+        trend_section = f"\n**BSR Movement Across Runs**:\n{trends}\n" if trends else ""
+
+        # Create prompt for GPT-5-nano
+        return f"""You are an expert Amazon marketplace analyst. Analyze the following product data and provide insights.
+
+**Market**: {country.upper()}
+**Keywords Analyzed**: {keyword_count} keywords
+**Data Summary**:
+{data_summary}
+{trend_section}
+
+{ANALYSIS_INSTRUCTIONS}"""
+
+    def _build_chunk_prompt(self, country: str, keyword_count: int, sections: str, part: int, parts: int) -> str:
+        """Map prompt: summarize one chunk of keyword sections (or of partial analyses)"""
+        return f"""You are an expert Amazon marketplace analyst. This is part {part} of {parts} of the data for one market; a later step combines all parts into the final report.
+
+**Market**: {country.upper()}
+**Keywords in the market**: {keyword_count}
+**Data (this part)**:
+{sections}
+
+{CHUNK_INSTRUCTIONS}"""
+
+    def _build_reduce_prompt(self, country: str, keyword_count: int, overview: str,
+                             partials: List[str], trends: Optional[str]) -> str:
+        """Reduce prompt: the final report from the market overview and the partial analyses"""
+        trend_section = f"\n**BSR Movement Across Runs**:\n{trends}\n" if trends else ""
+        parts = '\n\n'.join(f"### Part {i}\n{partial}" for i, partial in enumerate(partials, 1))
+        return f"""You are an expert Amazon marketplace analyst. The keyword data for this market was analyzed in {len(partials)} parts. Combine the partial analyses below into one report.
+
+**Market**: {country.upper()}
+**Keywords Analyzed**: {keyword_count} keywords
+**Market Overview**:
+{overview or 'N/A'}
+{trend_section}
+**Partial Analyses**:
+{parts}
+
+{ANALYSIS_INSTRUCTIONS}"""
+
     def _prepare_data_summary(self, json_data: List[Dict]) -> str:
         """
         Prepare a concise summary of JSON data for GPT analysis
 
+        Uses the vectorized analytics module when pandas is installed,
+        otherwise a per-keyword summary computed in plain Python.
+
         Args:
             json_data: List of keyword results
 
         Returns:
             Formatted string summary
         """
-        summary_lines = []
+        return self._join_summary(*self._summary_sections(json_data))
+
+    @staticmethod
+    def _join_summary(overview: str, keyword_sections: List[str]) -> str:
+        return '\n'.join([overview, *keyword_sections] if overview else keyword_sections)
+
+    def _summary_sections(self, json_data: List[Dict]) -> Tuple[str, List[str]]:
+        """
+        The data summary as (market overview, one section per keyword)
+
+        Returns:
+            Tuple of (overview, keyword_sections); the overview is empty without pandas
+        """
+        try:
+            return build_summary_sections(json_data)
+        except ImportError:
+            if not self._warned_no_pandas:
+                logger.warning("  ⚠ pandas not installed - using the basic data summary (pip install pandas)")
+                self._warned_no_pandas = True
+            return '', self._basic_summary_sections(json_data)
+        except Exception as e:
+            # e.g. legacy outputs with placeholder strings in numeric fields
+            logger.warning(f"  ⚠ Data summary failed ({e}) - using the basic data summary")
+            return '', self._basic_summary_sections(json_data)
+
+    def _basic_summary_sections(self, json_data: List[Dict]) -> List[str]:
+        """Per-keyword summary sections without pandas (no market overview)"""
+        keyword_sections = []
 
         for keyword_result in json_data:
             keyword = keyword_result.get('keyword', 'Unknown')
             status = keyword_result.get('status', 'unknown')
             products = keyword_result.get('products', [])
 
+            summary_lines = [f"\n**Keyword: {keyword}**"]
+            keyword_sections.append(summary_lines)
             if status != 'success' or not products:
-                summary_lines.append(f"\n**Keyword: {keyword}**")
                 summary_lines.append(f"- Status: FAILED or NO PRODUCTS")
                 continue
 
-            # Calculate metrics
-            prices = [p.get('price', 'N/A') for p in products if p.get('price') not in ['[REPEATED]', None]]
-            ratings = [p.get('rating') for p in products if p.get('rating') not in ['[REPEATED]', None] and p.get('rating')]
-            review_counts = [p.get('review_count') for p in products if p.get('review_count') not in ['[REPEATED]', None] and p.get('review_count')]
-            bsr_ranks = [p.get('bsr_rank') for p in products if p.get('bsr_rank') and p.get('bsr_rank') != '[REPEATED]']
+            # Calculate metrics (duplicates only carry BSR; their other fields live under the first keyword)
+            originals = [p for p in products if not p.get('is_duplicate')]
+            # Numbers only: older outputs carry '[REPEATED]' placeholders in repeated fields
+            prices = sorted(p['price'] for p in originals if isinstance(p.get('price'), (int, float)))
+            ratings = [p['rating'] for p in originals if isinstance(p.get('rating'), (int, float)) and p['rating']]
+            review_counts = [p['review_count'] for p in originals
+                             if isinstance(p.get('review_count'), int) and p['review_count']]
+            bsr_ranks = [_main_bsr(p) for p in products if isinstance(_main_bsr(p), int) and _main_bsr(p)]
 
             avg_rating = sum(ratings) / len(ratings) if ratings else 0
             avg_reviews = sum(review_counts) / len(review_counts) if review_counts else 0
             min_bsr = min(bsr_ranks) if bsr_ranks else None
 
             # Get top 3 products by BSR
-            products_with_bsr = [p for p in products if p.get('bsr_rank') and isinstance(p.get('bsr_rank'), int)]
-            top_products = sorted(products_with_bsr, key=lambda x: x['bsr_rank'])[:3]
+            products_with_bsr = [p for p in products if isinstance(_main_bsr(p), int)]
+            top_products = sorted(products_with_bsr, key=_main_bsr)[:3]
 
-            summary_lines.append(f"\n**Keyword: {keyword}**")
             summary_lines.append(f"- Total Products: {len(products)}")
             summary_lines.append(f"- Avg Rating: {avg_rating:.2f}/5" if avg_rating else "- Avg Rating: N/A")
             summary_lines.append(f"- Avg Reviews: {int(avg_reviews)}" if avg_reviews else "- Avg Reviews: N/A")
@@ -160,7 +533,7 @@ Be specific with data points (ASINs, numbers, percentages).
                 summary_lines.append("- Top 3 Products:")
                 for i, p in enumerate(top_products, 1):
                     asin = p.get('asin', 'N/A')
-                    bsr = p.get('bsr_rank', 0)
+                    bsr = _main_bsr(p)
                     price = p.get('price', 'N/A')
                     rating = p.get('rating', 'N/A')
                     reviews = p.get('review_count', 0)
@@ -173,11 +546,11 @@ Be specific with data points (ASINs, numbers, percentages).
                     summary_lines.append(f"  {i}. {asin} | BSR: {bsr_str} | {price} | ★{rating} ({reviews_str} reviews)")
                     summary_lines.append(f"     Title: {title_short}")
 
-        return '\n'.join(summary_lines)
+        return ['\n'.join(lines) for lines in keyword_sections]
 
-    def generate_multi_country_report(self, output_dir: Path, countries: List[str]) -> str:
+    async def generate_multi_country_report(self, output_dir: Path, countries: List[str]) -> str:
         """
-        Generate AI analysis reports for all countries
+        Generate AI analysis reports for all countries (up to max_concurrent at a time)
 
         Args:
             output_dir: Base output directory containing country subdirectories
@@ -190,36 +563,88 @@ Be specific with data points (ASINs, numbers, percentages).
         logger.info(f"GENERATING AI ANALYSIS REPORTS")
         logger.info(f"{'*'*70}\n")
 
-        all_analyses = []
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        start = time.time()
 
-        for country in countries:
-            country_dir = output_dir / country
+        async def analyze(country: str) -> Optional[Dict]:
+            async with semaphore:
+                return await self._analyze_country_file(output_dir / country, country, timestamp)
 
-            # Find the most recent all_keywords_*.json file
+        # Results keep the order of countries, whatever order the analyses finish in
+        results = await asyncio.gather(*(analyze(country) for country in countries))
+        all_analyses = [r for r in results if r is not None]
+
+        # Generate consolidated report
+        consolidated_report = self._create_consolidated_report(all_analyses, timestamp)
+        consolidated_file = output_dir / f"ai_analysis_all_countries_{timestamp}.md"
+
+        with open(consolidated_file, 'w', encoding='utf-8') as f:
+            f.write(consolidated_report)
+
+        logger.info(f"{'='*70}")
+        logger.info(f"✓ AI ANALYSIS COMPLETE ({time.time() - start:.1f}s)")
+        logger.info(f"  Individual reports: {len(all_analyses)} countries ({self.cache_hits} from cache)")
+        logger.info(f"  Consolidated report: {consolidated_file.name}")
+        logger.info(f"{'='*70}\n")
+
+        return str(consolidated_file)
+
+    def close(self):
+        """Close the response cache and trend store"""
+        if self.cache:
+            self.cache.close()
+        if self.trend_store:
+            self.trend_store.close()
+
+    async def _analyze_country_file(self, country_dir: Path, country: str, timestamp: str) -> Optional[Dict]:
+        """
+        Analyze the most recent run of one country and save its report
+
+        Args:
+            country_dir: Country output directory
+            country: Country code
+            timestamp: Report timestamp
+
+        Returns:
+            {'country', 'analysis'}, or None if the country has no data file
+        """
+        # Latest run from the manifest; older output directories without one fall back to globbing
+        run = RunManifest(country_dir).open_run()
+        if run is not None:
+            data_source = run.entry['consolidated']
+            logger.info(f"  Analyzing: {data_source} (run {run.run_id}, {len(run.keywords)} keywords)")
+            json_data = list(run.iter_results())
+        else:
             json_files = sorted(country_dir.glob('all_keywords_*.json'), reverse=True)
 
             if not json_files:
                 logger.warning(f"  ⚠ No data files found for {country.upper()}")
-                continue
+                return None
 
-            latest_file = json_files[0]
-            logger.info(f"  Analyzing: {latest_file.name}")
+            data_source = json_files[0].name
+            logger.info(f"  Analyzing: {data_source}")
 
             # Load JSON data
-            with open(latest_file, 'r', encoding='utf-8') as f:
+            with open(json_files[0], 'r', encoding='utf-8') as f:
                 json_data = json.load(f)
 
-            # Generate analysis
-            analysis = self.analyze_country_data(country, json_data)
+        # Cross-run movement (ingests any runs saved since the last analysis)
+        trends = None
+        if self.trend_store:
+            self.trend_store.ingest_country(country, country_dir)
+            trends = self.trend_store.trend_summary(country)
 
-            # Save individual country report
-            report_file = country_dir / f"ai_analysis_{timestamp}.md"
-            country_report = f"""# AI Market Analysis - {country.upper()}
+        # Generate analysis
+        analysis = await self.analyze_country_data(country, json_data, trends)
+
+        # Save individual country report
+        report_file = country_dir / f"ai_analysis_{timestamp}.md"
+        country_report = f"""# AI Market Analysis - {country.upper()}
 
 **Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**Model**: GPT-5-nano
-**Data Source**: {latest_file.name}
+**Model**: {self.model}
+**Data Source**: {data_source}
 
 ---
 
@@ -227,33 +652,18 @@ Be specific with data points (ASINs, numbers, percentages).
 
 ---
 
-*Analysis generated by Layer 4 AI Analyzer using OpenAI GPT-5-nano*
+*Analysis generated by Layer 4 AI Analyzer using {self.model}*
 """
 
-            with open(report_file, 'w', encoding='utf-8') as f:
-                f.write(country_report)
-
-            logger.info(f"  ✓ Saved: {report_file.name}\n")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(country_report)
 
-            all_analyses.append({
-                'country': country.upper(),
-                'analysis': analysis
-            })
+        logger.info(f"  ✓ Saved: {report_file.name}\n")
 
-        # Generate consolidated report
-        consolidated_report = self._create_consolidated_report(all_analyses, timestamp)
-        consolidated_file = output_dir / f"ai_analysis_all_countries_{timestamp}.md"
-
-        with open(consolidated_file, 'w', encoding='utf-8') as f:
-            f.write(consolidated_report)
-
-        logger.info(f"{'='*70}")
-        logger.info(f"✓ AI ANALYSIS COMPLETE")
-        logger.info(f"  Individual reports: {len(all_analyses)} countries")
-        logger.info(f"  Consolidated report: {consolidated_file.name}")
-        logger.info(f"{'='*70}\n")
-
-        return str(consolidated_file)
+        return {
+            'country': country.upper(),
+            'analysis': analysis
+        }
 
     def _create_consolidated_report(self, analyses: List[Dict], timestamp: str) -> str:
         """
@@ -270,7 +680,7 @@ Be specific with data points (ASINs, numbers, percentages).
             f"# Multi-Country Amazon Market Analysis",
             f"",
             f"**Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            f"**Model**: GPT-5-nano",
+            f"**Model**: {self.model}",
             f"**Markets Analyzed**: {len(analyses)}",
             f"",
             f"---",
@@ -285,13 +695,13 @@ Be specific with data points (ASINs, numbers, percentages).
             report_parts.append("---")
             report_parts.append("")
 
-        report_parts.append("*Multi-country analysis generated by Layer 4 AI Analyzer using OpenAI GPT-5-nano*")
+        report_parts.append(f"*Multi-country analysis generated by Layer 4 AI Analyzer using {self.model}*")
 
         return '\n'.join(report_parts)
 
 
 def main():
-    """Standalone test entry point"""
+    """Standalone entry point: analyze the latest results of every configured country"""
     import sys
 
     # Setup logging
@@ -300,21 +710,31 @@ def main():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
+    parser = argparse.ArgumentParser(description="AI analysis of scraped results")
+    parser.add_argument('--config', default='config.json', help="Path to config.json")
+    parser.add_argument('--stub', action='store_true',
+                        help="Use the local stub backend (offline, no API key needed)")
+    args = parser.parse_args()
+
     # Load config
-    with open('config.json') as f:
+    with open(args.config) as f:
         config = json.load(f)
 
-    openai_key = config['api_keys'].get('openai')
-    if not openai_key:
-        logger.error("OpenAI API key not found in config.json")
+    if args.stub:
+        config['settings'].setdefault('analysis', {})['backend'] = 'stub'
+
+    analysis_settings = config['settings'].get('analysis') or {}
+    if analysis_settings.get('backend') != 'stub' and not config['api_keys'].get('openai'):
+        logger.error("OpenAI API key not found in config.json (use --stub to run offline)")
         sys.exit(1)
 
     countries = config['settings'].get('countries', ['uk'])
     output_dir = Path(config['settings']['output_dir'])
 
     # Run analysis
-    analyzer = AIAnalyzer(openai_key)
-    report_path = analyzer.generate_multi_country_report(output_dir, countries)
+    analyzer = AIAnalyzer.from_config(config)
+    report_path = asyncio.run(analyzer.generate_multi_country_report(output_dir, countries))
+    analyzer.close()
 
     print(f"\n✓ Analysis complete! Report: {report_path}")
 
@@ -0,0 +1,299 @@
+"""
+MARKETPLACE INDEX: Cross-Country ASIN Join
+- One SQLite row per (ASIN, country) with the latest price, currency, rating, reviews,
+  main BSR and the keywords that listed it
+- Built incrementally from each country's run manifest as results are saved
+- Looking up an ASIN is a single primary-key range read, whatever the number of runs
+- Prices are compared in one base currency (exchange rates from config, applied at read time)
+
+Usage:
+    python marketplace_index.py ingest                 # index runs not indexed yet (all countries)
+    python marketplace_index.py get B08N5WRWNW         # one ASIN across marketplaces
+    python marketplace_index.py shared --min-countries 3
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from run_manifest import RunManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_CURRENCY = 'EUR'
+
+# Approximate conversion to EUR; override with settings.marketplace_index.exchange_rates
+DEFAULT_EXCHANGE_RATES = {'EUR': 1.0, 'GBP': 1.17, 'USD': 0.92}
+
+
+class MarketplaceIndex:
+    """SQLite index joining each ASIN's latest listing across marketplaces"""
+
+    def __init__(self, db_path: str, base_currency: str = DEFAULT_BASE_CURRENCY,
+                 exchange_rates: Optional[Dict[str, float]] = None):
+        """
+        Open (or create) the index
+
+        Args:
+            db_path: Path to SQLite database file
+            base_currency: Currency prices are normalized to
+            exchange_rates: {currency: value of 1 unit in base_currency} (defaults are EUR-based)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.base_currency = base_currency
+        self.exchange_rates = dict(DEFAULT_EXCHANGE_RATES)
+        if base_currency != 'EUR':
+            # Re-base the EUR defaults so base_currency is 1.0
+            base = self.exchange_rates.get(base_currency)
+            self.exchange_rates = {c: r / base for c, r in self.exchange_rates.items()} if base else {base_currency: 1.0}
+        if exchange_rates:
+            self.exchange_rates.update(exchange_rates)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS indexed_runs (
+                country TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                indexed_at REAL NOT NULL,
+                consolidated TEXT,
+                PRIMARY KEY (country, run_id)
+            );
+            CREATE TABLE IF NOT EXISTS listings (
+                asin TEXT NOT NULL,
+                country TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                title TEXT,
+                price REAL,
+                currency TEXT,
+                rating REAL,
+                review_count INTEGER,
+                bsr_rank INTEGER,
+                bsr_category TEXT,
+                keywords TEXT NOT NULL,
+                PRIMARY KEY (asin, country)
+            ) WITHOUT ROWID;
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(indexed_runs)")}
+        if 'consolidated' not in columns:  # Indexes created before re-parsed runs were tracked
+            self.conn.execute("ALTER TABLE indexed_runs ADD COLUMN consolidated TEXT")
+        self.conn.commit()
+
+    def ingest_country(self, country: str, country_dir: Path, currency: str) -> int:
+        """
+        Index the country's runs that are not indexed yet, or were re-parsed since (oldest first)
+
+        Args:
+            country: Country code
+            country_dir: Country output directory (holds manifest.jsonl)
+            currency: Marketplace currency (COUNTRY_CONFIG), used when a record has none
+
+        Returns:
+            Number of runs indexed
+        """
+        manifest = RunManifest(country_dir)
+        done = dict(self.conn.execute(
+            "SELECT run_id, consolidated FROM indexed_runs WHERE country = ?", (country,)
+        ))
+        entries = manifest.pending(done)
+
+        for entry in entries:
+            run = manifest.open_run(entry['run_id'])
+            count = self.ingest_run(country, run.run_id, run.iter_results(), currency, entry['consolidated'])
+            logger.info(f"  ✓ Marketplace index: {country.upper()} run {run.run_id}"
+                        + (" (re-parsed)" if entry.get('reparsed') else "") + f" ({count} ASINs)")
+        return len(entries)
+
+    def ingest_run(self, country: str, run_id: str, keyword_results, currency: str,
+                   consolidated: Optional[str] = None) -> int:
+        """
+        Upsert one run's listings (an older run never overwrites a newer listing;
+        re-ingesting a run overwrites its own listings)
+
+        Args:
+            country: Country code
+            run_id: Run timestamp
+            keyword_results: Iterable of keyword result dicts
+            currency: Marketplace currency fallback
+            consolidated: Manifest entry's consolidated file (tells a re-parsed entry apart)
+
+        Returns:
+            Number of ASINs indexed from the run
+        """
+        listings = {}  # {asin: row} - full record from the first keyword, keywords from all of them
+        for result in keyword_results:
+            if result.get('status') != 'success':
+                continue
+            for product in result.get('products') or []:
+                asin = product.get('asin')
+                if not asin:
+                    continue
+                row = listings.get(asin)
+                if row is None:
+                    bsr = product.get('bsr_subcategories') or []
+                    main = bsr[0] if bsr and isinstance(bsr[0], dict) else {}
+                    row = listings[asin] = {
+                        'title': product.get('title'),
+                        'price': product.get('price'),
+                        'currency': product.get('currency') or currency,
+                        'rating': product.get('rating'),
+                        'review_count': product.get('review_count'),
+                        'bsr_rank': main.get('rank'),
+                        'bsr_category': main.get('category'),
+                        'keywords': []
+                    }
+                if result['keyword'] not in row['keywords']:
+                    row['keywords'].append(result['keyword'])
+
+        self.conn.executemany(
+            "INSERT INTO listings (asin, country, run_id, title, price, currency, rating, review_count, "
+            "bsr_rank, bsr_category, keywords) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (asin, country) DO UPDATE SET run_id = excluded.run_id, title = excluded.title, "
+            "price = excluded.price, currency = excluded.currency, rating = excluded.rating, "
+            "review_count = excluded.review_count, bsr_rank = excluded.bsr_rank, "
+            "bsr_category = excluded.bsr_category, keywords = excluded.keywords "
+            "WHERE excluded.run_id >= listings.run_id",
+            [
+                (asin, country, run_id, r['title'], r['price'], r['currency'], r['rating'], r['review_count'],
+                 r['bsr_rank'], r['bsr_category'], json.dumps(r['keywords'], ensure_ascii=False))
+                for asin, r in listings.items()
+            ]
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO indexed_runs (country, run_id, indexed_at, consolidated) VALUES (?, ?, ?, ?)",
+            (country, run_id, time.time(), consolidated)
+        )
+        self.conn.commit()
+        return len(listings)
+
+    def normalize(self, price: Optional[float], currency: Optional[str]) -> Optional[float]:
+        """Price in base_currency (None if the price or the exchange rate is unknown)"""
+        rate = self.exchange_rates.get(currency)
+        if price is None or rate is None:
+            return None
+        return round(price * rate, 2)
+
+    def get(self, asin: str) -> Optional[Dict]:
+        """
+        One ASIN across marketplaces
+
+        Returns:
+            {'asin', 'title', 'base_currency', 'marketplaces': {country: {...}}, 'cheapest', 'best_bsr'},
+            or None if the ASIN is not indexed
+        """
+        rows = self.conn.execute(
+            "SELECT country, run_id, title, price, currency, rating, review_count, bsr_rank, bsr_category, keywords "
+            "FROM listings WHERE asin = ? ORDER BY country",
+            (asin,)
+        ).fetchall()
+        if not rows:
+            return None
+
+        marketplaces = {}
+        for country, run_id, title, price, currency, rating, review_count, bsr_rank, bsr_category, keywords in rows:
+            marketplaces[country] = {
+                'run_id': run_id,
+                'title': title,
+                'price': price,
+                'currency': currency,
+                'price_normalized': self.normalize(price, currency),
+                'rating': rating,
+                'review_count': review_count,
+                'bsr_rank': bsr_rank,
+                'bsr_category': bsr_category,
+                'keywords': json.loads(keywords)
+            }
+
+        priced = [c for c, m in marketplaces.items() if m['price_normalized'] is not None]
+        ranked = [c for c, m in marketplaces.items() if m['bsr_rank']]
+        return {
+            'asin': asin,
+            'title': next((m['title'] for m in marketplaces.values() if m['title']), None),
+            'base_currency': self.base_currency,
+            'marketplaces': marketplaces,
+            'cheapest': min(priced, key=lambda c: marketplaces[c]['price_normalized']) if priced else None,
+            'best_bsr': min(ranked, key=lambda c: marketplaces[c]['bsr_rank']) if ranked else None
+        }
+
+    def shared_asins(self, min_countries: int = 2, limit: Optional[int] = None) -> List[Dict]:
+        """
+        ASINs listed in at least min_countries marketplaces, most widespread first
+
+        Returns:
+            List of {'asin', 'countries'}
+        """
+        query = ("SELECT asin, GROUP_CONCAT(country) FROM listings GROUP BY asin HAVING COUNT(*) >= ? "
+                 "ORDER BY COUNT(*) DESC, asin")
+        params = [min_countries]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [{'asin': asin, 'countries': sorted(countries.split(','))}
+                for asin, countries in self.conn.execute(query, params)]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def open_marketplace_index(config: Dict) -> Optional[MarketplaceIndex]:
+    """
+    MarketplaceIndex from settings.marketplace_index
+    ({"db_path", "base_currency", "exchange_rates"}), or None if not configured
+    """
+    settings = config['settings'].get('marketplace_index')
+    if not settings:
+        return None
+    settings = settings if isinstance(settings, dict) else {}
+    output_dir = Path(config['settings'].get('output_dir', 'output'))
+    return MarketplaceIndex(
+        settings.get('db_path', str(output_dir / 'marketplace_index.sqlite')),
+        base_currency=settings.get('base_currency', DEFAULT_BASE_CURRENCY),
+        exchange_rates=settings.get('exchange_rates')
+    )
+
+
+def main():
+    """Entry point for the marketplace index"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Cross-country ASIN index")
+    parser.add_argument('command', choices=['ingest', 'get', 'shared'])
+    parser.add_argument('asin', nargs='?', help='ASIN (for get)')
+    parser.add_argument('--config', default='config.json', help='Path to configuration file')
+    parser.add_argument('--min-countries', type=int, default=2, help='Marketplaces an ASIN must appear in (shared)')
+    parser.add_argument('--limit', type=int, default=50, help='Rows to print (shared)')
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    config['settings'].setdefault('marketplace_index', True)
+
+    index = open_marketplace_index(config)
+    try:
+        if args.command == 'ingest':
+            from layer3_orchestrator import AmazonScraper
+            output_dir = Path(config['settings'].get('output_dir', 'output'))
+            countries = config['settings'].get('countries') or [config['settings'].get('country', 'uk')]
+            for country in countries:
+                currency = AmazonScraper.COUNTRY_CONFIG.get(country, {}).get('currency')
+                index.ingest_country(country, output_dir / country, currency)
+        elif args.command == 'get':
+            if not args.asin:
+                parser.error("get needs an ASIN")
+            print(json.dumps(index.get(args.asin), indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps(index.shared_asins(args.min_countries, args.limit), indent=2))
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
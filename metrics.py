@@ -0,0 +1,222 @@
+"""
+METRICS: Run Instrumentation
+- Counters, gauges and histograms with labels (country, keyword, stage, ...)
+- Labels set with label_context() apply to everything recorded inside it,
+  including asyncio tasks started there (contextvars)
+- Prometheus text endpoint for live runs + JSON summary at the end of a run
+"""
+
+import json
+import time
+import logging
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets per metric family
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120]
+PARSE_BUCKETS = [0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+BYTES_BUCKETS = [1000, 10000, 50000, 100000, 250000, 500000, 1000000, 2000000, 5000000]
+
+_context_labels = contextvars.ContextVar('metric_labels', default={})
+
+
+class MetricsRegistry:
+    """In-process metrics store with Prometheus and JSON export"""
+
+    def __init__(self):
+        self.counters = {}  # {(name, labels): value}
+        self.gauges = {}  # {(name, labels): value}
+        self.histograms = {}  # {(name, labels): {'counts': [...], 'sum': float, 'count': int}}
+        self.buckets = {}  # {name: bucket upper bounds}
+        self._server = None
+
+    def _key(self, name: str, labels: Dict) -> Tuple[str, Tuple]:
+        merged = dict(_context_labels.get())
+        merged.update(labels)
+        return name, tuple(sorted((k, str(v)) for k, v in merged.items() if v is not None))
+
+    @contextmanager
+    def label_context(self, **labels):
+        """Apply labels to every metric recorded inside this block"""
+        merged = dict(_context_labels.get())
+        merged.update(labels)
+        token = _context_labels.set(merged)
+        try:
+            yield
+        finally:
+            _context_labels.reset(token)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        self.gauges[self._key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        """Move a gauge up or down"""
+        key = self._key(name, labels)
+        self.gauges[key] = self.gauges.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, buckets: Optional[List[float]] = None, **labels):
+        """Record one histogram observation"""
+        bounds = self.buckets.setdefault(name, buckets or LATENCY_BUCKETS)
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = {'counts': [0] * len(bounds), 'sum': 0.0, 'count': 0}
+            self.histograms[key] = histogram
+
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                histogram['counts'][i] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, name: str, buckets: Optional[List[float]] = None, **labels):
+        """Observe the duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, buckets=buckets, **labels)
+
+    def in_flight(self, name: str, **labels) -> '_InFlight':
+        """Async context manager that counts concurrent holders in a gauge"""
+        return _InFlight(self, name, labels)
+
+    def reset(self):
+        """Drop all recorded values"""
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    @staticmethod
+    def _format_labels(labels: Tuple, extra: Optional[Tuple] = None) -> str:
+        items = list(labels) + list(extra or ())
+        if not items:
+            return ''
+
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+        return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in items) + '}'
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+
+        for kind, store in (('counter', self.counters), ('gauge', self.gauges)):
+            for name in sorted({n for n, _ in store}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in store.items():
+                    if metric == name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for name in sorted({n for n, _ in self.histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            bounds = self.buckets[name]
+            for (metric, labels), histogram in self.histograms.items():
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(bounds, histogram['counts']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+    def _quantile(self, name: str, histogram: Dict, q: float):
+        """Estimate a quantile as the upper bound of the bucket that contains it"""
+        if not histogram['count']:
+            return None
+        target = q * histogram['count']
+        cumulative = 0
+        for bound, count in zip(self.buckets[name], histogram['counts']):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return '+Inf'  # Above the largest bucket
+
+    def summary(self) -> Dict:
+        """
+        JSON-friendly snapshot of all metrics
+
+        Returns:
+            Dictionary with counters, gauges and histogram stats (count, sum, avg, p50, p95)
+        """
+        def entry(name, labels, **values):
+            return {'name': name, 'labels': dict(labels), **values}
+
+        return {
+            'counters': [entry(n, l, value=v) for (n, l), v in self.counters.items()],
+            'gauges': [entry(n, l, value=v) for (n, l), v in self.gauges.items()],
+            'histograms': [
+                entry(n, l,
+                      count=h['count'],
+                      sum=round(h['sum'], 6),
+                      avg=round(h['sum'] / h['count'], 6) if h['count'] else None,
+                      p50=self._quantile(n, h, 0.5),
+                      p95=self._quantile(n, h, 0.95))
+                for (n, l), h in self.histograms.items()
+            ]
+        }
+
+    def write_summary(self, path: Path) -> Path:
+        """Write the end-of-run JSON summary"""
+        path = Path(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False, default=str)
+        return path
+
+    async def start_server(self, host: str = '127.0.0.1', port: int = 9108):
+        """Serve /metrics in Prometheus format for the lifetime of the run"""
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.to_prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        self._server = runner
+        logger.info(f"✓ Metrics endpoint: http://{host}:{port}/metrics")
+
+    async def stop_server(self):
+        """Stop the metrics endpoint"""
+        if self._server:
+            await self._server.cleanup()
+            self._server = None
+
+
+class _InFlight:
+    """Gauge +1 on enter, -1 on exit (usable next to a semaphore in one async with)"""
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    async def __aenter__(self):
+        self.registry.add_gauge(self.name, 1, **self.labels)
+
+    async def __aexit__(self, *exc):
+        self.registry.add_gauge(self.name, -1, **self.labels)
+        return False
+
+
+# Shared registry used by all layers
+METRICS = MetricsRegistry()
@@ -0,0 +1,133 @@
+"""
+MODELS: Product & Observation Records
+- Product: static ASIN data held once per run (title, price, rating, reviews, images)
+- Observation: per-keyword data (search position, badges, BSR), joined to Product by ASIN
+- Compact __slots__ records; output JSON is rendered from them
+- Duplicates render as a short record pointing at the first keyword (no '[REPEATED]' fields)
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Product:
+    """Static product data (same for every keyword that lists the ASIN)"""
+
+    __slots__ = ('asin', 'url', 'title', 'price', 'currency', 'rating', 'review_count', 'images', 'first_keyword',
+                 'parent_asin')
+
+    asin: str
+    url: Optional[str]
+    title: Optional[str]
+    price: Optional[float]
+    currency: Optional[str]
+    rating: Optional[float]
+    review_count: Optional[int]
+    images: List[str]
+    first_keyword: str  # Keyword whose output carries the full record
+    parent_asin: Optional[str]  # Variation parent, if known (variant folding)
+
+    @classmethod
+    def from_dict(cls, data: Dict, first_keyword: str) -> 'Product':
+        """Build from an enriched product dict"""
+        images = data.get('images')
+        return cls(
+            asin=data.get('asin'),
+            url=data.get('url'),
+            title=data.get('title'),
+            price=data.get('price'),
+            currency=data.get('currency'),
+            rating=data.get('rating'),
+            review_count=data.get('review_count'),
+            images=images if isinstance(images, list) else [],
+            first_keyword=first_keyword,
+            parent_asin=data.get('parent_asin')
+        )
+
+
+@dataclass
+class Observation:
+    """Per-keyword data for one ASIN (varies between keywords and runs)"""
+
+    __slots__ = ('asin', 'url', 'search_position', 'badges', 'bsr_subcategories', 'first_seen_in', 'variant_of',
+                 'bsr_from')
+
+    asin: str
+    url: Optional[str]
+    search_position: Optional[int]
+    badges: List[str]
+    bsr_subcategories: List[Dict]
+    first_seen_in: Optional[str]  # Set for duplicates: keyword that carries the full product
+    variant_of: Optional[str]  # Sibling variant whose product page stood in for this one (own page not fetched)
+    bsr_from: Optional[str]  # Sibling variant that supplied a BSR missing from this ASIN's own (fetched) page
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.first_seen_in is not None
+
+    @classmethod
+    def from_dict(cls, data: Dict, first_seen_in: Optional[str] = None,
+                  bsr_subcategories: Optional[List[Dict]] = None) -> 'Observation':
+        """Build from a search listing or enriched product dict"""
+        return cls(
+            asin=data.get('asin'),
+            url=data.get('url'),
+            search_position=data.get('search_position'),
+            badges=data.get('badges') or [],
+            bsr_subcategories=bsr_subcategories if bsr_subcategories is not None
+            else (data.get('bsr_subcategories') or []),
+            first_seen_in=first_seen_in,
+            variant_of=data.get('variant_of'),
+            bsr_from=data.get('bsr_from')
+        )
+
+    def to_dict(self, product: Optional[Product] = None, include_images: bool = True) -> Dict:
+        """
+        Render the output record
+
+        Args:
+            product: The ASIN's Product (ignored for duplicates)
+            include_images: False for BSR-depth records (no image work was done)
+
+        Returns:
+            Full product dict on first appearance, compact duplicate record otherwise
+        """
+        if self.is_duplicate or product is None:
+            record = {
+                'asin': self.asin,
+                'url': self.url,
+                'search_position': self.search_position,
+                'bsr_subcategories': self.bsr_subcategories,  # Always scraped fresh
+                'badges': self.badges,  # Varies per keyword
+                'is_duplicate': True,
+                'first_seen_in': self.first_seen_in
+            }
+            if self.variant_of:
+                record['variant_of'] = self.variant_of
+            if self.bsr_from:
+                record['bsr_from'] = self.bsr_from
+            return record
+
+        record = {
+            'asin': self.asin,
+            'search_position': self.search_position,
+            'title': product.title,
+            'price': product.price,
+            'currency': product.currency,
+            'rating': product.rating,
+            'review_count': product.review_count,
+            'badges': self.badges,
+            'url': self.url,
+            'bsr_subcategories': self.bsr_subcategories
+        }
+        if include_images:
+            record['images'] = product.images
+        # Variation fields only appear when variant folding found them
+        if product.parent_asin:
+            record['parent_asin'] = product.parent_asin
+        if self.variant_of:
+            record['variant_of'] = self.variant_of
+        if self.bsr_from:
+            record['bsr_from'] = self.bsr_from
+        return record
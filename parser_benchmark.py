@@ -0,0 +1,184 @@
+"""
+PARSER BENCHMARK: Per-Result Extraction Cost
+- Times BeautifulSoup construction per page and field extraction per result container
+  (ProductParser.extract_search_results), separately
+- Pages come from HTML files, from the HTML archive (search pages), or from a
+  built-in synthetic page shaped like an Amazon search result list
+
+Usage:
+    python parser_benchmark.py                              # synthetic page (48 results)
+    python parser_benchmark.py --html page1.html page2.html --domain amazon.de
+    python parser_benchmark.py --archive --country uk --pages 50 --repeat 5
+"""
+
+import time
+import json
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from typing import List
+
+from bs4 import BeautifulSoup
+
+from layer2_parser import ProductParser
+
+logger = logging.getLogger(__name__)
+
+FILLER_DEPTH = 12  # Nested wrapper divs per result (real containers are deeply nested)
+
+
+def synthetic_search_page(results: int = 48) -> str:
+    """
+    Search page with `results` containers in the layouts the parser handles
+    (US/UK aria-label counts, reviews block, German labels, parenthesised counts,
+    badges and one sponsored result in six)
+
+    Returns:
+        HTML string
+    """
+    review_layouts = [
+        '<a aria-label="{n:,} ratings" href="#"><span class="a-size-base s-underline-text">{n:,}</span></a>',
+        '<div data-cy="reviews-block"><a href="#"><span class="a-size-base s-underline-text">{n:,}</span></a></div>',
+        '<a aria-label="{n} Bewertungen" href="#"><span class="a-size-mini puis-normal-weight-text">({n})</span></a>',
+        '<div data-cy="reviews-block"><span class="a-size-mini puis-normal-weight-text">({n:,})</span></div>',
+    ]
+    containers = []
+    for i in range(results):
+        asin = f"B0BENCH{i:03d}"
+        sponsored = '<span class="puis-label-popover-default"><span>Sponsored</span></span>' if i % 6 == 5 else ''
+        badge = '<span class="a-badge-label"><span class="a-badge-text">Amazon\'s Choice</span></span>' if i % 4 == 0 else ''
+        wrappers_open = ''.join(f'<div class="a-section a-spacing-none puis-padding-{d}">' for d in range(FILLER_DEPTH))
+        wrappers_close = '</div>' * FILLER_DEPTH
+        links = ''.join(f'<a class="a-link-normal s-no-outline" href="/dp/{asin}?ref={k}"><span class="a-text-normal">'
+                        f'option {k}</span></a>' for k in range(6))
+        containers.append(f'''
+<div data-component-type="s-search-result" data-asin="{asin}" class="sg-col-4-of-24 s-result-item s-asin">
+ {wrappers_open}
+  <div class="s-product-image-container"><span data-component-type="s-product-image">
+   <a class="a-link-normal s-no-outline" href="/dp/{asin}"><div class="a-section aok-relative s-image-square-aspect">
+    <img class="s-image" src="https://m.media-amazon.com/images/I/{asin}._AC_UL320_.jpg" alt="Product {i}"/>
+   </div></a></span></div>
+  {sponsored}{badge}
+  <div class="a-section a-spacing-none a-spacing-top-small s-title-instructions-style">
+   <h2 class="a-size-mini a-spacing-none a-color-base s-line-clamp-4"><a class="a-link-normal" href="/dp/{asin}">
+    <span class="a-size-base-plus a-color-base a-text-normal">Product {i} with a realistic long title, 60 capsules</span></a></h2>
+  </div>
+  <div class="a-section a-spacing-none a-spacing-top-micro"><div class="a-row a-size-small">
+   <span aria-label="4.{i % 10} out of 5 stars"><span class="a-declarative"><a class="a-popover-trigger" href="#">
+    <i class="a-icon a-icon-star-small"><span class="a-icon-alt">4.{i % 10} out of 5 stars</span></i></a></span></span>
+   {review_layouts[i % len(review_layouts)].format(n=1000 + i * 37)}
+  </div></div>
+  <div class="a-row a-size-base a-color-secondary"><span class="a-size-base a-color-secondary">100+ bought in past month</span></div>
+  <div class="a-row a-size-base a-color-base"><a class="a-link-normal s-no-hover" href="/dp/{asin}">
+   <span class="a-price" data-a-size="xl"><span class="a-offscreen">£1{i}.99</span>
+    <span aria-hidden="true"><span class="a-price-symbol">£</span><span class="a-price-whole">1{i}<span class="a-price-decimal">.</span></span><span class="a-price-fraction">99</span></span></span>
+  </a></div>
+  <div class="a-row">{links}</div>
+  <div class="a-row a-size-base a-color-secondary s-align-children-center"><span>FREE delivery <span class="a-text-bold">Tomorrow</span></span></div>
+ {wrappers_close}
+</div>''')
+    return '<html><body><div class="s-main-slot s-result-list">' + ''.join(containers) + '</div></body></html>'
+
+
+def load_archive_pages(config_path: str, country: str, limit: int) -> List[str]:
+    """Latest archived search pages of a country (see html_archive.py)"""
+    from html_archive import archive_root, open_index, read_record
+    with open(config_path) as f:
+        config = json.load(f)
+    root = archive_root(config)
+    conn = open_index(root)
+    try:
+        rows = conn.execute(
+            "SELECT segment, offset, length FROM pages WHERE country = ? AND kind = 'search' "
+            "ORDER BY fetched_at DESC LIMIT ?",
+            (country, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [read_record(root, segment, offset, length)[1] for segment, offset, length in rows]
+
+
+def run_benchmark(pages: List[str], domain: str, currency: str, repeat: int = 5) -> dict:
+    """
+    Time soup construction and per-result extraction
+
+    Args:
+        pages: Search page HTML strings
+        domain: Amazon domain for the parser
+        currency: Currency for the parser
+        repeat: Extraction passes per page (the best pass is kept)
+
+    Returns:
+        {'pages', 'containers', 'products', 'soup_ms_per_page', 'extract_us_per_result', 'extract_us_p50'}
+    """
+    parser = ProductParser(domain=domain, currency=currency)
+    soup_times = []
+    per_result = []
+    containers = 0
+    products = 0
+
+    for html in pages:
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, 'html.parser')
+        soup_times.append(time.perf_counter() - start)
+
+        divs = parser.find_result_containers(soup)
+        if not divs:
+            continue
+        containers += len(divs)
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            extracted = parser.extract_search_results(divs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        products += len(extracted)
+        per_result.append(best / len(divs))
+
+    return {
+        'pages': len(pages),
+        'containers': containers,
+        'products': products,
+        'soup_ms_per_page': round(statistics.mean(soup_times) * 1000, 2) if soup_times else None,
+        'extract_us_per_result': round(statistics.mean(per_result) * 1e6, 1) if per_result else None,
+        'extract_us_p50': round(statistics.median(per_result) * 1e6, 1) if per_result else None
+    }
+
+
+def main():
+    """Entry point for the parser benchmark"""
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Per-result search extraction benchmark")
+    parser.add_argument('--html', nargs='*', help='Search page HTML files')
+    parser.add_argument('--archive', action='store_true', help='Use archived search pages (settings.html_archive)')
+    parser.add_argument('--config', default='config.json', help='Path to configuration file (--archive)')
+    parser.add_argument('--country', default='uk', help='Country of archived pages (--archive)')
+    parser.add_argument('--pages', type=int, default=20, help='Archived pages to load (--archive)')
+    parser.add_argument('--results', type=int, default=48, help='Results on the synthetic page')
+    parser.add_argument('--domain', default='amazon.co.uk', help='Amazon domain for the parser')
+    parser.add_argument('--currency', default='GBP', help='Currency for the parser')
+    parser.add_argument('--repeat', type=int, default=5, help='Extraction passes per page (best is kept)')
+    args = parser.parse_args()
+
+    if args.html:
+        pages = [Path(p).read_text(encoding='utf-8') for p in args.html]
+        source = f"{len(pages)} HTML files"
+    elif args.archive:
+        pages = load_archive_pages(args.config, args.country, args.pages)
+        source = f"{len(pages)} archived {args.country.upper()} search pages"
+    else:
+        pages = [synthetic_search_page(args.results)]
+        source = f"synthetic page ({args.results} results)"
+
+    report = run_benchmark(pages, args.domain, args.currency, args.repeat)
+    print(f"Source: {source}")
+    print(f"  Containers: {report['containers']} ({report['products']} products after sponsored/invalid filtering)")
+    print(f"  Soup build: {report['soup_ms_per_page']} ms/page")
+    print(f"  Extraction: {report['extract_us_per_result']} µs/result (p50 over pages {report['extract_us_p50']} µs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+PROFILING: Opt-in Run Profiling (--profile)
+- cProfile scoped to the parse stages (BeautifulSoup work that blocks the event loop)
+- Sampling profiler over the whole run, written as folded stacks for flamegraphs
+- tracemalloc snapshots at keyword boundaries (peak memory, top allocation sites)
+- Optional uvloop event loop (--uvloop)
+"""
+
+import json
+import time
+import signal
+import asyncio
+import cProfile
+import logging
+import functools
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005  # Seconds of CPU time between stack samples
+TOP_ALLOCATIONS = 15  # Allocation sites kept per memory snapshot
+
+
+def install_uvloop() -> bool:
+    """
+    Use uvloop for the event loop if it is installed
+
+    Returns:
+        True if uvloop was installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("⚠ uvloop not installed (pip install uvloop) - using the default event loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("✓ Event loop: uvloop")
+    return True
+
+
+class Profiler:
+    """Collects parse-stage CPU profiles, stack samples and memory snapshots"""
+
+    def __init__(self):
+        self.enabled = False
+        self.parse_profile = None
+        self.parse_seconds = 0.0
+        self.parse_calls = 0
+        self._parse_depth = 0
+        self.samples = Counter()  # {folded stack: count}
+        self.snapshots: List[Dict] = []
+        self.start_time = None
+
+    def enable(self):
+        """Start profiling (parse profiling, stack sampling, tracemalloc)"""
+        self.enabled = True
+        self.parse_profile = cProfile.Profile()
+        self.start_time = time.perf_counter()
+        tracemalloc.start()
+
+        if hasattr(signal, 'setitimer'):
+            signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+        else:
+            logger.warning("⚠ Stack sampling needs signal.setitimer (not available on this platform)")
+        logger.info("✓ Profiling enabled (parse cProfile, stack sampling, tracemalloc)")
+
+    def _sample(self, signum, frame):
+        """SIGPROF handler: record the current stack as root;...;leaf"""
+        stack = []
+        while frame is not None:
+            module = frame.f_globals.get('__name__', '?')
+            stack.append(f"{module}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def profiled(self, func):
+        """Decorator: run a (sync) parse function under the parse-stage cProfile"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or self._parse_depth:
+                return func(*args, **kwargs)
+
+            self._parse_depth += 1
+            start = time.perf_counter()
+            self.parse_profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.parse_profile.disable()
+                self.parse_seconds += time.perf_counter() - start
+                self.parse_calls += 1
+                self._parse_depth -= 1
+        return wrapper
+
+    def snapshot(self, label: str, **sizes):
+        """
+        Take a tracemalloc snapshot (called at keyword boundaries)
+
+        Args:
+            label: Snapshot label, e.g. "uk:berberine 1500mg"
+            **sizes: Sizes of in-memory structures at this point (asin_cache=..., results=...)
+        """
+        if not self.enabled:
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ]).statistics('lineno')[:TOP_ALLOCATIONS]
+
+        self.snapshots.append({
+            'label': label,
+            'elapsed_seconds': round(time.perf_counter() - self.start_time, 1),
+            'current_mb': round(current / 1e6, 2),
+            'peak_mb': round(peak / 1e6, 2),
+            'sizes': sizes,
+            'top_allocations': [
+                {'site': str(stat.traceback), 'size_kb': round(stat.size / 1e3, 1), 'count': stat.count}
+                for stat in top
+            ]
+        })
+        logger.info(f"  [profile] {label}: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)")
+
+    def _sample_share(self, package: str) -> float:
+        """Fraction of stack samples that include a frame from the given package"""
+        total = sum(self.samples.values())
+        if not total:
+            return 0.0
+
+        def in_package(stack):
+            return any(frame.split(':')[0].split('.')[0] == package for frame in stack.split(';'))
+
+        hits = sum(count for stack, count in self.samples.items() if in_package(stack))
+        return hits / total
+
+    def write(self, output_dir: Path, timestamp: str) -> Dict[str, Path]:
+        """
+        Stop profiling and write the profile files
+
+        Writes:
+        1. profile_parse_{timestamp}.prof - parse-stage cProfile (snakeviz, flameprof, pstats)
+        2. profile_samples_{timestamp}.folded - folded stacks (flamegraph.pl, speedscope)
+        3. profile_memory_{timestamp}.json - memory snapshots per keyword
+
+        Returns:
+            Dictionary of written files
+        """
+        if hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        tracemalloc.stop()
+        self.enabled = False
+
+        output_dir = Path(output_dir)
+        files = {
+            'parse_profile': output_dir / f"profile_parse_{timestamp}.prof",
+            'samples': output_dir / f"profile_samples_{timestamp}.folded",
+            'memory': output_dir / f"profile_memory_{timestamp}.json"
+        }
+
+        self.parse_profile.dump_stats(str(files['parse_profile']))
+
+        with open(files['samples'], 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        run_seconds = time.perf_counter() - self.start_time
+        with open(files['memory'], 'w', encoding='utf-8') as f:
+            json.dump({
+                'run_seconds': round(run_seconds, 1),
+                'parse_seconds': round(self.parse_seconds, 2),
+                'parse_calls': self.parse_calls,
+                'snapshots': self.snapshots
+            }, f, indent=2, ensure_ascii=False)
+
+        logger.info(f"\n{'='*70}")
+        logger.info(f"PROFILE")
+        logger.info(f"{'='*70}")
+        logger.info(f"Parsing blocked the event loop for {self.parse_seconds:.1f}s of {run_seconds:.1f}s "
+                    f"({self.parse_seconds / run_seconds:.0%}) over {self.parse_calls} pages")
+        if self.samples:
+            logger.info(f"CPU samples in BeautifulSoup: {self._sample_share('bs4'):.0%}")
+        if self.snapshots:
+            peak = max(self.snapshots, key=lambda s: s['peak_mb'])
+            logger.info(f"Memory peak: {peak['peak_mb']} MB (by {peak['label']})")
+        for path in files.values():
+            logger.info(f"  Saved: {path}")
+        logger.info(f"{'='*70}\n")
+
+        return files
+
+
+# Shared profiler used by all layers
+PROFILER = Profiler()
@@ -0,0 +1,134 @@
+"""
+RESULT STREAM: Streaming JSONL Output
+- Appends each enriched product to a JSONL file the moment it is ready
+- Keeps run memory flat: results are read back from disk, one keyword at a time
+- Builds the per-keyword and consolidated JSON views from the stream
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStream:
+    """Append-only JSONL sink for enriched products and keyword results"""
+
+    def __init__(self, path: Path):
+        """
+        Open a new stream file
+
+        Args:
+            path: JSONL file path (e.g. output/uk/products_20251014_123456.jsonl)
+        """
+        self.path = Path(path)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._updates = {}  # {(keyword, asin): upgraded product} - only retried products
+
+    def _append(self, record: Dict):
+        """Write one record and flush so partial results are visible immediately"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def write_product(self, keyword: str, product: Dict):
+        """Stream one enriched product"""
+        self._append({'type': 'product', 'keyword': keyword, 'product': product})
+
+    def write_product_update(self, keyword: str, product: Dict):
+        """Stream an upgraded version of a product that was already written"""
+        self._updates[(keyword, product.get('asin'))] = product
+        self._append({'type': 'product_update', 'keyword': keyword, 'product': product})
+
+    def write_keyword(self, result: Dict):
+        """
+        Stream a finished keyword's metadata (everything except 'products')
+
+        Must be written after all of that keyword's products; keywords are
+        processed sequentially so their products are contiguous in the stream.
+        """
+        header = {k: v for k, v in result.items() if k != 'products'}
+        self._append({'type': 'keyword', 'result': header})
+
+    def close(self):
+        """Close the stream file"""
+        if not self._file.closed:
+            self._file.close()
+
+    def iter_keyword_results(self) -> Iterator[Dict]:
+        """
+        Read the stream back as full keyword results
+
+        Yields:
+            Keyword result dicts with 'products' restored in search order
+            (only one keyword's products are held in memory at a time). A keyword
+            that did not succeed gets no products, even if some were streamed for it
+        """
+        if not self._file.closed:
+            self._file.flush()
+        pending = []  # Products of the keyword currently being read
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record['type'] == 'product':
+                    product = record['product']
+                    pending.append(self._updates.get((record['keyword'], product.get('asin')), product))
+                elif record['type'] == 'keyword':
+                    result = record['result']
+                    pending.sort(key=lambda p: p.get('search_position') or 0)
+                    result['products'] = pending if result.get('status') == 'success' else []
+                    yield result
+                    pending = []
+
+    def write_views(self, output_dir: Path, timestamp: str) -> Tuple[List[Path], Path, List[Dict]]:
+        """
+        Build the JSON output files from the stream
+
+        Each keyword is serialized once and the same text is written to both
+        its keyword file and the consolidated file.
+
+        Args:
+            output_dir: Country output directory
+            timestamp: Run timestamp used in filenames
+
+        Returns:
+            Tuple of (keyword_files, consolidated_file, keyword_index). keyword_index has one
+            {'keyword', 'status', 'products', 'offset', 'length'} entry per keyword: the byte
+            range of its JSON object inside the consolidated file (see run_manifest.py)
+        """
+        keyword_files = []
+        keyword_index = []
+        consolidated_file = output_dir / f"all_keywords_{timestamp}.json"
+
+        with open(consolidated_file, 'wb') as consolidated:
+            consolidated.write(b'[\n')
+            first = True
+
+            for result in self.iter_keyword_results():
+                text = json.dumps(result, indent=2, ensure_ascii=False)
+                data = text.encode('utf-8')
+
+                if result['status'] == 'success':
+                    keyword = result['keyword'].replace(' ', '_').replace('/', '_')
+                    keyword_file = output_dir / f"{keyword}_{timestamp}.json"
+                    with open(keyword_file, 'wb') as f:
+                        f.write(data)
+                    keyword_files.append(keyword_file)
+
+                if not first:
+                    consolidated.write(b',\n')
+                keyword_index.append({
+                    'keyword': result['keyword'],
+                    'status': result['status'],
+                    'products': len(result['products']),
+                    'offset': consolidated.tell(),
+                    'length': len(data)
+                })
+                consolidated.write(data)
+                first = False
+
+            consolidated.write(b'\n]')
+
+        return keyword_files, consolidated_file, keyword_index
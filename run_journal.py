@@ -0,0 +1,103 @@
+"""
+RUN JOURNAL: Crash-Safe Checkpointing
+- Appends completed search pages and enriched ASINs to a JSONL journal as they finish
+  (plus the variation data of product pages, so variant families can be rebuilt)
+- Flushes every record to disk so a crash or Ctrl-C loses at most the in-flight work
+- Rebuilds run state from the journal so a resumed run only schedules missing work
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """Append-only JSONL checkpoint journal for one country run"""
+
+    def __init__(self, path: Path, resume: bool = False):
+        """
+        Open the journal
+
+        Args:
+            path: Journal file path (e.g. output/uk/run_journal.jsonl)
+            resume: If True, load existing records; otherwise start a fresh journal
+        """
+        self.path = Path(path)
+        self.search_pages = {}  # {keyword: [parsed search products]}
+        self.products = {}  # {(keyword, asin): enriched product}
+        self.variants = {}  # {(keyword, asin): variation data registered from the product's page}
+        self.completed = False
+
+        if resume and self.path.exists():
+            self._load()
+            logger.info(f"  Journal: resumed {len(self.search_pages)} search pages, {len(self.products)} products")
+        elif self.path.exists():
+            self.path.unlink()
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Replay journal records into memory (tolerates a torn last line)"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"  ⚠ Journal line {line_num} is incomplete - ignoring")
+                    continue
+
+                record_type = record.get('type')
+                if record_type == 'search_page':
+                    self.search_pages[record['keyword']] = record['products']
+                elif record_type == 'product':
+                    self.products[(record['keyword'], record['asin'])] = record['product']
+                elif record_type == 'variants':
+                    self.variants[(record['keyword'], record['asin'])] = record['variants']
+                elif record_type == 'run_complete':
+                    self.completed = True
+
+    def _append(self, record: Dict):
+        """Write one record and force it to disk"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record_search_page(self, keyword: str, products: List[Dict]):
+        """Checkpoint parsed search results for a keyword (disk only - not kept in memory)"""
+        self._append({'type': 'search_page', 'keyword': keyword, 'products': products})
+
+    def record_product(self, keyword: str, product: Dict):
+        """Checkpoint an enriched product for a keyword (disk only - not kept in memory)"""
+        self._append({'type': 'product', 'keyword': keyword, 'asin': product.get('asin'), 'product': product})
+
+    def record_variants(self, keyword: str, asin: str, variants: Dict):
+        """Checkpoint the variation data a product page contributed (disk only - not kept in memory)"""
+        self._append({'type': 'variants', 'keyword': keyword, 'asin': asin, 'variants': variants})
+
+    def record_complete(self):
+        """Mark the run as fully saved"""
+        self.completed = True
+        self._append({'type': 'run_complete'})
+
+    def get_search_page(self, keyword: str) -> Optional[List[Dict]]:
+        """Return checkpointed search results, or None if not journaled"""
+        return self.search_pages.get(keyword)
+
+    def get_product(self, keyword: str, asin: str) -> Optional[Dict]:
+        """Return checkpointed enriched product, or None if not journaled"""
+        return self.products.get((keyword, asin))
+
+    def get_variants(self, keyword: str, asin: str) -> Optional[Dict]:
+        """Return checkpointed variation data, or None if the page had none (or was not journaled)"""
+        return self.variants.get((keyword, asin))
+
+    def close(self):
+        """Close the journal file"""
+        self._file.close()
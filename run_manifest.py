@@ -0,0 +1,276 @@
+"""
+RUN MANIFEST: Indexed Access to Past Runs
+- Append-only output/{country}/manifest.jsonl with one small line per saved run
+  (run id, timestamp, output files, keyword/product counts)
+- A per-run keyword index (keyword_index_{timestamp}.json) stores each keyword's
+  byte range in the consolidated file
+- A run id → manifest offset map (manifest_offsets.json) gives direct access to any run;
+  a re-parsed entry supersedes the run's original entry
+- Readers open the latest (or any) run without globbing the directory, and seek
+  straight to the keywords they need instead of loading the whole file
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.jsonl'
+OFFSETS_FILE = 'manifest_offsets.json'
+CONSOLIDATED_PREFIX = 'all_keywords_'
+
+
+def index_path(consolidated_file: Path) -> Path:
+    """
+    Keyword index file next to a consolidated file (all_keywords_X.json → keyword_index_X.json)
+
+    Named outside the all_keywords_*.json pattern so globs for run data never pick it up.
+    """
+    consolidated_file = Path(consolidated_file)
+    timestamp = consolidated_file.stem
+    if timestamp.startswith(CONSOLIDATED_PREFIX):
+        timestamp = timestamp[len(CONSOLIDATED_PREFIX):]
+    return consolidated_file.with_name(f"keyword_index_{timestamp}.json")
+
+
+class RunManifest:
+    """Append-only list of one country's saved runs"""
+
+    def __init__(self, country_dir: Path):
+        """
+        Args:
+            country_dir: Country output directory (e.g. output/uk)
+        """
+        self.country_dir = Path(country_dir)
+        self.path = self.country_dir / MANIFEST_FILE
+        self.offsets_path = self.country_dir / OFFSETS_FILE
+
+    def record_run(self, run_id: str, consolidated_file: Path, keyword_index: List[Dict],
+                   stream_file: Optional[Path] = None, reparsed: bool = False) -> Dict:
+        """
+        Write the run's keyword index, then append the run to the manifest
+
+        Args:
+            run_id: Run timestamp (as used in output filenames)
+            consolidated_file: The run's all_keywords_*.json
+            keyword_index: Byte ranges from ResultStream.write_views
+            stream_file: The run's products_*.jsonl (optional)
+            reparsed: Output regenerated from archived HTML (see html_archive.py); the entry
+                      supersedes earlier entries with the same run_id (a later original entry does not)
+
+        Returns:
+            The manifest entry
+        """
+        keyword_index_file = index_path(consolidated_file)
+        tmp_path = keyword_index_file.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'run_id': run_id, 'keywords': keyword_index}, f, ensure_ascii=False)
+        os.replace(tmp_path, keyword_index_file)
+
+        entry = {
+            'run_id': run_id,
+            'created_at': datetime.now().isoformat(),
+            'consolidated': Path(consolidated_file).name,
+            'index': keyword_index_file.name,
+            'stream': Path(stream_file).name if stream_file else None,
+            'keywords': len(keyword_index),
+            'successful': sum(1 for k in keyword_index if k['status'] == 'success'),
+            'products': sum(k['products'] for k in keyword_index)
+        }
+        if reparsed:
+            entry['reparsed'] = True
+        # One short line per run, appended in a single write
+        offsets = self._offsets()
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            size = f.tell()
+        if offsets['size'] == offset:
+            self._map_entry(offsets, entry, offset)
+            offsets['size'] = size
+            self._save_offsets(offsets)
+        return entry
+
+    @staticmethod
+    def _map_entry(offsets: Dict, entry: Dict, offset: int):
+        """Point the run id at an entry unless a re-parsed entry already supersedes it"""
+        run_id = entry['run_id']
+        if entry.get('reparsed'):
+            offsets['reparsed'][run_id] = True
+        elif run_id in offsets['reparsed']:
+            return
+        offsets['runs'][run_id] = offset
+
+    def _offsets(self) -> Dict:
+        """
+        Run id → byte offset of its current manifest line (the latest re-parsed one, if any)
+
+        The map is caught up from the manifest lines appended since it was last
+        saved (rebuilt if the manifest was replaced), so lookups never scan the whole file.
+
+        Returns:
+            {'size': manifest bytes covered, 'runs': {run_id: offset}, 'reparsed': {run_id: True}}
+        """
+        offsets = {'size': 0, 'runs': {}, 'reparsed': {}}
+        if self.offsets_path.exists():
+            try:
+                with open(self.offsets_path, 'r', encoding='utf-8') as f:
+                    offsets = {'reparsed': {}, **json.load(f)}
+            except (OSError, json.JSONDecodeError):
+                logger.warning(f"  ⚠ {self.offsets_path.name} unreadable - rebuilding")
+
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if offsets['size'] > size:
+            offsets = {'size': 0, 'runs': {}, 'reparsed': {}}
+        if offsets['size'] == size:
+            return offsets
+
+        with open(self.path, 'rb') as f:
+            f.seek(offsets['size'])
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # End of file, or a line still being written
+                if line.strip():
+                    self._map_entry(offsets, json.loads(line), offset)
+                offsets['size'] = f.tell()
+        self._save_offsets(offsets)
+        return offsets
+
+    def _save_offsets(self, offsets: Dict):
+        """Persist the offset map (atomic write)"""
+        tmp_path = self.offsets_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(offsets, f)
+        os.replace(tmp_path, self.offsets_path)
+
+    def _read_at(self, offset: int) -> Dict:
+        """Manifest entry starting at a byte offset"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def runs(self) -> Iterator[Dict]:
+        """All recorded runs, oldest first"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def current(self) -> List[Dict]:
+        """
+        One entry per run - the re-parsed entry where it supersedes the original - oldest run first
+
+        Used by stores that ingest runs: a superseding entry with a different consolidated
+        file than the one a store ingested must be ingested again (see pending).
+        """
+        offsets = self._offsets()
+        return [self._read_at(offset) for _, offset in sorted(offsets['runs'].items())]
+
+    def pending(self, ingested: Dict[str, Optional[str]]) -> List[Dict]:
+        """
+        Current entries a store still has to (re-)ingest, oldest run first
+
+        Args:
+            ingested: {run_id: consolidated file the store ingested} (None for rows
+                      recorded before superseding entries were tracked: the original entry)
+
+        Returns:
+            Entries of runs not ingested yet, or re-parsed since they were ingested
+        """
+        pending = []
+        for entry in self.current():
+            if entry['run_id'] not in ingested:
+                pending.append(entry)
+                continue
+            # A row without a recorded file ingested the run's original entry
+            ingested_file = ingested[entry['run_id']]
+            if ingested_file != entry['consolidated'] and (ingested_file is not None or entry.get('reparsed')):
+                pending.append(entry)
+        return pending
+
+    def latest(self) -> Optional[Dict]:
+        """Most recent run by run id - its re-parsed entry if there is one (None if there is none)"""
+        runs = self._offsets()['runs']
+        return self._read_at(runs[max(runs)]) if runs else None
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        """Manifest entry for a specific run - its latest one if it was re-parsed (None if not recorded)"""
+        offset = self._offsets()['runs'].get(run_id)
+        return self._read_at(offset) if offset is not None else None
+
+    def open_run(self, run_id: Optional[str] = None) -> Optional['RunReader']:
+        """
+        Open a run for reading
+
+        Args:
+            run_id: Run to open (None for the latest)
+
+        Returns:
+            RunReader, or None if the run is not in the manifest
+        """
+        entry = self.get(run_id) if run_id else self.latest()
+        return RunReader(self.country_dir, entry) if entry else None
+
+
+class RunReader:
+    """Random access to one run's keyword results"""
+
+    def __init__(self, country_dir: Path, entry: Dict):
+        """
+        Args:
+            country_dir: Country output directory
+            entry: Manifest entry of the run
+        """
+        self.entry = entry
+        self.consolidated_file = Path(country_dir) / entry['consolidated']
+        with open(Path(country_dir) / entry['index'], 'r', encoding='utf-8') as f:
+            self.index = json.load(f)['keywords']
+        self._by_keyword = {}
+        for item in self.index:
+            self._by_keyword.setdefault(item['keyword'], item)
+
+    @property
+    def run_id(self) -> str:
+        return self.entry['run_id']
+
+    @property
+    def keywords(self) -> List[str]:
+        """Keywords of the run, in output order"""
+        return [item['keyword'] for item in self.index]
+
+    def read(self, keyword: str) -> Optional[Dict]:
+        """One keyword's result (None if the run does not have it)"""
+        item = self._by_keyword.get(keyword)
+        if item is None:
+            return None
+        with open(self.consolidated_file, 'rb') as f:
+            f.seek(item['offset'])
+            return json.loads(f.read(item['length']))
+
+    def iter_results(self, keywords: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Stream keyword results (one in memory at a time)
+
+        Args:
+            keywords: Only these keywords (default: all, in output order)
+
+        Yields:
+            Keyword result dicts
+        """
+        if keywords is None:
+            items = self.index
+        else:
+            items = [self._by_keyword[k] for k in keywords if k in self._by_keyword]
+
+        with open(self.consolidated_file, 'rb') as f:
+            for item in items:
+                f.seek(item['offset'])
+                yield json.loads(f.read(item['length']))
@@ -0,0 +1,341 @@
+"""
+RUN PLANNER: Dry-Run Estimates & Run Budgets
+- Estimates requests, provider credits and wall time before a run (dry-run mode)
+- Learns from past runs recorded in output/run_history.jsonl
+- Enforces hard credit/time budgets during a real run
+"""
+
+import json
+import math
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from run_journal import RunJournal
+from keyword_source import KeywordSource, KeywordProgress
+
+logger = logging.getLogger(__name__)
+
+# Provider credits charged per page request
+# ScraperAPI charges 10 credits for render=true, Firecrawl 1 credit per scrape
+DEFAULT_CREDITS_PER_REQUEST = {'firecrawl': 1, 'scraperapi': 10}
+
+# Used when no run history exists yet (see API_USAGE.md: ~7-10 seconds per page)
+DEFAULT_SECONDS_PER_REQUEST = 8.0
+
+# Organic (non-sponsored) results on a typical search page, used to estimate search depth
+ORGANIC_RESULTS_PER_PAGE = 16
+
+HISTORY_FILE = 'run_history.jsonl'
+
+
+def append_run_history(output_dir: Path, record: Dict):
+    """
+    Append one country run's metrics to output/run_history.jsonl
+
+    Args:
+        output_dir: Base output directory
+        record: Run metrics (country, keywords, requests, wall_seconds, ...)
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(output_dir) / HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def load_run_history(output_dir: Path, limit: int = 20) -> List[Dict]:
+    """
+    Load the most recent run metrics
+
+    Args:
+        output_dir: Base output directory
+        limit: Maximum number of records to return
+
+    Returns:
+        List of run metric records (oldest first)
+    """
+    history_file = Path(output_dir) / HISTORY_FILE
+    if not history_file.exists():
+        return []
+
+    records = []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records[-limit:]
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of sending a request once the run budget is spent"""
+
+
+class RunBudget:
+    """Hard credit and time limits for a run, shared by all countries"""
+
+    def __init__(self, max_credits: Optional[Dict[str, float]] = None, max_minutes: Optional[float] = None,
+                 credits_per_request: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            max_credits: Per-provider credit limits, e.g. {'scraperapi': 50000}
+            max_minutes: Wall-time limit for the whole run
+            credits_per_request: Per-provider credits charged per request
+        """
+        self.max_credits = max_credits or {}
+        self.max_minutes = max_minutes
+        self.credits_per_request = credits_per_request or DEFAULT_CREDITS_PER_REQUEST
+        self.start_time = time.monotonic()
+        self.requests = 0
+        self.exhausted_reason = None
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> Optional['RunBudget']:
+        """Build a budget from config settings, or None if no budget is configured"""
+        budget = settings.get('budget')
+        if not budget:
+            return None
+        return cls(
+            max_credits=budget.get('max_credits'),
+            max_minutes=budget.get('max_minutes'),
+            credits_per_request=settings.get('credits_per_request')
+        )
+
+    @property
+    def exhausted(self) -> bool:
+        return self.exhausted_reason is not None
+
+    def credits_used(self) -> Dict[str, float]:
+        """Credits spent so far per provider"""
+        return {p: self.requests * c for p, c in self.credits_per_request.items()}
+
+    def charge(self) -> bool:
+        """
+        Reserve credits for one request
+
+        Returns:
+            True if the request fits in the budget, False once any limit is reached
+        """
+        if self.exhausted:
+            return False
+
+        if self.max_minutes is not None:
+            elapsed_minutes = (time.monotonic() - self.start_time) / 60
+            if elapsed_minutes >= self.max_minutes:
+                self.exhausted_reason = f"time budget reached ({self.max_minutes} min)"
+                return False
+
+        for provider, limit in self.max_credits.items():
+            cost = self.credits_per_request.get(provider, 0)
+            if (self.requests + 1) * cost > limit:
+                self.exhausted_reason = f"{provider} credit budget reached ({limit})"
+                return False
+
+        self.requests += 1
+        return True
+
+
+class RunPlanner:
+    """Estimates the cost of a run from config, run history and local caches"""
+
+    def __init__(self, config: Dict, resume: bool = False):
+        """
+        Args:
+            config: Parsed config.json
+            resume: Account for work already in the run journals
+        """
+        self.config = config
+        self.settings = config['settings']
+        self.resume = resume
+        self.output_dir = Path(self.settings['output_dir'])
+        self.credits_per_request = self.settings.get('credits_per_request', DEFAULT_CREDITS_PER_REQUEST)
+        self.history = load_run_history(self.output_dir)
+        self.keyword_source = KeywordSource.from_config(config)
+        self.keyword_count = self.keyword_source.count()
+        self.enriched_keywords = self._enriched_keyword_count()
+
+    def _countries(self) -> List[str]:
+        countries = self.settings.get('countries')
+        if countries and isinstance(countries, list):
+            return countries
+        return [self.settings.get('country', 'uk')]
+
+    def _enriched_keyword_count(self) -> int:
+        """Keywords that fetch product pages (search-depth keywords only fetch search pages)"""
+        enrichment = self.settings.get('enrichment') or {}
+        run_depth = enrichment.get('depth', 'full')
+        count = self.keyword_count if run_depth != 'search' else 0
+        for depth in enrichment.get('keywords', {}).values():
+            if (depth == 'search') != (run_depth == 'search'):
+                count += -1 if depth == 'search' else 1
+        return min(max(count, 0), self.keyword_count)
+
+    def _history_stats(self, country: str) -> Dict:
+        """
+        Derive per-request rates from past runs (country-specific if available)
+
+        Returns:
+            Dictionary with requests_per_slot, seconds_per_request, store_hit_rate, runs
+        """
+        records = [r for r in self.history if r.get('country') == country] or self.history
+        records = [r for r in records if r.get('requests') and r.get('product_slots')]
+
+        if not records:
+            return {
+                'requests_per_slot': 1.0,
+                'search_pages_per_keyword': None,
+                'seconds_per_request': DEFAULT_SECONDS_PER_REQUEST,
+                'store_hit_rate': 0.0,
+                'runs': 0
+            }
+
+        # Search page requests per keyword (older records predate multi-page search)
+        search_requests = sum(r.get('search_requests', r['keywords']) for r in records)
+        keywords = sum(r['keywords'] for r in records)
+
+        # Product-page requests per planned product slot (captures fill rate, retries, cache hits)
+        product_requests = sum(max(r['requests'] - r.get('search_requests', r['keywords']), 0) for r in records)
+        product_slots = sum(r['product_slots'] for r in records)
+
+        # Effective seconds per request per concurrency slot
+        busy_seconds = sum(r['wall_seconds'] * r.get('max_concurrent', 1) for r in records)
+        total_requests = sum(r['requests'] for r in records)
+
+        products = sum(r.get('products', 0) for r in records)
+        store_hits = sum(r.get('store_hits', 0) for r in records)
+
+        return {
+            'requests_per_slot': product_requests / product_slots if product_slots else 1.0,
+            'search_pages_per_keyword': search_requests / keywords if keywords else None,
+            'seconds_per_request': busy_seconds / total_requests if total_requests else DEFAULT_SECONDS_PER_REQUEST,
+            'store_hit_rate': store_hits / products if products else 0.0,
+            'runs': len(records)
+        }
+
+    def _journaled_work(self, country: str):
+        """
+        Count keywords done in earlier sessions (keyword_progress.json), then search pages
+        and products in the country's run journal for the keywords still pending
+
+        Returns:
+            Tuple of (done_keywords, journaled_searches, journaled_products, journal_complete)
+        """
+        if not self.resume:
+            return 0, 0, 0, False
+        progress_path = self.output_dir / country / 'keyword_progress.json'
+        progress = KeywordProgress(progress_path, self.keyword_source, resume=True) if progress_path.exists() else None
+        done_keywords = progress.done if progress else 0
+
+        journal_path = self.output_dir / country / 'run_journal.jsonl'
+        if not journal_path.exists():
+            return done_keywords, 0, 0, False
+        journal = RunJournal(journal_path, resume=True)
+        journal.close()
+        if journal.completed:
+            return done_keywords, 0, 0, True
+
+        # A journal kept for failed keywords also holds keywords the cursors already cover
+        pending = {keyword for _, keyword, _ in progress.pending()} if progress else None
+        searches = sum(1 for keyword in journal.search_pages if pending is None or keyword in pending)
+        products = sum(1 for keyword, _ in journal.products if pending is None or keyword in pending)
+        return done_keywords, searches, products, False
+
+    def plan(self) -> Dict:
+        """
+        Estimate the run
+
+        Returns:
+            Dictionary with per-country estimates and totals
+        """
+        keywords = self.keyword_count
+        max_products = self.settings.get('max_products_to_scrape', 10)
+        max_concurrent = self.settings.get('max_concurrent', 1)
+        search_pages = self.settings.get('search_pages', 1)
+
+        countries = {}
+        for country in self._countries():
+            stats = self._history_stats(country)
+            done_keywords, done_searches, done_products, completed = self._journaled_work(country)
+            keywords_left = max(keywords - done_keywords, 0)
+            enriched_left = round(self.enriched_keywords * keywords_left / keywords) if keywords else 0
+
+            if completed:
+                search_requests = 0
+                product_requests = 0.0
+            else:
+                # Deeper pages are only fetched until max_products unique ASINs are found
+                pages_per_keyword = min(search_pages, math.ceil(max_products / ORGANIC_RESULTS_PER_PAGE))
+                if stats['search_pages_per_keyword'] and search_pages > 1:
+                    pages_per_keyword = min(search_pages, stats['search_pages_per_keyword'])
+                search_requests = round(max(keywords_left - done_searches, 0) * max(pages_per_keyword, 1))
+                product_slots = max(enriched_left * max_products - done_products, 0)
+                product_requests = product_slots * stats['requests_per_slot']
+
+            # Searches run one keyword at a time; product pages run in parallel
+            parallel = max(min(max_concurrent, max_products), 1)
+            wall_seconds = (search_requests + product_requests / parallel) * stats['seconds_per_request']
+
+            requests = search_requests + product_requests
+            countries[country] = {
+                'search_requests': search_requests,
+                'product_requests': round(product_requests),
+                'requests': round(requests),
+                'expected_store_hits': round(enriched_left * max_products * stats['store_hit_rate'])
+                if self.settings.get('asin_store') else 0,
+                'journaled': {'keywords': done_keywords, 'search_pages': done_searches, 'products': done_products,
+                              'complete': completed},
+                'wall_seconds': round(wall_seconds),
+                'history_runs': stats['runs']
+            }
+
+        total_requests = sum(c['requests'] for c in countries.values())
+        return {
+            'countries': countries,
+            'total_requests': total_requests,
+            'credits': {p: total_requests * c for p, c in self.credits_per_request.items()},
+            'wall_seconds': sum(c['wall_seconds'] for c in countries.values()),
+            'expected_store_hits': sum(c['expected_store_hits'] for c in countries.values()),
+            'budget': self.settings.get('budget')
+        }
+
+    def log_plan(self, plan: Dict):
+        """Log a human-readable summary of the plan"""
+        logger.info(f"\n{'#'*80}")
+        logger.info(f"# DRY RUN: RUN PLAN")
+        logger.info(f"{'#'*80}")
+        logger.info(f"Keywords: {self.keyword_count} | "
+                    f"Products per keyword: {self.settings.get('max_products_to_scrape', 10)} | "
+                    f"Concurrency: {self.settings.get('max_concurrent', 1)}")
+
+        for country, estimate in plan['countries'].items():
+            journaled = estimate['journaled']
+            line = (f"  {country.upper()}: ~{estimate['requests']} requests "
+                    f"({estimate['search_requests']} search + {estimate['product_requests']} product), "
+                    f"~{estimate['wall_seconds'] / 60:.1f} min")
+            if estimate['expected_store_hits']:
+                line += f", ~{estimate['expected_store_hits']} ASIN store hits"
+            if journaled['complete']:
+                line += " [journal complete - nothing to fetch]"
+            elif journaled['keywords'] or journaled['search_pages'] or journaled['products']:
+                line += (f" [resuming: {journaled['keywords']} keywords done, {journaled['search_pages']} searches, "
+                         f"{journaled['products']} products journaled]")
+            if not estimate['history_runs']:
+                line += " (no run history - using defaults)"
+            logger.info(line)
+
+        credits = ', '.join(f"{p}: {c:,.0f}" for p, c in plan['credits'].items())
+        logger.info(f"\nTotal requests: ~{plan['total_requests']}")
+        logger.info(f"Estimated credits: {credits}")
+        logger.info(f"Estimated wall time: ~{plan['wall_seconds'] / 60:.1f} min")
+
+        budget = plan['budget']
+        if budget:
+            for provider, limit in (budget.get('max_credits') or {}).items():
+                estimate = plan['credits'].get(provider, 0)
+                status = 'OK' if estimate <= limit else 'OVER BUDGET - run will stop early'
+                logger.info(f"Budget {provider}: {limit:,} credits → {status}")
+            if budget.get('max_minutes') is not None:
+                status = 'OK' if plan['wall_seconds'] / 60 <= budget['max_minutes'] else 'OVER BUDGET - run will stop early'
+                logger.info(f"Budget time: {budget['max_minutes']} min → {status}")
+        logger.info(f"{'#'*80}\n")
@@ -0,0 +1,104 @@
+"""
+SEARCH CACHE: Recent Search Results per Keyword
+- Stores parsed search results per (country, keyword) in a local SQLite database
+- Fresh entries (within ttl_hours) let a run skip the search page fetch entirely
+- The previous ranking is also used by the refresh-positions mode to spot ASINs whose position is unchanged
+"""
+
+import json
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def unchanged_positions(previous: List[Dict], current: List[Dict]) -> Set[str]:
+    """
+    ASINs that hold the same search position in both rankings
+
+    Args:
+        previous: Cached search results
+        current: Freshly parsed search results
+
+    Returns:
+        Set of ASINs whose search_position did not change
+    """
+    previous_positions = {p.get('asin'): p.get('search_position') for p in previous}
+    return {
+        p['asin'] for p in current
+        if p.get('asin') in previous_positions and previous_positions[p['asin']] == p.get('search_position')
+    }
+
+
+class SearchCache:
+    """SQLite-backed cache of parsed search results with a time-to-live"""
+
+    def __init__(self, db_path: str, ttl_hours: float = 24):
+        """
+        Open (or create) the cache
+
+        Args:
+            db_path: Path to SQLite database file
+            ttl_hours: How long cached search results count as fresh
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_hours = ttl_hours
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                country TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                products TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (country, keyword)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, country: str, keyword: str, fresh_only: bool = True) -> Optional[Dict]:
+        """
+        Look up cached search results
+
+        Args:
+            country: Country code
+            keyword: Search keyword
+            fresh_only: Return None for entries older than ttl_hours
+
+        Returns:
+            {'products': [...], 'age_hours': float}, or None if missing (or stale)
+        """
+        row = self.conn.execute(
+            "SELECT products, fetched_at FROM search_results WHERE country = ? AND keyword = ?",
+            (country, keyword)
+        ).fetchone()
+        if row is None:
+            return None
+
+        age_hours = (time.time() - row[1]) / 3600
+        if fresh_only and age_hours > self.ttl_hours:
+            return None
+        return {'products': json.loads(row[0]), 'age_hours': age_hours}
+
+    def put(self, country: str, keyword: str, products: List[Dict]):
+        """
+        Store freshly parsed search results
+
+        Args:
+            country: Country code
+            keyword: Search keyword
+            products: Parsed search results (all pages, in search order)
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO search_results (country, keyword, products, fetched_at) VALUES (?, ?, ?, ?)",
+            (country, keyword, json.dumps(products, ensure_ascii=False), time.time())
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
@@ -0,0 +1,71 @@
+"""
+ANALYZER TESTS: Map-Reduce Analysis
+- A market whose prompt exceeds max_prompt_tokens is analyzed in keyword chunks (StubBackend, no API calls)
+"""
+
+import asyncio
+
+from layer4_analyzer import AIAnalyzer, StubBackend
+
+
+class RecordingBackend(StubBackend):
+    """StubBackend that keeps every prompt it was sent"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    async def complete(self, model: str, system: str, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return await super().complete(model, system, prompt)
+
+
+def _keyword_results(count: int):
+    return [{
+        'keyword': f"keyword {i}",
+        'status': 'success',
+        'products': [{
+            'asin': f"B0TEST{i:02d}{j:02d}",
+            'title': f"Product {i}-{j} " + 'with a long descriptive title ' * 3,
+            'price': 10.0 + j,
+            'rating': 4.5,
+            'review_count': 100 * j,
+            'search_position': j + 1,
+            'bsr_subcategories': [{'rank': 100 + j, 'category': 'Vitamins'}]
+        } for j in range(5)]
+    } for i in range(count)]
+
+
+def test_oversized_market_is_analyzed_in_chunks():
+    backend = RecordingBackend()
+    # Built outside any event loop: the request semaphore must not depend on one
+    analyzer = AIAnalyzer(backend=backend, max_concurrent=2, max_prompt_tokens=1500)
+    data = _keyword_results(12)
+
+    _, sections = analyzer._summary_sections(data)
+    full_prompt = analyzer._build_prompt('uk', len(data), analyzer._join_summary('', sections))
+    assert analyzer.tokens.count(full_prompt) > analyzer.max_prompt_tokens
+
+    report = asyncio.run(analyzer.analyze_country_data('uk', data))
+
+    chunk_prompts = [p for p in backend.prompts if 'This is part' in p]
+    reduce_prompts = [p for p in backend.prompts if 'Combine the partial analyses' in p]
+    assert len(chunk_prompts) >= 2
+    assert len(reduce_prompts) == 1 and backend.prompts[-1] == reduce_prompts[0]
+    assert report.startswith('## Stub Analysis')
+
+    # Every keyword is in exactly one chunk, in order, and every chunk fits the budget
+    seen = [line for p in chunk_prompts for line in p.splitlines() if line.startswith('**Keyword:')]
+    assert seen == [line for s in sections for line in s.splitlines() if line.startswith('**Keyword:')]
+    assert len(seen) == len(data)
+    assert all(analyzer.tokens.count(p) <= analyzer.max_prompt_tokens for p in chunk_prompts)
+
+
+def test_small_market_is_a_single_request():
+    backend = RecordingBackend()
+    analyzer = AIAnalyzer(backend=backend, max_prompt_tokens=100_000)
+
+    asyncio.run(analyzer.analyze_country_data('uk', _keyword_results(2)))
+
+    assert len(backend.prompts) == 1
+    assert 'This is part' not in backend.prompts[0]
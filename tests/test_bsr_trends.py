@@ -0,0 +1,85 @@
+"""
+BSR TRENDS TESTS: Order-Independent Ingestion
+- Runs ingested out of order, then a re-parsed run, must leave the same statistics
+  as ingesting the final version of every run from scratch in run order
+"""
+
+import pytest
+
+from bsr_trends import TrendStore
+
+RUNS = ['20250101_000000', '20250102_000000', '20250103_000000', '20250104_000000']
+
+
+def _results(run_index: int, shift: int = 0):
+    """Two keywords over five ASINs; ranks move differently per run, some ASINs miss some runs"""
+    products = []
+    for i in range(5):
+        if (i + run_index) % 4 == 0:
+            continue  # Not listed in this run
+        rank = 100 + 37 * ((i * 7 + run_index * (3 + i)) % 11) + shift
+        products.append({
+            'asin': f"B0TEST{i:04d}",
+            'search_position': i + 1,
+            'bsr_subcategories': [{'rank': rank, 'category': 'Vitamins'},
+                                  {'rank': rank * 3 + i, 'category': f"Sub {i % 2}"}]
+        })
+    return [
+        {'keyword': 'alpha', 'status': 'success', 'products': products[:3]},
+        {'keyword': 'beta', 'status': 'success', 'products': products[2:]},
+        {'keyword': 'gamma', 'status': 'failed', 'products': []}
+    ]
+
+
+def _snapshot(store: TrendStore):
+    stats = store.conn.execute(
+        "SELECT asin, category, level, last_run, last_rank, prev_rank, moving_avg, best_rank, points "
+        "FROM rank_stats WHERE country = 'uk' ORDER BY asin, category"
+    ).fetchall()
+    points = store.conn.execute(
+        "SELECT asin, category, run_id, level, rank FROM rank_points WHERE country = 'uk' ORDER BY 1, 2, 3"
+    ).fetchall()
+    listings = store.conn.execute(
+        "SELECT run_id, keyword, asin, search_position FROM keyword_asins WHERE country = 'uk' ORDER BY 1, 2, 3"
+    ).fetchall()
+    return {
+        'stats': [row[:6] + (pytest.approx(row[6]),) + row[7:] for row in stats],
+        'points': points,
+        'listings': listings,
+        'movers': {run_id: store.movers('uk', run_id) for run_id in RUNS},
+        'keyword_movers': {run_id: store.keyword_movers('uk', run_id) for run_id in RUNS},
+        'latest': store.latest_run('uk')
+    }
+
+
+def test_out_of_order_and_reparsed_runs_match_a_rebuild(tmp_path):
+    store = TrendStore(str(tmp_path / 'incremental.sqlite'))
+    for index in (0, 2, 1, 3):  # Run 2 arrives after run 3
+        store.ingest_run('uk', RUNS[index], _results(index), f"all_keywords_{RUNS[index]}.json")
+    store.ingest_run('uk', RUNS[2], _results(2, shift=5), f"all_keywords_{RUNS[2]}_reparsed.json")
+    store.ingest_run('uk', RUNS[0], _results(0, shift=-3), f"all_keywords_{RUNS[0]}_reparsed.json")
+
+    rebuilt = TrendStore(str(tmp_path / 'rebuilt.sqlite'))
+    for index, shift in enumerate((-3, 0, 5, 0)):
+        rebuilt.ingest_run('uk', RUNS[index], _results(index, shift))
+
+    expected = _snapshot(rebuilt)
+    assert any(groups['movers'] or groups['losers'] for groups in expected['movers'].values())
+    assert _snapshot(store) == expected
+    assert store.ingested('uk')[RUNS[2]] == f"all_keywords_{RUNS[2]}_reparsed.json"
+    store.close()
+    rebuilt.close()
+
+
+def test_late_run_matches_a_rebuild(tmp_path):
+    store = TrendStore(str(tmp_path / 'incremental.sqlite'))
+    for index in (0, 2, 3, 1):  # Run 2 arrives last
+        store.ingest_run('uk', RUNS[index], _results(index))
+
+    rebuilt = TrendStore(str(tmp_path / 'rebuilt.sqlite'))
+    for index in range(len(RUNS)):
+        rebuilt.ingest_run('uk', RUNS[index], _results(index))
+
+    assert _snapshot(store) == _snapshot(rebuilt)
+    store.close()
+    rebuilt.close()
@@ -0,0 +1,151 @@
+"""
+RESUME TESTS: Crash and --resume
+- fetch_with_firecrawl is replaced by a stub serving generated search and product pages
+- A run that crashes after any number of fetches, then resumes, must write the same
+  consolidated output as an uninterrupted run and fetch nothing twice
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from layer3_orchestrator import AmazonScraper
+
+KEYWORDS = ['alpha', 'beta', 'gamma']
+# Search listings per keyword: beta repeats two of alpha's ASINs, gamma one of beta's
+LISTINGS = {
+    'alpha': ['B0TEST0000', 'B0TEST0001', 'B0TEST0002', 'B0TEST0003'],
+    'beta': ['B0TEST0002', 'B0TEST0003', 'B0TEST0004', 'B0TEST0005'],
+    'gamma': ['B0TEST0005', 'B0TEST0006', 'B0TEST0007', 'B0TEST0008'],
+}
+VARIANT_PARENT = 'B0PARENT00'
+VARIANTS = {'B0TEST0004': 'Red', 'B0TEST0006': 'Blue'}  # B0TEST0006 is folded into B0TEST0004's family
+
+
+class Crash(BaseException):
+    """Process death: not an Exception, so no handler in the scraper swallows it"""
+
+
+def _search_page(keyword: str) -> str:
+    items = []
+    for position, asin in enumerate(LISTINGS[keyword]):
+        number = int(asin[-2:])
+        items.append(
+            f'<div data-component-type="s-search-result" data-asin="{asin}">'
+            f'<h2>Product {number}</h2><span class="a-price-whole">1{number}</span>'
+            f'<span class="a-price-fraction">99</span><span class="a-icon-alt">4.{position} out of 5 stars</span>'
+            f'<a aria-label="1,2{number} ratings"><span>x</span></a>'
+            f'<img class="s-image" src="https://m.media-amazon.com/images/I/img{number}.jpg"/></div>'
+        )
+    return '<html><body>' + '\n'.join(items) + '</body></html>' + ' ' * 1000
+
+
+def _product_page(asin: str) -> str:
+    number = int(asin[-2:])
+    twister = ''
+    if asin in VARIANTS:
+        values = json.dumps({child: [color] for child, color in VARIANTS.items()})
+        twister = (f'<script>{{"parentAsin":"{VARIANT_PARENT}","dimensions":["color_name"],'
+                   f'"dimensionValuesDisplayData":{values}}}</script>')
+    return (
+        '<html><body><div id="detailBulletsWrapper_feature_div"><ul><li><span>Best Sellers Rank: '
+        f'<ul class="a-unordered-list"><li>#1,234 in Health (See Top 100)</li><li>#{100 + number} in Vitamins</li>'
+        f'</ul></span></li></ul></div>{twister}<div id="altImages">'
+        f'<img src="https://m.media-amazon.com/images/I/{asin}a._AC_US40_.jpg"/></div></body></html>' + ' ' * 1000
+    )
+
+
+def _config(tmp_path, name: str) -> str:
+    config = {
+        'api_keys': {'scraperapi': 'test', 'firecrawl': 'test'},
+        'settings': {
+            'country': 'uk',
+            'max_concurrent': 1,  # One fetch at a time: the crash point is exact
+            'max_products_to_scrape': 4,
+            'output_dir': str(tmp_path / name),
+            'bsr_retry': {'backoff_seconds': 0},
+            'variant_folding': {'skip_fetch': True}
+        },
+        'keywords': KEYWORDS
+    }
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def _scraper(config_path: str, calls: list, resume: bool = False, crash_after: int = None) -> AmazonScraper:
+    scraper = AmazonScraper(config_path, resume=resume)
+
+    async def fetch(url):
+        if crash_after is not None and len(calls) >= crash_after:
+            raise Crash(url)
+        calls.append(url)
+        if '/s?' in url:
+            return _search_page(url.split('k=')[1].split('&')[0])
+        return _product_page(url.rstrip('/').rsplit('/', 1)[1])
+
+    scraper.http_client.fetch_with_firecrawl = fetch
+    return scraper
+
+
+def _consolidated(config_path: str):
+    """The run's consolidated output, without the wall-clock scrape dates"""
+    with open(config_path) as f:
+        country_dir = f"{json.load(f)['settings']['output_dir']}/uk"
+    with open(f"{country_dir}/manifest.jsonl") as f:
+        manifest = [json.loads(line) for line in f]
+    with open(f"{country_dir}/{manifest[-1]['consolidated']}") as f:
+        results = json.load(f)
+    for result in results:
+        result.pop('scrape_date', None)
+    return results, manifest
+
+
+@pytest.fixture(scope='module')
+def uninterrupted(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('uninterrupted')
+    config_path = _config(tmp_path, 'run')
+    calls = []
+    asyncio.run(_scraper(config_path, calls).scrape_all())
+    results, _ = _consolidated(config_path)
+    return results, calls
+
+
+def test_uninterrupted_run_covers_duplicates_and_variants(uninterrupted):
+    results, calls = uninterrupted
+    assert [r['status'] for r in results] == ['success'] * len(KEYWORDS)
+    products = {(r['keyword'], p['asin']): p for r in results for p in r['products']}
+    assert products[('beta', 'B0TEST0002')]['first_seen_in'] == 'alpha'
+    assert products[('gamma', 'B0TEST0006')]['variant_of'] == 'B0TEST0004'
+    folded, source = products[('gamma', 'B0TEST0006')], products[('beta', 'B0TEST0004')]
+    assert folded['bsr_subcategories'] == source['bsr_subcategories']
+    assert not any(call.endswith('B0TEST0006') for call in calls)  # The folded sibling's page is never fetched
+
+
+@pytest.mark.parametrize('crash_after', range(14))  # Every fetch of the run (see the test above)
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, uninterrupted, crash_after):
+    expected, expected_calls = uninterrupted
+    assert len(expected_calls) == 14
+    config_path = _config(tmp_path, 'run')
+    calls = []
+
+    crashed = _scraper(config_path, calls, crash_after=crash_after)
+    with pytest.raises(Crash):
+        asyncio.run(crashed.scrape_all())
+    crashed.journal.close()
+
+    resumed = _scraper(config_path, calls, resume=True)
+    asyncio.run(resumed.scrape_all())
+
+    results, manifest = _consolidated(config_path)
+    assert results == expected
+    assert sorted(calls) == sorted(expected_calls)  # Journaled pages are not fetched again
+    assert len(manifest) == 1
+
+    # The journal is complete: resuming again fetches and writes nothing
+    with open(tmp_path / 'run' / 'uk' / 'run_journal.jsonl') as f:
+        assert json.loads(f.readlines()[-1]) == {'type': 'run_complete'}
+    asyncio.run(_scraper(config_path, calls, resume=True).scrape_all())
+    assert len(calls) == len(expected_calls)
+    assert len(_consolidated(config_path)[1]) == 1
@@ -0,0 +1,108 @@
+"""
+RUN MANIFEST TESTS: Offset Map, Re-Parsed Entries, Latest Run
+- Runs are written through the normal ResultStream → write_views → record_run path
+"""
+
+import json
+
+from result_stream import ResultStream
+from run_manifest import RunManifest, MANIFEST_FILE, OFFSETS_FILE
+
+
+def _save_run(country_dir, run_id, rank, reparsed=False):
+    """Record a two-keyword run whose products all carry BSR rank `rank`"""
+    timestamp = f"{run_id}_reparsed" if reparsed else run_id
+    stream = ResultStream(country_dir / f"products_{timestamp}.jsonl")
+    for keyword in ('alpha', 'beta'):
+        stream.write_product(keyword, {'asin': f"B0{keyword.upper()}", 'search_position': 1,
+                                       'bsr_subcategories': [{'rank': rank, 'category': 'Vitamins'}]})
+        stream.write_keyword({'keyword': keyword, 'status': 'success', 'total_products': 1})
+    stream.close()
+    _, consolidated_file, keyword_index = stream.write_views(country_dir, timestamp)
+    return RunManifest(country_dir).record_run(run_id, consolidated_file, keyword_index,
+                                                stream_file=stream.path, reparsed=reparsed)
+
+
+def _rank(manifest, run_id, keyword='beta'):
+    return manifest.open_run(run_id).read(keyword)['products'][0]['bsr_subcategories'][0]['rank']
+
+
+def test_offset_lookup_after_appends(tmp_path):
+    _save_run(tmp_path, '20250101_000000', 1)
+    _save_run(tmp_path, '20250102_000000', 2)
+
+    # Another writer appends a line the saved offset map has not seen yet
+    (tmp_path / 'other').mkdir()
+    entry = _save_run(tmp_path / 'other', '20250103_000000', 3)
+    for name in (entry['consolidated'], entry['index']):
+        (tmp_path / name).write_bytes((tmp_path / 'other' / name).read_bytes())
+    with open(tmp_path / MANIFEST_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+    manifest = RunManifest(tmp_path)
+    run_ids = ('20250101_000000', '20250102_000000', '20250103_000000')
+    assert [_rank(manifest, run_id) for run_id in run_ids] == [1, 2, 3]
+    assert manifest.get('20250104_000000') is None
+
+    saved = json.loads((tmp_path / OFFSETS_FILE).read_text())
+    assert saved['size'] == (tmp_path / MANIFEST_FILE).stat().st_size
+    assert sorted(saved['runs']) == list(run_ids)
+
+
+def test_offsets_rebuilt_when_manifest_shrinks(tmp_path):
+    _save_run(tmp_path, '20250101_000000', 1)
+    _save_run(tmp_path, '20250102_000000', 2)
+    manifest_path = tmp_path / MANIFEST_FILE
+    first_line = manifest_path.read_bytes().splitlines(keepends=True)[0]
+    manifest_path.write_bytes(first_line)
+
+    manifest = RunManifest(tmp_path)
+    assert manifest.get('20250102_000000') is None
+    assert manifest.latest()['run_id'] == '20250101_000000'
+
+
+def test_reparsed_entry_supersedes_original(tmp_path):
+    _save_run(tmp_path, '20250101_000000', 1)
+    _save_run(tmp_path, '20250102_000000', 2)
+    _save_run(tmp_path, '20250101_000000', 10, reparsed=True)
+
+    manifest = RunManifest(tmp_path)
+    assert manifest.get('20250101_000000')['reparsed'] is True
+    assert _rank(manifest, '20250101_000000') == 10
+    assert [(e['run_id'], e.get('reparsed', False)) for e in manifest.current()] == [
+        ('20250101_000000', True), ('20250102_000000', False)]
+
+    # A later original entry for the run (e.g. merged again) does not replace the re-parsed one
+    _save_run(tmp_path, '20250101_000000', 20)
+    assert _rank(RunManifest(tmp_path), '20250101_000000') == 10
+
+
+def test_pending_after_reparse(tmp_path):
+    first = _save_run(tmp_path, '20250101_000000', 1)
+    second = _save_run(tmp_path, '20250102_000000', 2)
+    manifest = RunManifest(tmp_path)
+    ingested = {first['run_id']: first['consolidated'], second['run_id']: second['consolidated']}
+    assert manifest.pending(ingested) == []
+
+    reparsed = _save_run(tmp_path, '20250101_000000', 10, reparsed=True)
+    assert [e['consolidated'] for e in manifest.pending(ingested)] == [reparsed['consolidated']]
+    # Rows recorded before superseding entries were tracked ingested the original
+    assert [e['run_id'] for e in manifest.pending({first['run_id']: None, second['run_id']: None})] == [
+        '20250101_000000']
+
+
+def test_latest_orders_by_run_id(tmp_path):
+    _save_run(tmp_path, '20250102_000000', 2)
+    _save_run(tmp_path, '20250101_000000', 1)  # Recorded later, but an older run
+    manifest = RunManifest(tmp_path)
+    assert manifest.latest()['run_id'] == '20250102_000000'
+    assert manifest.open_run().run_id == '20250102_000000'
+
+    # Re-parsing an older run does not make it the latest
+    _save_run(tmp_path, '20250101_000000', 10, reparsed=True)
+    assert manifest.latest()['run_id'] == '20250102_000000'
+
+    # Re-parsing the latest run makes its re-parsed entry the latest
+    _save_run(tmp_path, '20250102_000000', 20, reparsed=True)
+    assert manifest.latest()['reparsed'] is True
+    assert _rank(manifest, None) == 20
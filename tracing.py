@@ -0,0 +1,205 @@
+"""
+TRACING: Structured Spans
+- One trace per keyword and one per enriched ASIN (linked to its keyword trace)
+- Spans around fetch attempts, queue waits, backoff sleeps, parsing, enrichment and saving
+- Current span is tracked with contextvars, so spans nest across asyncio tasks
+- Exported as OTLP/JSON (loadable in Jaeger, Grafana Tempo, otel-desktop-viewer, ...)
+"""
+
+import json
+import time
+import asyncio
+import secrets
+import logging
+import functools
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'amazon-scraper'
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict,
+                 start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes to the span"""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def to_otlp(self) -> Dict:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_value(value) -> Dict:
+    """Encode an attribute value as an OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """Collects spans in memory and exports them as one OTLP/JSON file"""
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Span] = []
+
+    def enable(self):
+        """Start recording spans (tracing is off by default)"""
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name: str, new_trace: bool = False, **attributes):
+        """
+        Record a span around a block
+
+        Args:
+            name: Span name
+            new_trace: Start a new trace (linked to the current one) instead of a child span
+            **attributes: Span attributes (keyword, asin, url, ...)
+
+        Yields:
+            The Span (or None when tracing is disabled)
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        span = self._new_span(name, new_trace, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """Start a child span without making it current (end it with end_span)"""
+        if not self.enabled:
+            return None
+        return self._new_span(name, False, attributes)
+
+    def end_span(self, span: Optional[Span], **attributes):
+        """Finish a span started with start_span"""
+        if span is None:
+            return
+        span.set(**attributes)
+        self._finish(span)
+
+    def annotate(self, **attributes):
+        """Add attributes to the current span (no-op outside a span)"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def record(self, name: str, start_ns: int, **attributes):
+        """Record an already-finished child span that started at start_ns (e.g. a queue wait)"""
+        if not self.enabled:
+            return
+        self._finish(self._new_span(name, False, attributes, start_ns=start_ns))
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator: wrap every call of a (sync or async) function in a span"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _new_span(self, name: str, new_trace: bool, attributes: Dict, start_ns: Optional[int] = None) -> Span:
+        parent = _current_span.get()
+        if parent is None or new_trace:
+            span = Span(name, secrets.token_hex(16), None, attributes, start_ns)
+            if parent is not None:
+                span.set(parent_trace_id=parent.trace_id)
+            return span
+        return Span(name, parent.trace_id, parent.span_id, attributes, start_ns)
+
+    def _finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        self.spans.append(span)
+
+    def export(self, path: Path) -> Path:
+        """
+        Write all recorded spans as OTLP/JSON
+
+        Args:
+            path: Output file (e.g. output/traces_{timestamp}.json)
+
+        Returns:
+            Path of the written file
+        """
+        path = Path(path)
+        document = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+                'scopeSpans': [{
+                    'scope': {'name': SERVICE_NAME},
+                    'spans': [span.to_otlp() for span in self.spans]
+                }]
+            }]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False)
+        logger.info(f"✓ Traces: {path} ({len(self.spans)} spans)")
+        return path
+
+
+# Shared tracer used by all layers
+TRACER = Tracer()